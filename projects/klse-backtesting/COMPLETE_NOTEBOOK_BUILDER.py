@@ -45,14 +45,14 @@ def create_notebook():
     # SECTION 2: SETUP
     add_md("## 2. Setup & Imports\n\nImport libraries (same as beginner notebook):")
 
-    add_code("# Data & Analysis\nimport yfinance as yf\nimport pandas as pd\nimport numpy as np\nimport pandas_ta as ta\n\n# Visualization\nimport matplotlib.pyplot as plt\nimport seaborn as sns\nimport plotly.graph_objects as go\nimport plotly.express as px\n\n# Utilities\nfrom datetime import datetime, timedelta\nimport warnings\nwarnings.filterwarnings('ignore')\n\n# Config\nsns.set_style('whitegrid')\nplt.rcParams['figure.figsize'] = (14, 7)\nnp.random.seed(42)\n\nprint('[OK] Libraries imported')\nprint(f'Today: {datetime.now().strftime(\"%Y-%m-%d\")}')")
+    add_code("# Data & Analysis\nimport yfinance as yf\nimport pandas as pd\nimport numpy as np\n\n# Visualization\nimport matplotlib.pyplot as plt\nimport seaborn as sns\nimport plotly.graph_objects as go\nimport plotly.express as px\n\n# Utilities\nfrom datetime import datetime, timedelta\nimport warnings\nwarnings.filterwarnings('ignore')\n\n# Config\nsns.set_style('whitegrid')\nplt.rcParams['figure.figsize'] = (14, 7)\nnp.random.seed(42)\n\nprint('[OK] Libraries imported')\nprint(f'Today: {datetime.now().strftime(\"%Y-%m-%d\")}')")
 
     # SECTION 3: DATA FUNCTIONS
     add_md("## 3. Data & Framework\n\nBuild our backtesting foundation:")
 
-    add_code("def get_data(ticker, start, end):\n    '''Fetch historical data'''\n    try:\n        df = yf.download(ticker, start=start, end=end, progress=False)\n        if df.empty:\n            print(f'No data for {ticker}')\n            return None\n        print(f'[OK] {len(df)} days for {ticker}')\n        return df\n    except Exception as e:\n        print(f'Error: {e}')\n        return None\n\n# Test\ntest_df = get_data('1155.KL', '2021-01-01', '2023-12-31')\nif test_df is not None:\n    print(f'\\nData: {test_df.index[0].date()} to {test_df.index[-1].date()}')\n    print(f'Columns: {list(test_df.columns)}')")
+    add_code("import sys\nsys.path.append('../../shared')\nfrom klse.cache import PriceCache\n\n# Downloads are kept in data/price_cache - repeat requests are read from disk\nprice_cache = PriceCache('data/price_cache')\n\ndef get_data(ticker, start, end, cache=price_cache):\n    '''Fetch historical data (cached on disk; cache=None always downloads)'''\n    try:\n        if cache is not None:\n            df = cache.get(ticker, start, end)\n        else:\n            df = yf.download(ticker, start=start, end=end, progress=False)\n        if df is None or df.empty:\n            print(f'No data for {ticker}')\n            return None\n        print(f'[OK] {len(df)} days for {ticker}')\n        return df\n    except Exception as e:\n        print(f'Error: {e}')\n        return None\n\n# Test\ntest_df = get_data('1155.KL', '2021-01-01', '2023-12-31')\nif test_df is not None:\n    print(f'\\nData: {test_df.index[0].date()} to {test_df.index[-1].date()}')\n    print(f'Columns: {list(test_df.columns)}')")
 
-    add_code("def add_indicators(df):\n    '''Add technical indicators'''\n    df = df.copy()\n    \n    def safe(result):\n        if result is None:\n            return None\n        if isinstance(result, pd.Series):\n            return result\n        if isinstance(result, pd.DataFrame):\n            return result.iloc[:, 0] if len(result.columns) > 0 else None\n        return result\n    \n    df['SMA_20'] = safe(df.ta.sma(20))\n    df['SMA_50'] = safe(df.ta.sma(50))\n    df['SMA_200'] = safe(df.ta.sma(200))\n    df['RSI'] = safe(df.ta.rsi(14))\n    \n    macd = df.ta.macd()\n    if macd is not None:\n        df = pd.concat([df, macd], axis=1)\n    \n    return df\n\nprint('[OK] add_indicators() ready')")
+    add_code("import sys\nsys.path.append('../../shared')\nfrom klse import indicators\n\ndef add_indicators(df):\n    '''Add technical indicators (SMA 20/50/200, RSI 14, MACD 12/26/9)'''\n    # NumPy versions of the pandas_ta indicators: same columns and values\n    return indicators.add_indicators(df)\n\nprint('[OK] add_indicators() ready')")
 
     # SECTION 4: MA CROSSOVER STRATEGY
     add_md("## 4. Strategy #1: Moving Average Crossover\n\n### Concept:\n**BUY:** SMA-50 crosses above SMA-200 (Golden Cross)\n**SELL:** SMA-50 crosses below SMA-200 (Death Cross)\n\n### When it works:\n- Strong trending markets\n- Clear directional moves\n\n### When it fails:\n- Sideways/choppy markets\n- Too many false signals\n\n---")
@@ -95,19 +95,51 @@ def create_notebook():
 
     add_code("def add_stop_loss(df, stop_pct=0.05):\n    '''Add stop-loss (5% default)'''\n    df = df.copy()\n    entry_price = None\n    \n    for i in range(len(df)):\n        if df['Position'].iloc[i] == 1:  # Entry\n            entry_price = df['Close'].iloc[i]\n        elif entry_price is not None and df['Signal'].iloc[i] == 1:\n            # Check stop-loss\n            if df['Close'].iloc[i] < entry_price * (1 - stop_pct):\n                df.loc[df.index[i], 'Signal'] = 0\n                df.loc[df.index[i], 'Position'] = -1\n                entry_price = None\n        elif df['Position'].iloc[i] == -1:\n            entry_price = None\n    \n    return df\n\nprint('[OK] add_stop_loss() ready')\nprint('Adds 5% stop-loss to protect capital')")
 
+    add_md("### Faster Stops: Trailing, Take-Profit and ATR\n\n`add_stop_loss()` above checks every day with `df.iloc` / `df.loc`, which gets slow over many stocks. `shared/klse` has a NumPy version that gives identical results and adds more exit rules:\n\n- **Trailing stop** - stop follows the highest close since entry\n- **Take-profit** - lock in gains at a target\n- **ATR stop** - stop distance based on volatility")
+
+    add_code("import sys\nsys.path.append('../../shared')\nfrom klse import add_stop_loss as fast_stop_loss\n\nif df_may is not None:\n    same = fast_stop_loss(df_may).equals(add_stop_loss(df_may))\n    print(f'Same result as add_stop_loss(): {same}')\n    \n    trailing = fast_stop_loss(df_may, stop_pct=0.08, trailing=True, take_profit=0.15)\n    print(f'Exits with 8% trailing stop + 15% target: {(trailing[\"Position\"] == -1).sum()}')")
+
     # SECTION 9: PORTFOLIO BACKTEST
     add_md("## 9. Multi-Stock Portfolio\n\nTest strategy across multiple Malaysian stocks:\n\n---")
 
     add_code("# Test MA Crossover on 5 stocks\nstocks = ['1155.KL', '1295.KL', '1023.KL', '5296.KL', '4197.KL']\nnames = ['Maybank', 'PublicBank', 'CIMB', 'Tenaga', 'Maxis']\n\nresults = []\n\nfor ticker, name in zip(stocks, names):\n    print(f'Testing {name}...')\n    df = get_data(ticker, '2021-01-01', '2023-12-31')\n    if df is not None:\n        df = add_indicators(df)\n        df = df.dropna()\n        df = ma_crossover(df)\n        df = backtest(df)\n        m = calc_metrics(df)\n        m['Stock'] = name\n        results.append(m)\n\n# Show results\nimport pandas as pd\nresults_df = pd.DataFrame(results)\nprint('\\n' + '='*70)\nprint('MA CROSSOVER - PORTFOLIO RESULTS')\nprint('='*70)\nprint(results_df.to_string(index=False))\nprint('='*70)")
 
+    add_md("### Where Does the Time Go? Profiling a Scan\n\nBefore speeding up a slow scan, measure it. `Profiler` wraps the pipeline functions and records wall time, CPU time, rows and memory for every stage and ticker, so you can see whether downloads, indicators, signals, the backtest or the metrics dominate.")
+
+    add_code("from klse.profiling import Profiler\n\nprofiler = Profiler()\nprofiler.instrument(globals())   # get_data, add_indicators, strategies, backtest, calc_metrics\n\nfor ticker in stocks:\n    df = get_data(ticker, '2021-01-01', '2023-12-31')\n    if df is None:\n        continue\n    df = backtest(ma_crossover(add_indicators(df).dropna()))\n    calc_metrics(df)\n\nprofiler.restore()               # back to the plain functions\nprint(profiler.summary().round(4).to_string())\nprofiler.to_json('data/profile.json')")
+
+    add_md("### Faster: Whole Universe at Once\n\nThe loop above downloads and backtests one stock at a time. For hundreds of stocks, use the vectorized engine in `shared/klse`: it stores every field as a (dates × tickers) array and runs indicators, signals, backtest and metrics for all stocks in one pass.\n\nThe numbers match the loop above exactly.")
+
+    add_code("import sys\nsys.path.append('../../shared')\nfrom klse import Panel, run_backtest\n\n# One download for all tickers -> (field, ticker) columns\nraw = yf.download(stocks, start='2021-01-01', end='2023-12-31', progress=False)\npanel = Panel.from_wide(raw)\n\nfast_df = run_backtest(panel, 'ma_crossover')\nfast_df.index = [names[stocks.index(t)] for t in fast_df.index]\n\nprint('='*70)\nprint('MA CROSSOVER - VECTORIZED RESULTS')\nprint('='*70)\nprint(fast_df.to_string())\nprint('='*70)")
+
+    add_md("### Realistic Costs: Board Lots and Bursa Fees\n\nThe backtests above charge a flat 0.1% per trade. Real trades on Bursa Malaysia are in board lots of 100 shares and pay brokerage (with a minimum per contract), stamp duty, a clearing fee and SST. `mode='ledger'` simulates every order with these costs and keeps a list of all fills and trades.\n\nWith a small account the minimum brokerage and lot rounding can noticeably reduce returns.")
+
+    add_code("from klse.ledger import BursaCosts\n\n# RM 20,000 per stock, 100-share lots, Bursa costs and 0.1% slippage\nledger_df = run_backtest(panel, 'ma_crossover', capital=20000, mode='ledger',\n                         costs=BursaCosts(slippage=0.001))\nledger_df.index = [names[stocks.index(t)] for t in ledger_df.index]\n\nprint('='*70)\nprint('MA CROSSOVER - WITH BOARD LOTS AND BURSA COSTS')\nprint('='*70)\nprint(ledger_df.to_string())\nprint('='*70)")
+
     # SECTION 10: PITFALLS
     add_md("## 10. Common Pitfalls\n\n### 1. Overfitting\nMaking strategy work TOO well on past data\n\n### 2. Look-ahead Bias\nUsing future information\n\n### 3. Ignoring Costs\nForgetting commissions and slippage\n\n### 4. Survivorship Bias\nOnly testing stocks that still exist\n\n**How to avoid:** Use out-of-sample testing, realistic costs, and diverse data\n\n---")
 
+    add_md("### Testing Robustness: Monte Carlo\n\nA backtest is one path through history. A Monte Carlo test asks how different the result could have looked if the same kind of days had come in a different order:\n\n- **Block bootstrap** - rebuild 10,000 histories from random 20-day blocks of the strategy's returns\n- **Trade shuffle** - keep every trade, shuffle their order (same total return, different drawdowns)\n\nA wide range, or an actual result near the best paths, means the backtest was partly luck.")
+
+    add_code("from klse.montecarlo import monte_carlo\n\nif df_may is not None:\n    mc = monte_carlo(df_may['Strategy_Returns'], n_paths=10000, method='block', seed=42)\n    print('BLOCK BOOTSTRAP - 90% RANGE')\n    print(mc.confidence(0.90).to_string())\n    \n    shuffled = monte_carlo(df_may['Strategy_Returns'], n_paths=10000, method='trades',\n                           signal=df_may['Signal'], seed=42)\n    print('\\nTRADE SHUFFLE - 90% RANGE')\n    print(shuffled.confidence(0.90, columns=['Max Drawdown (%)']).to_string())")
+
     # SECTION 11: COMPARISON
     add_md("## 11. Strategy Comparison\n\nCompare all 3 strategies:\n\n---")
 
     add_code("# Compare strategies on Maybank\ncomparison = [\n    {'Strategy': 'MA Crossover', **metrics},\n    {'Strategy': 'RSI Mean Reversion', **metrics_rsi},\n    {'Strategy': 'MACD Momentum', **metrics_macd}\n]\n\ncomp_df = pd.DataFrame(comparison)\nprint('='*70)\nprint('STRATEGY COMPARISON - MAYBANK (2021-2023)')\nprint('='*70)\nprint(comp_df.to_string(index=False))\nprint('='*70)\n\n# Find best\nbest_idx = comp_df['CAGR (%)'].idxmax()\nprint(f'\\n[WINNER] {comp_df.loc[best_idx, \"Strategy\"]}')\nprint(f'Best CAGR: {comp_df.loc[best_idx, \"CAGR (%)\"]:.2f}%')")
 
+    add_md("### Re-running Without Recomputing: Artifact Cache\n\nEvery comparison above downloads Maybank, adds indicators and backtests again. An artifact cache stores each step's result under a hash of its inputs - the data, the function's code and its parameters - so running the same step again is a lookup. Change the data, a parameter or a function and only the affected steps run again.")
+
+    add_code("from klse.artifacts import ArtifactCache\n\n# In memory (least recently used results dropped first) and on disk across restarts\nartifacts = ArtifactCache(max_items=256, cache_dir='data/artifacts')\ncached = {f.__name__: artifacts.wrap(f) for f in\n          [add_indicators, ma_crossover, rsi_strategy, macd_strategy, backtest, calc_metrics]}\n\ndef load_prices(ticker, start, end):\n    '''get_data() keyed on ticker/start/end only (not on the price cache object)'''\n    df = get_data(ticker, start, end)\n    if df is None:\n        raise LookupError(f'No data for {ticker}')   # failed downloads are not stored\n    return df\n\ncached['get_data'] = artifacts.wrap(load_prices, name='get_data')\n\ndef compare(ticker, start, end):\n    try:\n        df = cached['get_data'](ticker, start, end)\n    except LookupError:\n        return None\n    base = cached['add_indicators'](df).dropna()\n    rows = []\n    for name, strategy in [('MA Crossover', 'ma_crossover'),\n                           ('RSI Mean Reversion', 'rsi_strategy'),\n                           ('MACD Momentum', 'macd_strategy')]:\n        result = cached['backtest'](cached[strategy](base))\n        rows.append({'Strategy': name, **cached['calc_metrics'](result)})\n    return pd.DataFrame(rows)\n\ncompare('1155.KL', '2021-01-01', '2023-12-31')\nprint('First run: ', artifacts.stats())\ncomp_cached = compare('1155.KL', '2021-01-01', '2023-12-31')\nprint('Second run:', artifacts.stats())   # every step is a hit\nprint(comp_cached.to_string(index=False))")
+
+    add_md("### Bonus: Optimizing Parameters\n\nAre 50/200 really the best MA lengths for Maybank? `sweep()` backtests every combination in a grid and ranks them by any metric.\n\n**Careful:** the best combination on past data is usually overfitted (see Section 10). Treat it as a starting point for out-of-sample testing, not a final answer.")
+
+    add_code("import sys\nsys.path.append('../../shared')\nfrom klse import sweep\n\ndf_opt = get_data('1155.KL', '2015-01-01', '2023-12-31')\n\nif df_opt is not None:\n    grid = {'fast': range(10, 101, 5), 'slow': range(100, 301, 10)}\n    # cache=artifacts: grid points already tested on the same data are not run again\n    opt = sweep(df_opt, 'ma_crossover', grid, sort_by='Sharpe Ratio', cache=artifacts)\n    \n    print(f'Tested {len(opt)} combinations')\n    print('\\nTop 5 by Sharpe Ratio:')\n    print(opt.head().to_string(index=False))")
+
+    add_md("### Bonus: Walk-Forward Testing\n\nWalk-forward testing is the out-of-sample check for the sweep above. History is split into rolling windows: optimize on 2 years (in-sample), trade the winner for the next 6 months (out-of-sample), then move forward 6 months and repeat. Only the out-of-sample months are joined into the final equity curve, so every trade uses parameters chosen from data available at the time.\n\nIf the out-of-sample Sharpe is much worse than the in-sample Sharpe, the optimized parameters were overfitted.")
+
+    add_code("from klse.walkforward import walk_forward\n\nif df_opt is not None:\n    wf = walk_forward(df_opt, 'ma_crossover', grid, train=504, test=126)\n    \n    print(wf.windows[['OOS Start', 'OOS End', 'fast', 'slow',\n                      'IS Sharpe Ratio', 'OOS Sharpe Ratio']].to_string())\n    print('\\nStitched out-of-sample performance:')\n    print(wf.metrics().to_string())")
+
     # SECTION 12: NEXT STEPS
     add_md("## 12. Next Steps\n\n### Congratulations!\n\nYou've learned:\n- How to backtest strategies\n- Build MA, RSI, and MACD strategies\n- Calculate performance metrics\n- Manage risk\n- Avoid common mistakes\n\n### Advanced Topics:\n1. **Machine Learning** - Use ML to optimize strategies\n2. **Walk-Forward Testing** - More robust validation\n3. **Portfolio Optimization** - Modern Portfolio Theory\n4. **Options Strategies** - Hedging and income\n5. **Live Trading** - Deploy with proper risk management\n\n### Practice Exercises:\n1. Test strategies on different timeframes\n2. Combine multiple indicators\n3. Optimize parameters (MA lengths, RSI levels)\n4. Add position sizing rules\n5. Test on different market conditions\n\n### Resources:\n- \"Evidence-Based Technical Analysis\" - David Aronson\n- \"Algorithmic Trading\" - Ernest Chan\n- QuantStart.com - Free education\n- Backtrader library - Advanced backtesting\n\n**Remember:** Always paper trade before using real money!\n\n---\n\n## Thank You!\n\nHappy backtesting! May your strategies be profitable and your drawdowns minimal. 📈")
 
@@ -0,0 +1,72 @@
+"""
+KLSE Toolkit
+Reusable, vectorized building blocks for the KLSE backtesting and screener notebooks.
+
+Usage from a project notebook:
+    import sys
+    sys.path.append('../../shared')
+    from klse import Panel, run_backtest
+"""
+
+from .artifacts import ArtifactCache, fingerprint
+from .cache import PriceCache
+from .chunked import chunked_backtest, chunked_run
+from .downloader import BulkDownloader, DataSource, download_many
+from .fundamentals import Fundamentals, FundamentalsCache, fetch_fundamentals
+from .incremental import IndicatorState, refresh_all
+from .intraday import BarStore, periods_per_year, resample_bars, stream_backtest
+from .latest import latest_indicators, screen_latest
+from .ledger import BursaCosts, ledger_backtest
+from .metrics import StreamingMetrics, batch_metrics, rolling_metrics
+from .montecarlo import monte_carlo
+from .panel import Panel, run_backtest, STRATEGIES
+from .pipeline import Pipeline
+from .portfolio import simulate_portfolio
+from .profiling import Profiler
+from .rules import Strategy, compile_rules, run_rules
+from .screener import FundamentalsTable
+from .sweep import sweep
+from .stops import add_stop_loss, stop_loss_exits
+from .walkforward import walk_forward
+
+__all__ = [
+    'ArtifactCache',
+    'fingerprint',
+    'PriceCache',
+    'chunked_backtest',
+    'chunked_run',
+    'BulkDownloader',
+    'DataSource',
+    'download_many',
+    'Fundamentals',
+    'FundamentalsCache',
+    'fetch_fundamentals',
+    'IndicatorState',
+    'refresh_all',
+    'BarStore',
+    'periods_per_year',
+    'resample_bars',
+    'stream_backtest',
+    'latest_indicators',
+    'screen_latest',
+    'BursaCosts',
+    'ledger_backtest',
+    'StreamingMetrics',
+    'batch_metrics',
+    'rolling_metrics',
+    'monte_carlo',
+    'Panel',
+    'run_backtest',
+    'STRATEGIES',
+    'Pipeline',
+    'simulate_portfolio',
+    'Profiler',
+    'Strategy',
+    'compile_rules',
+    'run_rules',
+    'FundamentalsTable',
+    'sweep',
+    'add_stop_loss',
+    'stop_loss_exits',
+    'walk_forward',
+]
@@ -0,0 +1,327 @@
+"""
+Content-Addressed Artifact Cache
+Keeps intermediate results (indicator frames, signals, backtests, metrics) so
+work that has already been done is not repeated, e.g. when the strategy
+comparison re-runs on data earlier sections already processed, or a sweep is
+run again with a few extra grid points.
+
+Keys are hashes of what produced the result, not names:
+- the data: every value and date of the input slice (a changed or extended
+  download gets a new key, so a stale result is never returned)
+- the function: its name and compiled code, the values in its closure and
+  the globals it refers to, including the notebook functions it calls
+  (editing a notebook function or a helper it uses invalidates its results)
+- the parameters: every other argument
+- the klse source files (every key changes when the package is updated)
+
+Calls with an argument that cannot be fingerprinted (a lock, an open file,
+a generator) are run without caching.
+
+Results are kept in memory with least-recently-used eviction, and optionally
+pickled to a directory so they survive a kernel restart.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+import types
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# ========== Fingerprints ==========
+
+def _code_digest(code: types.CodeType, h):
+    h.update(code.co_code)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _code_digest(const, h)
+        else:
+            h.update(repr(const).encode())
+    h.update(repr(code.co_names).encode())
+
+
+@lru_cache(maxsize=None)
+def _source_digest() -> bytes:
+    """Digest of the klse source files, computed once per session."""
+    h = hashlib.sha256()
+    for path in sorted(Path(__file__).parent.glob('*.py')):
+        h.update(path.name.encode())
+        h.update(path.read_bytes())
+    return h.digest()
+
+
+def _code_names(code: types.CodeType):
+    yield from code.co_names
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from _code_names(const)
+
+
+def _function_digest(func, h, seen: set):
+    """Code, defaults, closure values and referenced globals of a function."""
+    h.update(f'{func.__module__}.{func.__qualname__}'.encode())
+    if id(func) in seen:
+        return
+    seen.add(id(func))
+    _code_digest(func.__code__, h)
+    for default in func.__defaults__ or ():
+        _loose_update(h, default, seen)
+    for cell in func.__closure__ or ():
+        try:
+            value = cell.cell_contents
+        except ValueError:          # cell not filled yet
+            continue
+        _loose_update(h, value, seen)
+    names = sorted(set(_code_names(func.__code__)))
+    for name in names:
+        if name not in func.__globals__:
+            continue                # builtins and attribute names
+        value = func.__globals__[name]
+        h.update(name.encode())
+        if isinstance(value, types.ModuleType):
+            # klse modules are covered by _source_digest(); others by version
+            h.update(repr((value.__name__, getattr(value, '__version__', None))).encode())
+        elif isinstance(value, type):
+            h.update(f'{value.__module__}.{value.__qualname__}'.encode())
+        else:
+            _loose_update(h, value, seen)
+
+
+def _loose_update(h, obj: Any, seen: set):
+    """
+    _update() for values a function refers to: objects that cannot be
+    fingerprinted (e.g. a PriceCache holding a lock) count by their type.
+    """
+    if isinstance(obj, types.FunctionType):
+        _function_digest(obj, h, seen)
+        return
+    try:
+        _update(h, obj)
+    except TypeError:
+        h.update(f'{type(obj).__module__}.{type(obj).__qualname__}'.encode())
+
+
+def _update(h, obj: Any):
+    """
+    Feed a stable byte representation of obj into the hash.
+
+    Raises TypeError for objects that can be neither hashed nor pickled.
+    """
+    if isinstance(obj, pd.DataFrame):
+        h.update(b'DataFrame')
+        h.update(repr([(str(c), str(t)) for c, t in obj.dtypes.items()]).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, pd.Series):
+        h.update(b'Series')
+        h.update(repr((obj.name, str(obj.dtype))).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, pd.Index):
+        h.update(b'Index')
+        h.update(pd.util.hash_pandas_object(obj).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(repr((obj.dtype.str, obj.shape)).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(b'dict')
+        for key in sorted(obj, key=repr):
+            _update(h, key)
+            _update(h, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        h.update(type(obj).__name__.encode())
+        for item in obj:
+            _update(h, item)
+    elif isinstance(obj, range):
+        h.update(repr(obj).encode())
+    elif isinstance(obj, types.FunctionType):
+        _function_digest(obj, h, set())
+    elif obj is None or isinstance(obj, (bool, int, float, str, bytes,
+                                         np.integer, np.floating)):
+        h.update(repr((type(obj).__name__, obj)).encode())
+    elif hasattr(obj, 'fields') and hasattr(obj, 'index'):
+        # Panel: dates, tickers and every field
+        _update(h, pd.DatetimeIndex(obj.index))
+        _update(h, list(obj.tickers))
+        _update(h, dict(obj.fields))
+    else:
+        try:
+            h.update(pickle.dumps(obj, protocol=4))
+        except (pickle.PicklingError, TypeError, AttributeError) as err:
+            raise TypeError(f"cannot fingerprint {type(obj).__name__} object: {err}") from err
+
+
+def fingerprint(*parts: Any) -> str:
+    """
+    Hex digest identifying a combination of inputs.
+
+    Accepts DataFrames, Series, arrays, Panels, functions, containers and
+    plain values; equal content gives the same digest in every session with
+    the same klse source. Raises TypeError for objects that can be neither
+    hashed nor pickled.
+
+    Example:
+    --------
+    >>> fingerprint(df)                                  # data version
+    >>> fingerprint('ma_crossover', {'fast': 50, 'slow': 200}, df)
+    """
+    h = hashlib.sha256(_source_digest())
+    for part in parts:
+        _update(h, part)
+    return h.hexdigest()
+
+
+# ========== Cache ==========
+
+_MISSING = object()
+
+
+class ArtifactCache:
+    """
+    LRU cache of intermediate results keyed by fingerprint().
+
+    Args:
+        max_items: Results kept in memory (least recently used go first)
+        cache_dir: Directory for on-disk copies (None = memory only)
+
+    Attributes:
+        hits: Lookups answered from memory
+        disk_hits: Lookups answered from cache_dir
+        misses: Lookups that had to compute
+
+    Example:
+        >>> artifacts = ArtifactCache(max_items=256, cache_dir='data/artifacts')
+        >>> cached_indicators = artifacts.wrap(add_indicators)
+        >>> df = cached_indicators(get_data('1155.KL', '2021-01-01', '2023-12-31'))
+        >>> df = cached_indicators(get_data('1155.KL', '2021-01-01', '2023-12-31'))  # hit
+        >>> artifacts.stats()
+    """
+
+    def __init__(self, max_items: int = 256, cache_dir: Optional[str] = None):
+        if max_items < 1:
+            raise ValueError("max_items must be at least 1")
+        self.max_items = max_items
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._items: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._items or (self.cache_dir is not None
+                                      and self._path(key).exists())
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f'{key}.pkl'
+
+    # ========== Lookup ==========
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Stored result for key, or default."""
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def _lookup(self, key: str) -> Any:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+        if self.cache_dir is not None:
+            path = self._path(key)
+            if path.exists():
+                try:
+                    with open(path, 'rb') as f:
+                        value = pickle.load(f)
+                except (OSError, pickle.UnpicklingError, EOFError):
+                    value = _MISSING
+                if value is not _MISSING:
+                    with self._lock:
+                        self.disk_hits += 1
+                    self._remember(key, value)
+                    return value
+        with self._lock:
+            self.misses += 1
+        return _MISSING
+
+    def put(self, key: str, value: Any):
+        """Store a result in memory (and on disk if cache_dir is set)."""
+        self._remember(key, value)
+        if self.cache_dir is not None:
+            path = self._path(key)
+            tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+
+    def _remember(self, key: str, value: Any):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Stored result for key, computing and storing it on a miss."""
+        value = self._lookup(key)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    # ========== Functions ==========
+
+    def wrap(self, func: Callable, name: Optional[str] = None) -> Callable:
+        """
+        Cached version of func: calls with the same function code and the
+        same argument contents return the stored result.
+
+        Results are shared between calls, so do not modify them in place
+        (the notebook functions all copy their input first). Calls with an
+        argument that cannot be fingerprinted run func without caching.
+        """
+        label = name or getattr(func, '__qualname__', repr(func))
+
+        def cached(*args, **kwargs):
+            try:
+                key = fingerprint(label, func, args, kwargs)
+            except TypeError:
+                return func(*args, **kwargs)
+            return self.get_or_compute(key, lambda: func(*args, **kwargs))
+
+        cached.__name__ = getattr(func, '__name__', label)
+        cached.__doc__ = func.__doc__
+        cached.__wrapped__ = func
+        return cached
+
+    # ========== Housekeeping ==========
+
+    def clear(self, disk: bool = False):
+        """Drop the in-memory results (and the on-disk copies if disk=True)."""
+        with self._lock:
+            self._items.clear()
+        if disk and self.cache_dir is not None:
+            for path in self.cache_dir.glob('*.pkl'):
+                path.unlink()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counts and the number of results held in memory."""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate (%)': round(100 * (self.hits + self.disk_hits) / lookups, 1) if lookups else 0.0,
+            'items': len(self._items),
+        }
@@ -0,0 +1,314 @@
+"""
+Pipeline Benchmark Suite
+Times every stage of the KLSE backtesting and screening pipeline
+(add_indicators, strategy, backtest, add_stop_loss, calc_metrics and the
+screener's add_technical_indicators) on synthetic prices, and compares the
+run with a stored baseline to catch changes that make a stage slower or
+hungrier for memory.
+
+The stages above time the klse equivalents of the notebook functions
+(panel.py, stops.py). Pass the notebook's own functions (notebook=globals())
+to time them as well, ticker by ticker, under the NOTEBOOK_STAGES names.
+
+Prices come from a seeded random walk, so every run measures exactly the
+same data and nothing is downloaded.
+
+Usage:
+    python -m klse.benchmarks --save-baseline      # once, before a change
+    python -m klse.benchmarks                      # after it: regression report
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import indicators, panel, stops
+from .panel import Panel
+
+
+DEFAULT_SCENARIOS = [(10, 2500), (100, 2500)]
+DEFAULT_BASELINE = 'data/benchmarks/baseline.json'
+
+STAGES = ['add_indicators', 'strategy', 'backtest', 'add_stop_loss',
+          'calc_metrics', 'screener_indicators']
+
+# The notebook's own functions, timed when run_benchmarks() gets them
+NOTEBOOK_STAGES = ['notebook_add_indicators', 'notebook_strategy', 'notebook_backtest',
+                   'notebook_add_stop_loss', 'notebook_calc_metrics']
+
+NOTEBOOK_FUNCTIONS = ['add_indicators', 'ma_crossover', 'backtest', 'add_stop_loss',
+                      'calc_metrics']
+
+
+# ========== Synthetic data ==========
+
+def synthetic_universe(n_tickers: int, n_days: int, seed: int = 0) -> Dict[str, pd.DataFrame]:
+    """
+    Deterministic OHLCV frames for n_tickers stocks of n_days business days.
+
+    Each ticker is a seeded random walk, so the same arguments always give
+    the same prices.
+    """
+    return {f'BENCH{k:04d}': indicators._synthetic_ohlcv(n_days, seed + k)
+            for k in range(n_tickers)}
+
+
+# ========== Measuring ==========
+
+def _stage_runs(frames: Dict[str, pd.DataFrame]) -> Dict[str, Callable]:
+    """One callable per stage; each gets the previous stage's output, prepared once."""
+    raw = Panel.from_frames(frames)
+    ind = panel.add_indicators(raw)
+    signal = panel.ma_crossover(ind)
+    result = panel.backtest(ind, signal)
+    singles = [result.ticker_frame(t) for t in result.tickers]
+    return {
+        'add_indicators': lambda: panel.add_indicators(raw),
+        'strategy': lambda: panel.ma_crossover(ind),
+        'backtest': lambda: panel.backtest(ind, signal),
+        'add_stop_loss': lambda: [stops.add_stop_loss(df) for df in singles],
+        'calc_metrics': lambda: panel.calc_metrics(result),
+        'screener_indicators': lambda: [indicators.add_technical_indicators(df)
+                                        for df in frames.values()],
+    }
+
+
+def _notebook_runs(frames: Dict[str, pd.DataFrame], notebook: Dict) -> Dict[str, Callable]:
+    """The notebook's functions ticker by ticker, as NOTEBOOK_STAGES."""
+    missing = [name for name in NOTEBOOK_FUNCTIONS if not callable(notebook.get(name))]
+    if missing:
+        raise ValueError(f"notebook is missing {missing}")
+    add_indicators, ma_crossover, backtest, add_stop_loss, calc_metrics = (
+        notebook[name] for name in NOTEBOOK_FUNCTIONS)
+    ind = [add_indicators(df).dropna() for df in frames.values()]
+    signals = [ma_crossover(df) for df in ind]
+    results = [backtest(df) for df in signals]
+    return {
+        'notebook_add_indicators': lambda: [add_indicators(df).dropna() for df in frames.values()],
+        'notebook_strategy': lambda: [ma_crossover(df) for df in ind],
+        'notebook_backtest': lambda: [backtest(df) for df in signals],
+        'notebook_add_stop_loss': lambda: [add_stop_loss(df) for df in signals],
+        'notebook_calc_metrics': lambda: [calc_metrics(df) for df in results],
+    }
+
+
+def _measure(run: Callable, repeat: int) -> Tuple[float, float, int]:
+    """Best wall time, CPU time of that run, and peak traced bytes."""
+    best, cpu = np.inf, np.inf
+    for _ in range(repeat):
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        run()
+        wall, used = time.perf_counter() - wall0, time.process_time() - cpu0
+        if wall < best:
+            best, cpu = wall, used
+
+    # Memory in a separate run: tracing slows allocations down
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    run()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    if not tracing:
+        tracemalloc.stop()
+    return best, cpu, peak
+
+
+def run_benchmarks(scenarios: Sequence[Tuple[int, int]] = DEFAULT_SCENARIOS,
+                   stages: Optional[Iterable[str]] = None, repeat: int = 3,
+                   seed: int = 0, notebook: Optional[Dict] = None) -> pd.DataFrame:
+    """
+    Time and memory-profile every pipeline stage.
+
+    Parameters:
+    -----------
+    scenarios : list of (n_tickers, n_days)
+        Universe sizes to run
+    stages : list of str, optional
+        Subset of STAGES and NOTEBOOK_STAGES (default: all STAGES, plus
+        NOTEBOOK_STAGES when notebook is given)
+    repeat : int
+        Timed runs per stage; the fastest is kept
+    seed : int
+        Seed of the synthetic prices
+    notebook : dict, optional
+        The notebook's functions by name (e.g. globals()): add_indicators,
+        ma_crossover, backtest, add_stop_loss and calc_metrics, timed one
+        ticker at a time as NOTEBOOK_STAGES
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per scenario and stage: Seconds (best wall time), CPU
+        Seconds, Peak (MB) of traced allocations and Rows/s
+
+    Example:
+    --------
+    >>> results = run_benchmarks([(50, 2500)], repeat=5)
+    >>> results = run_benchmarks([(50, 2500)], notebook=globals())   # in the notebook
+    >>> report = compare(results, load_baseline())
+    """
+    stages = list(stages or (STAGES + NOTEBOOK_STAGES if notebook is not None else STAGES))
+    unknown = set(stages) - set(STAGES) - set(NOTEBOOK_STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {sorted(unknown)}")
+    if notebook is None and set(stages) & set(NOTEBOOK_STAGES):
+        raise ValueError("Notebook stages need the notebook's functions (notebook=globals())")
+
+    rows = []
+    for n_tickers, n_days in scenarios:
+        frames = synthetic_universe(n_tickers, n_days, seed)
+        runs = {}
+        if set(stages) & set(STAGES):
+            runs.update(_stage_runs(frames))
+        if set(stages) & set(NOTEBOOK_STAGES):
+            runs.update(_notebook_runs(frames, notebook))
+        for stage in stages:
+            seconds, cpu, peak = _measure(runs[stage], repeat)
+            rows.append({
+                'Tickers': n_tickers, 'Days': n_days, 'Stage': stage,
+                'Seconds': seconds, 'CPU Seconds': cpu, 'Peak (MB)': peak / 1e6,
+                'Rows/s': n_tickers * n_days / seconds if seconds > 0 else np.nan,
+            })
+    return pd.DataFrame(rows)
+
+
+# ========== Baseline ==========
+
+def environment() -> Dict[str, str]:
+    """Versions and machine details stored with a baseline."""
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'system': platform.platform(),
+    }
+
+
+def save_baseline(results: pd.DataFrame, path: str = DEFAULT_BASELINE):
+    """Store a run as the baseline (JSON, with the environment it ran in)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'results': results.to_dict('records'),
+    }
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    tmp.replace(path)
+
+
+def load_baseline(path: str = DEFAULT_BASELINE) -> Optional[pd.DataFrame]:
+    """Stored baseline (environment and date in .attrs), or None if there is none."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    baseline = pd.DataFrame(data['results'])
+    baseline.attrs['created'] = data.get('created')
+    baseline.attrs['environment'] = data.get('environment', {})
+    return baseline
+
+
+def compare(current: pd.DataFrame, baseline: pd.DataFrame, threshold: float = 0.20,
+            memory_threshold: float = 0.10, min_seconds: float = 0.005) -> pd.DataFrame:
+    """
+    Regression report: current run vs baseline, per scenario and stage.
+
+    Parameters:
+    -----------
+    threshold : float
+        Relative slow-down that counts as a regression (0.20 = 20%)
+    memory_threshold : float
+        Relative growth of peak memory that counts as a regression
+    min_seconds : float
+        Slow-downs smaller than this are timer noise and never count
+
+    Returns:
+    --------
+    pd.DataFrame
+        Baseline and current seconds / peak MB, their changes in %, and a
+        Status of 'slower', 'more memory', 'faster', 'ok' or 'new'
+    """
+    keys = ['Tickers', 'Days', 'Stage']
+    table = current[keys + ['Seconds', 'Peak (MB)']].merge(
+        baseline[keys + ['Seconds', 'Peak (MB)']], on=keys, how='left',
+        suffixes=('', ' (baseline)'))
+    time_change = table['Seconds'] / table['Seconds (baseline)'] - 1
+    memory_change = table['Peak (MB)'] / table['Peak (MB) (baseline)'] - 1
+    table['Time Change (%)'] = (time_change * 100).round(1)
+    table['Memory Change (%)'] = (memory_change * 100).round(1)
+
+    slower = (time_change > threshold) & (table['Seconds'] - table['Seconds (baseline)'] > min_seconds)
+    status = np.select(
+        [table['Seconds (baseline)'].isna(), slower, memory_change > memory_threshold,
+         time_change < -threshold],
+        ['new', 'slower', 'more memory', 'faster'], default='ok')
+    table['Status'] = status
+    columns = keys + ['Seconds (baseline)', 'Seconds', 'Time Change (%)',
+                      'Peak (MB) (baseline)', 'Peak (MB)', 'Memory Change (%)', 'Status']
+    return table[columns]
+
+
+def regressions(report: pd.DataFrame) -> pd.DataFrame:
+    """Rows of a compare() report that got slower or use more memory."""
+    return report[report['Status'].isin(['slower', 'more memory'])]
+
+
+# ========== Command line ==========
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the KLSE pipeline stages')
+    parser.add_argument('--tickers', type=int, nargs='+', default=None,
+                        help='Ticker counts to run (default: 10 100)')
+    parser.add_argument('--days', type=int, nargs='+', default=[2500],
+                        help='History lengths in days (default: 2500)')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Store this run as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.20,
+                        help='Relative slow-down reported as a regression')
+    args = parser.parse_args(argv)
+
+    tickers = args.tickers or sorted({n for n, _ in DEFAULT_SCENARIOS})
+    scenarios = [(n, d) for n in tickers for d in args.days]
+    results = run_benchmarks(scenarios, args.stages, args.repeat)
+    print(results.round(4).to_string(index=False))
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline} - run with --save-baseline first")
+        return 0
+    if baseline.attrs['environment'] != environment():
+        print("\nNote: the baseline was recorded with different versions or on another machine")
+    report = compare(results, baseline, args.threshold)
+    print(f"\nCompared with baseline from {baseline.attrs['created']}:")
+    print(report.to_string(index=False))
+    failed = regressions(report)
+    print(f"\n{len(failed)} regression(s)" if len(failed) else "\nNo regressions")
+    return 1 if len(failed) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,366 @@
+"""
+Local OHLCV Price Cache
+Stores downloaded daily prices on disk (one compressed Parquet file per ticker)
+and only downloads the dates that are not cached yet.
+
+The notebooks call yf.download / yf.Ticker.history every time a cell runs, so the
+same stock is downloaded again and again. With PriceCache the first request
+downloads, later requests read from disk, and a request for newer dates only
+fetches the missing days and appends them.
+
+Yahoo's prices are adjusted for dividends and splits, so every bar before a
+new corporate action changes when it happens. Appending days adjusted on the
+new basis to history adjusted on the old one would leave a false jump, so
+when a newly fetched day has a dividend or split the cache does not know
+yet, the ticker's whole cached range is downloaded again.
+
+yf.download answers rate limits and network errors with an empty frame
+rather than an exception. An empty answer is therefore only accepted for a
+range next to bars already stored (a holiday, the days before listing); for
+a ticker with nothing stored it counts as a failed download, and the range
+is not recorded as cached.
+"""
+
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+ACTION_COLUMNS = ['Dividends', 'Stock Splits']
+
+# yfinance-style periods accepted by get_stock_data()
+_PERIOD_UNITS = {'d': 'days', 'wk': 'weeks', 'mo': 'months', 'y': 'years'}
+
+
+def yfinance_fetcher(ticker: str, start: str, end: str) -> pd.DataFrame:
+    """
+    Default fetcher: daily adjusted OHLCV from Yahoo Finance for [start, end),
+    with the Dividends and Stock Splits columns.
+
+    Uses yf.Ticker().history() rather than yf.download(): download() keeps
+    its results in module-level state that every call resets, so calls from
+    several download threads at once can lose each other's data.
+    """
+    import yfinance as yf
+
+    df = yf.Ticker(ticker).history(start=start, end=end, auto_adjust=True,
+                                   actions=True)
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.droplevel(-1, axis=1)
+    return df
+
+
+def period_to_start(period: str, today: Optional[pd.Timestamp] = None) -> pd.Timestamp:
+    """
+    Convert a yfinance period ('5d', '6mo', '1y', 'ytd', 'max') to a start date.
+    """
+    today = pd.Timestamp(today or datetime.now()).normalize()
+    if period == 'max':
+        return pd.Timestamp('1970-01-01')
+    if period == 'ytd':
+        return pd.Timestamp(year=today.year, month=1, day=1)
+
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+    if not match:
+        raise ValueError(f"Unknown period: {period}")
+    count, unit = int(match.group(1)), _PERIOD_UNITS[match.group(2)]
+    return today - pd.DateOffset(**{unit: count})
+
+
+class PriceCache:
+    """
+    On-disk cache of daily OHLCV data with incremental refresh.
+
+    Each ticker is one Parquet file in cache_dir. An index.json file records
+    which date range has already been requested for each ticker, so holidays
+    and weekends are not downloaded over and over.
+
+    Args:
+        cache_dir: Directory for the cache files
+        fetcher: function(ticker, start, end) -> DataFrame used for downloads
+            (default: Yahoo Finance via yfinance)
+        offline: Never download; serve whatever is cached
+        refresh_after: How long today's (still changing) bar is served from
+            disk before it is downloaded again
+
+    Example:
+        >>> cache = PriceCache('data/price_cache')
+        >>> df = cache.get('1155.KL', '2021-01-01', '2023-12-31')   # downloads
+        >>> df = cache.get('1155.KL', '2022-01-01', '2022-06-30')   # from disk
+        >>> df = cache.get('1155.KL', '2021-01-01', '2024-06-30')   # fetches 2024 only
+    """
+
+    def __init__(self, cache_dir: str = 'data/price_cache',
+                 fetcher: Optional[Callable[[str, str, str], pd.DataFrame]] = None,
+                 offline: bool = False,
+                 refresh_after: timedelta = timedelta(hours=1)):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.fetcher = fetcher or yfinance_fetcher
+        self.offline = offline
+        self.refresh_after = refresh_after
+        self._index_file = self.cache_dir / 'index.json'
+        self._index = self._load_index()
+        self._memory: Dict[str, Tuple[float, pd.DataFrame]] = {}
+        # Guards index.json when several download threads share one cache
+        self._lock = threading.Lock()
+
+    # ========== Index ==========
+
+    def _load_index(self) -> Dict:
+        if self._index_file.exists():
+            try:
+                with open(self._index_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except json.JSONDecodeError:
+                print("⚠️ Warning: Could not read price cache index. Starting fresh.")
+        return {}
+
+    def _save_index(self):
+        tmp = self._index_file.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp, self._index_file)
+
+    def _set_coverage(self, ticker: str, start: pd.Timestamp, end: pd.Timestamp):
+        with self._lock:
+            self._index[ticker] = {
+                'start': start.strftime('%Y-%m-%d'),
+                'end': end.strftime('%Y-%m-%d'),
+                'updated': datetime.now().isoformat(timespec='seconds'),
+            }
+            self._save_index()
+
+    def path(self, ticker: str) -> Path:
+        """Parquet file holding one ticker."""
+        return self.cache_dir / f"{ticker.replace('.', '_').replace('^', 'IDX_')}.parquet"
+
+    def coverage(self, ticker: str) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """Cached [start, end) range for a ticker, or None if not cached."""
+        entry = self._index.get(ticker)
+        if entry is None:
+            return None
+        return pd.Timestamp(entry['start']), pd.Timestamp(entry['end'])
+
+    # ========== Storage ==========
+
+    def _read(self, ticker: str) -> Optional[pd.DataFrame]:
+        path = self.path(ticker)
+        if not path.exists():
+            return None
+        mtime = path.stat().st_mtime
+        cached = self._memory.get(ticker)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        df = pd.read_parquet(path)
+        self._memory[ticker] = (mtime, df)
+        return df
+
+    def _write(self, ticker: str, df: pd.DataFrame):
+        path = self.path(ticker)
+        tmp = path.with_suffix('.tmp')
+        df.to_parquet(tmp, compression='zstd')
+        os.replace(tmp, path)
+        self._memory[ticker] = (path.stat().st_mtime, df)
+
+    @staticmethod
+    def _clean(df: Optional[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Keep OHLCV (and Dividends / Stock Splits, if any) with a sorted,
+        timezone-free date index.
+        """
+        if df is None or df.empty:
+            return pd.DataFrame(columns=OHLCV_COLUMNS,
+                                index=pd.DatetimeIndex([], name='Date'))
+        if isinstance(df.columns, pd.MultiIndex):
+            df = df.droplevel(-1, axis=1)
+        df = df[[c for c in OHLCV_COLUMNS + ACTION_COLUMNS if c in df.columns]].copy()
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        df.index = index.normalize().rename('Date')
+        df.columns.name = None
+        return df.sort_index()
+
+    @staticmethod
+    def _merge(parts) -> pd.DataFrame:
+        """Concatenate cleaned frames; later frames win on duplicate dates."""
+        merged = pd.concat(parts)
+        merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+        actions = [c for c in ACTION_COLUMNS if c in merged.columns]
+        # Rows from a source without actions (older caches, put()) had none
+        merged[actions] = merged[actions].fillna(0.0)
+        return merged
+
+    @staticmethod
+    def _new_actions(cached: pd.DataFrame, fetched: pd.DataFrame) -> bool:
+        """True if fetched has a dividend or split that cached does not."""
+        columns = [c for c in ACTION_COLUMNS if c in fetched.columns]
+        if not columns or fetched.empty:
+            return False
+        actions = fetched[columns].fillna(0.0)
+        known = pd.DataFrame(0.0, index=actions.index, columns=columns)
+        have = [c for c in columns if c in cached.columns]
+        if have:
+            known[have] = cached[have].reindex(actions.index).fillna(0.0)
+        return bool(((actions != 0) & (actions != known)).to_numpy().any())
+
+    # ========== Public API ==========
+
+    def get(self, ticker: str, start=None, end=None,
+            raise_errors: bool = False,
+            fetcher: Optional[Callable] = None) -> Optional[pd.DataFrame]:
+        """
+        Daily OHLCV for [start, end), downloading only what is missing.
+
+        Parameters:
+        -----------
+        ticker : str
+            Stock ticker (e.g., '1155.KL')
+        start, end : str or datetime
+            Date range, end exclusive like yf.download (default: all history
+            up to today)
+        raise_errors : bool
+            Re-raise download errors instead of falling back to cached data
+        fetcher : callable, optional
+            Use this download function for this call only
+
+        Returns:
+        --------
+        pd.DataFrame or None
+            OHLCV data (plus Dividends / Stock Splits from the default
+            fetcher), or None if nothing is available
+        """
+        today = pd.Timestamp(datetime.now()).normalize()
+        start = pd.Timestamp(start) if start is not None else pd.Timestamp('1970-01-01')
+        end = pd.Timestamp(end) if end is not None else today + timedelta(days=1)
+
+        if not self.offline:
+            self._fill(ticker, start, end, today, raise_errors,
+                       fetcher or self.fetcher)
+
+        df = self._read(ticker)
+        if df is None:
+            return None
+        df = df.loc[(df.index >= start) & (df.index < end)]
+        return df if not df.empty else None
+
+    def _fill(self, ticker: str, start: pd.Timestamp, end: pd.Timestamp,
+              today: pd.Timestamp, raise_errors: bool, fetcher: Callable):
+        """Download the parts of [start, end) that are not cached yet."""
+        # Today's bar may still change, so never mark it as cached
+        fetch_end = min(end, today + timedelta(days=1))
+        covered_end = min(end, today)
+        have = self.coverage(ticker)
+
+        if have is None:
+            missing = [(start, fetch_end)]
+        else:
+            missing = []
+            if start < have[0]:
+                missing.append((start, have[0]))
+            updated = pd.Timestamp(self._index[ticker]['updated'])
+            recent = datetime.now() - updated < self.refresh_after
+            if fetch_end > have[1] and not (have[1] >= today and recent):
+                missing.append((have[1], fetch_end))
+        missing = [(s, e) for s, e in missing if s < e]
+        if not missing:
+            return
+
+        new_start = start if have is None else min(start, have[0])
+        new_end = covered_end if have is None else max(covered_end, have[1])
+
+        cached = self._clean(self._read(ticker))
+        parts = [cached]
+        try:
+            for s, e in missing:
+                fetched = self._download(fetcher, ticker, s, e, required=cached.empty)
+                if have is not None and s >= have[1] and self._new_actions(cached, fetched):
+                    # New dividend or split: the cached prices were adjusted
+                    # on the old basis, so replace the whole range
+                    parts = [self._download(fetcher, ticker, new_start, fetch_end,
+                                            required=True)]
+                    break
+                parts.append(fetched)
+        except Exception as err:
+            if raise_errors:
+                raise
+            # No network (or a bad response): fall back to cached data
+            print(f"⚠️ Could not download {ticker}: {err}")
+            return
+
+        parts = [p for p in parts if not p.empty]
+        if parts:
+            self._write(ticker, self._merge(parts))
+
+        self._set_coverage(ticker, new_start, max(new_end, new_start))
+
+    def _download(self, fetcher: Callable, ticker: str, start: pd.Timestamp,
+                  end: pd.Timestamp, required: bool) -> pd.DataFrame:
+        """Cleaned bars for [start, end); no bars raises if `required`."""
+        fetched = self._clean(fetcher(ticker, start.strftime('%Y-%m-%d'),
+                                      end.strftime('%Y-%m-%d')))
+        if fetched.empty and required:
+            # Nothing stored to border on: an empty answer is as likely a
+            # rate limit or network error as a range without trading days
+            raise LookupError(f"No data from {start:%Y-%m-%d} to {end:%Y-%m-%d}")
+        return fetched
+
+    def put(self, ticker: str, df: pd.DataFrame):
+        """
+        Add already-downloaded data to the cache (e.g. from save_stock_data).
+
+        The index coverage is extended to the first/last date in df.
+        """
+        df = self._clean(df)
+        if df.empty:
+            return
+        old = self._read(ticker)
+        self._write(ticker, df if old is None else self._merge([old, df]))
+
+        have = self.coverage(ticker)
+        start, end = df.index[0], df.index[-1] + timedelta(days=1)
+        if have is not None and start <= have[1] and end >= have[0]:
+            start, end = min(start, have[0]), max(end, have[1])
+        elif have is not None:
+            # Not contiguous with what is cached: keep the newest range
+            start, end = (start, end) if start > have[0] else have
+        self._set_coverage(ticker, start, end)
+
+    def invalidate(self, ticker: str):
+        """
+        Forget a ticker, e.g. after a corporate action the cache cannot see
+        (a custom fetcher without Dividends / Stock Splits columns).
+        """
+        with self._lock:
+            self._index.pop(ticker, None)
+            self._memory.pop(ticker, None)
+            if self.path(ticker).exists():
+                self.path(ticker).unlink()
+            self._save_index()
+
+    def tickers(self):
+        """Tickers currently in the cache."""
+        return sorted(self._index)
+
+    # ========== Notebook-compatible helpers ==========
+
+    def get_data(self, ticker: str, start, end) -> Optional[pd.DataFrame]:
+        """Same signature as get_data() in the backtesting notebook."""
+        return self.get(ticker, start, end)
+
+    def get_stock_data(self, ticker: str, period: str = '1y') -> Optional[pd.DataFrame]:
+        """Same signature as get_stock_data() in the screener notebook."""
+        return self.get(ticker, period_to_start(period))
+
+    def load_stock_data(self, ticker: str) -> Optional[pd.DataFrame]:
+        """Everything cached for a ticker, without downloading."""
+        df = self._read(ticker)
+        return df if df is not None and not df.empty else None
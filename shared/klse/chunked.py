@@ -0,0 +1,392 @@
+"""
+Out-of-Core Backtesting
+Runs the notebook pipeline (add_indicators -> strategy -> backtest ->
+calc_metrics) over a price history in fixed-size chunks, so a history that
+does not fit in memory can still be backtested. Peak memory depends on the
+chunk size, not on the length of the history.
+
+Nothing is recomputed from a warm-up window: every kernel from indicators.py
+is continued from the state it ended the previous chunk with.
+
+- SMA: running sum and its last `length` values
+- EMA, MACD, RSI: the recursion's last value (chunks start on the same
+  row blocks as one full-length call, see indicators._decay_filter)
+- Signal, position, previous close and cumulative equity
+
+The Signal, Strategy_Returns and Portfolio of every row are bit-for-bit the
+values run_backtest() computes with the whole history in memory.
+"""
+
+import math
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .indicators import _decay_block, _decay_filter
+from .metrics import StreamingMetrics
+
+
+CHUNK_ROWS = 65536
+
+INDICATOR_COLUMNS = ['SMA_20', 'SMA_50', 'SMA_200', 'RSI',
+                     'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9']
+
+
+# ========== Reading a source in chunks ==========
+
+def iter_frames(source, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Read a price history piece by piece.
+
+    source can be a Parquet file (e.g. PriceCache.path(ticker)), a CSV file
+    with the dates in the first column, a DataFrame, or any iterable of
+    DataFrames in date order. Files are never loaded whole.
+    """
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_rows):
+            yield source.iloc[start:start + chunk_rows]
+        return
+    if isinstance(source, (str, Path)):
+        path = Path(source)
+        if path.suffix == '.parquet':
+            yield from _iter_parquet(path, chunk_rows)
+        elif path.suffix == '.csv':
+            yield from pd.read_csv(path, index_col=0, parse_dates=True,
+                                   chunksize=chunk_rows)
+        else:
+            raise ValueError(f"Unsupported file type: {path.suffix}")
+        return
+    yield from source
+
+
+def _iter_parquet(path: Path, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    import pyarrow.parquet as pq
+
+    file = pq.ParquetFile(path)
+    meta = file.schema_arrow.pandas_metadata or {}
+    index = [c for c in meta.get('index_columns', []) if isinstance(c, str)]
+    columns = index + ['Close']
+    for batch in file.iter_batches(batch_size=chunk_rows, columns=columns):
+        frame = batch.to_pandas()
+        # pyarrow restores the index from the pandas metadata when it can
+        yield frame.set_index(index) if set(index) <= set(frame.columns) else frame
+
+
+def _rechunk(frames: Iterable[pd.DataFrame], rows: int) -> Iterator[pd.DataFrame]:
+    """Regroup frames into chunks of exactly `rows` rows (the last may be shorter)."""
+    buffer, buffered = [], 0
+    for frame in frames:
+        frame = frame[frame['Close'].notna()]
+        buffer.append(frame)
+        buffered += len(frame)
+        while buffered >= rows:
+            joined = pd.concat(buffer) if len(buffer) > 1 else buffer[0]
+            yield joined.iloc[:rows]
+            rest = joined.iloc[rows:]
+            buffer, buffered = [rest], len(rest)
+    if buffered:
+        yield pd.concat(buffer) if len(buffer) > 1 else buffer[0]
+
+
+# ========== Indicator state ==========
+# Each update() takes one chunk of values plus their row numbers in the full
+# history and returns what the matching kernel in indicators.py returns for
+# those rows.
+
+class _SMA:
+    def __init__(self, length: int):
+        self.length = length
+        self.first = None
+        self.origin = 0.0
+        # Last `length` values of the running sum (starts with csum[0] = 0)
+        self.tail = np.zeros(1)
+
+    def update(self, values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        if self.first is None:
+            found = np.flatnonzero(~np.isnan(values))
+            if len(found):
+                self.first = int(rows[found[0]])
+                self.origin = float(values[found[0]])
+        csum = np.cumsum(np.concatenate([self.tail[-1:],
+                                         np.nan_to_num(values - self.origin)]))[1:]
+        ext = np.concatenate([self.tail, csum])
+
+        lag = np.arange(len(values)) + len(self.tail) - self.length
+        ok = lag >= 0
+        out = np.full(len(values), np.nan)
+        out[ok] = (ext[len(self.tail):][ok] - ext[lag[ok]]) / self.length + self.origin
+        start = math.inf if self.first is None else self.first + self.length - 1
+        out[rows < start] = np.nan
+        self.tail = ext[-self.length:]
+        return out
+
+
+class _EMA:
+    def __init__(self, length: int):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.decay = 1.0 - self.alpha
+        self.block = _decay_block(self.decay)
+        self.sma = _SMA(length)
+        self.carry = np.zeros(1)
+
+    def update(self, values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        seed = self.sma.update(values, rows)
+        first = self.sma.first
+        seed_row = math.inf if first is None else first + self.length - 1
+        u = np.where(rows > seed_row, self.alpha * values, 0.0)
+        at_seed = rows == seed_row
+        u[at_seed] = np.nan_to_num(seed[at_seed])
+
+        out = _decay_filter(u[:, None], self.decay, self.carry, self.block)[:, 0]
+        self.carry = out[-1:].copy()
+        out[rows < seed_row] = np.nan
+        return out
+
+
+class _RMA:
+    def __init__(self, length: int):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.block = _decay_block(self.decay)
+        self.first = None
+        self.carry = np.zeros(1)
+
+    def update(self, values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        if self.first is None:
+            found = np.flatnonzero(~np.isnan(values))
+            if len(found):
+                self.first = int(rows[found[0]])
+        first = rows[-1] + 1 if self.first is None else self.first
+        count = np.maximum(rows - first + 1, 0)
+
+        total = _decay_filter(np.nan_to_num(values)[:, None], self.decay,
+                              self.carry, self.block)[:, 0]
+        self.carry = total[-1:]
+        weight = (1.0 - self.decay ** count) / (1.0 - self.decay)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out = total / weight
+        out[count < self.length] = np.nan
+        return out
+
+
+class _Indicators:
+    """add_indicators() for one ticker, one chunk at a time."""
+
+    def __init__(self):
+        self.sma = {n: _SMA(n) for n in (20, 50, 200)}
+        self.gain = _RMA(14)
+        self.loss = _RMA(14)
+        self.fast = _EMA(12)
+        self.slow = _EMA(26)
+        self.signal = _EMA(9)
+        self.prev_close = np.nan
+        self.row = 0
+        # Chunks must start on a row block of every recursive indicator
+        self.block = math.lcm(*(s.block for s in (self.gain, self.fast,
+                                                  self.slow, self.signal)))
+
+    def update(self, close: np.ndarray) -> Dict[str, np.ndarray]:
+        rows = np.arange(self.row, self.row + len(close))
+        self.row += len(close)
+        out = {f'SMA_{n}': s.update(close, rows) for n, s in self.sma.items()}
+
+        diff = close - np.concatenate([[self.prev_close], close[:-1]])
+        self.prev_close = close[-1]
+        pos_avg = self.gain.update(np.where(diff < 0, 0.0, diff), rows)
+        neg_avg = self.loss.update(np.where(diff > 0, 0.0, diff), rows)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out['RSI'] = 100 * pos_avg / (pos_avg + np.abs(neg_avg))
+
+        line = self.fast.update(close, rows) - self.slow.update(close, rows)
+        signal_line = self.signal.update(line, rows)
+        out['MACD_12_26_9'] = line
+        out['MACDh_12_26_9'] = line - signal_line
+        out['MACDs_12_26_9'] = signal_line
+        return out
+
+
+# ========== Strategies ==========
+# Same rules as panel.STRATEGIES, with the forward-filled RSI entry carried
+# over from the previous chunk.
+
+class _Signal:
+    def __init__(self, strategy):
+        self.strategy = strategy
+        self.last = np.nan
+
+    def __call__(self, frame: pd.DataFrame, valid: np.ndarray) -> np.ndarray:
+        if callable(self.strategy):
+            signal = np.asarray(self.strategy(frame), dtype=np.float64)
+        elif self.strategy == 'ma_crossover':
+            signal = (frame['SMA_50'] > frame['SMA_200']).to_numpy(dtype=np.float64)
+        elif self.strategy == 'macd_strategy':
+            signal = (frame['MACD_12_26_9'] > frame['MACDs_12_26_9']).to_numpy(dtype=np.float64)
+        else:
+            entries = np.where(valid & (frame['RSI'] < 30).to_numpy(), 1.0, np.nan)
+            filled = pd.Series(np.concatenate([[self.last], entries])).ffill().to_numpy()[1:]
+            self.last = filled[-1]
+            signal = np.nan_to_num(filled, nan=0.0)
+        return np.where(valid, signal, np.nan)
+
+
+# ========== Backtest ==========
+
+class ChunkedResult:
+    """
+    Output of chunked_backtest().
+
+    Attributes:
+        stats: StreamingMetrics over the valid rows
+        equity: Portfolio per row (None unless keep_equity=True)
+        rows: Number of price rows read
+    """
+
+    def __init__(self, stats: StreamingMetrics, equity: Optional[pd.Series], rows: int):
+        self.stats = stats
+        self.equity = equity
+        self.rows = rows
+
+    def metrics(self) -> dict:
+        """calc_metrics() keys plus Sortino, Calmar and exposure."""
+        return self.stats.metrics()
+
+
+def chunked_backtest(source, strategy: Union[str, Callable] = 'ma_crossover',
+                     capital: float = 100000, commission: float = 0.001,
+                     chunk_rows: int = CHUNK_ROWS,
+                     on_chunk: Optional[Callable[[pd.DataFrame], None]] = None,
+                     keep_equity: bool = False) -> ChunkedResult:
+    """
+    Backtest one ticker without loading its whole history.
+
+    Parameters:
+    -----------
+    source : str, Path, DataFrame or iterable of DataFrames
+        Price history with a Close column, in date order (see iter_frames)
+    strategy : str or callable
+        'ma_crossover', 'rsi_strategy', 'macd_strategy', or a
+        function(chunk) -> signal array that only looks at each row's own
+        indicator values (it is called once per chunk)
+    capital : float
+        Starting capital
+    commission : float
+        Cost charged on every change of position
+    chunk_rows : int
+        Rows processed at a time (rounded up to a multiple of the indicators'
+        block size, 512)
+    on_chunk : callable, optional
+        Called with each finished chunk (indicators, Valid, Signal, Position,
+        Returns, Strategy_Returns, Portfolio), e.g. to append it to a file
+    keep_equity : bool
+        Keep the Portfolio of every row in memory (off by default, since
+        that grows with the history)
+
+    Returns:
+    --------
+    ChunkedResult
+        Running metrics and, optionally, the equity curve
+
+    Notes:
+    ------
+    Signals, returns and the equity curve are identical to
+    run_backtest(Panel.from_frames({ticker: df})) for any chunk size. The
+    metrics come from StreamingMetrics, so Sharpe can differ from
+    calc_metrics() by floating-point rounding before it is rounded to 2
+    decimals. Rows without a Close are skipped; Valid only looks at Close
+    and the indicators, so pass complete OHLCV data to compare with the
+    in-memory path.
+
+    Example:
+    --------
+    >>> cache = PriceCache('data/price_cache')
+    >>> result = chunked_backtest(cache.path('1155.KL'), 'ma_crossover')
+    >>> result.metrics()
+    """
+    if isinstance(strategy, str) and strategy not in ('ma_crossover', 'rsi_strategy',
+                                                      'macd_strategy'):
+        raise ValueError(f"Unknown strategy: {strategy}")
+    indicators = _Indicators()
+    rows = -(-max(chunk_rows, 1) // indicators.block) * indicators.block
+    signal_of = _Signal(strategy)
+    stats = StreamingMetrics(capital)
+
+    prev_close = np.nan
+    prev_signal = np.nan
+    growth = 1.0
+    total_rows = 0
+    equity = []
+
+    for chunk in _rechunk(iter_frames(source, rows), rows):
+        close = chunk['Close'].to_numpy(dtype=np.float64)
+        total_rows += len(close)
+        frame = pd.DataFrame(indicators.update(close), index=chunk.index)
+        frame.insert(0, 'Close', close)
+        valid = frame.notna().all(axis=1).to_numpy()
+        frame['Valid'] = valid.astype(np.float64)
+
+        signal = signal_of(frame, valid)
+        held = np.concatenate([[prev_signal], signal[:-1]])
+        close = np.where(valid, close, np.nan)
+        position = signal - held
+        returns = close / np.concatenate([[prev_close], close[:-1]]) - 1
+        strategy_returns = returns * held - np.abs(position) * commission
+
+        # Cumulative product that skips NaN, continued from the last chunk
+        factor = 1 + strategy_returns
+        missing = np.isnan(factor)
+        cum = np.cumprod(np.concatenate([[growth], np.where(missing, 1.0, factor)]))[1:]
+        growth = cum[-1]
+        cum[missing] = np.nan
+        portfolio = capital * cum
+
+        stats.update_many(strategy_returns[valid], held[valid], chunk.index[valid])
+        prev_close, prev_signal = close[-1], signal[-1]
+
+        if on_chunk is not None or keep_equity:
+            frame['Signal'] = signal
+            frame['Position'] = position
+            frame['Returns'] = returns
+            frame['Strategy_Returns'] = strategy_returns
+            frame['Portfolio'] = portfolio
+            if on_chunk is not None:
+                on_chunk(frame)
+            if keep_equity:
+                equity.append(frame['Portfolio'])
+
+    curve = pd.concat(equity) if equity else None
+    return ChunkedResult(stats, curve, total_rows)
+
+
+def chunked_run(sources: Dict[str, object], strategy: Union[str, Callable] = 'ma_crossover',
+                capital: float = 100000, commission: float = 0.001,
+                chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """
+    chunked_backtest() for many tickers, one at a time.
+
+    Parameters:
+    -----------
+    sources : dict
+        {ticker: source} (file path, DataFrame or iterable of DataFrames)
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row of metrics per ticker; tickers without enough history for
+        the indicators are left out
+
+    Example:
+    --------
+    >>> cache = PriceCache('data/price_cache')
+    >>> chunked_run({t: cache.path(t) for t in cache.tickers()}, 'macd_strategy')
+    """
+    rows = {}
+    for ticker, source in sources.items():
+        result = chunked_backtest(source, strategy, capital, commission, chunk_rows)
+        if result.stats.first_date is not None:
+            rows[ticker] = result.metrics()
+    table = pd.DataFrame.from_dict(rows, orient='index')
+    table.index.name = 'Ticker'
+    return table
@@ -0,0 +1,292 @@
+"""
+Bulk Concurrent Price Downloader
+Downloads hundreds of .KL tickers in parallel with a bounded thread pool,
+rate limiting, retries with exponential backoff and per-ticker error reporting.
+
+Screening the whole market one ticker at a time is dominated by waiting for
+the network. Here up to max_workers requests are in flight at once, while the
+rate limiter keeps the request rate polite for Yahoo Finance.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from .cache import PriceCache, yfinance_fetcher
+from .panel import Panel
+
+
+class DataSource:
+    """
+    Where prices come from. Subclass and implement fetch().
+
+    Instances are callables with the same (ticker, start, end) signature, so
+    they can also be passed to PriceCache(fetcher=...).
+    """
+
+    def fetch(self, ticker: str, start: str, end: str) -> pd.DataFrame:
+        """Daily OHLCV for [start, end) as a DataFrame indexed by date."""
+        raise NotImplementedError
+
+    def __call__(self, ticker: str, start: str, end: str) -> pd.DataFrame:
+        return self.fetch(ticker, start, end)
+
+
+class YahooSource(DataSource):
+    """Yahoo Finance via yfinance (the default)."""
+
+    def fetch(self, ticker: str, start: str, end: str) -> pd.DataFrame:
+        return yfinance_fetcher(ticker, start, end)
+
+
+class FrameSource(DataSource):
+    """
+    In-memory source backed by ready-made DataFrames, for tests and offline use.
+
+    Args:
+        frames: Mapping of ticker -> OHLCV DataFrame
+    """
+
+    def __init__(self, frames: Dict[str, pd.DataFrame]):
+        self.frames = frames
+
+    def fetch(self, ticker: str, start: str, end: str) -> pd.DataFrame:
+        if ticker not in self.frames:
+            raise KeyError(f"Unknown ticker: {ticker}")
+        df = self.frames[ticker]
+        return df.loc[(df.index >= pd.Timestamp(start)) & (df.index < pd.Timestamp(end))]
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: at most `rate` requests per second on average,
+    with bursts of up to `burst` requests.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request is allowed."""
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst,
+                                   self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _retry(call: Callable[[], Any], retries: int, backoff: float) -> Tuple[Any, int]:
+    """
+    call() until it succeeds, at most retries + 1 times.
+
+    After failed attempt n it waits backoff * 2**(n-1) seconds plus up to 25%
+    random jitter, so many threads retrying at once do not hit the server
+    together. Returns (result, attempts); the last error is raised if every
+    attempt fails.
+    """
+    for attempt in range(1, retries + 2):
+        try:
+            return call(), attempt
+        except Exception:
+            if attempt > retries:
+                raise
+            delay = backoff * 2 ** (attempt - 1)
+            time.sleep(delay * (1 + 0.25 * random.random()))
+
+
+def _completed(fetch: Callable[[str], Any], tickers: List[str],
+               max_workers: int) -> Iterator[Tuple[str, Future]]:
+    """Run fetch(ticker) in a thread pool, yielding (ticker, future) as each finishes."""
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch, t): t for t in tickers}
+        for future in as_completed(futures):
+            yield futures[future], future
+
+
+class FetchResult:
+    """
+    Outcome of downloading one ticker.
+
+    Attributes:
+        ticker: Stock ticker
+        data: OHLCV DataFrame, or None if the download failed
+        error: Error message, or None on success
+        attempts: Number of attempts made
+        seconds: Wall time spent on this ticker (including retries)
+    """
+
+    def __init__(self, ticker: str, data: Optional[pd.DataFrame],
+                 error: Optional[str], attempts: int, seconds: float):
+        self.ticker = ticker
+        self.data = data
+        self.error = error
+        self.attempts = attempts
+        self.seconds = seconds
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        status = f"{len(self.data)} rows" if self.ok else f"error: {self.error}"
+        return f"FetchResult({self.ticker!r}, {status}, attempts={self.attempts})"
+
+
+class BulkDownloader:
+    """
+    Concurrent downloader for many tickers.
+
+    Args:
+        source: DataSource or function(ticker, start, end) -> DataFrame
+            (default: Yahoo Finance)
+        max_workers: Maximum downloads in flight at once
+        rate_limit: Maximum requests per second (0 = unlimited)
+        retries: Extra attempts after a failed download
+        backoff: Base delay in seconds; attempt n waits backoff * 2**(n-1)
+            plus a little random jitter
+        cache: Optional PriceCache; cached days are read from disk and only
+            missing days are downloaded
+
+    Example:
+        >>> downloader = BulkDownloader(max_workers=8, rate_limit=4)
+        >>> for result in downloader.iter_download(tickers, '2021-01-01', '2024-01-01'):
+        ...     print(result)
+        >>> panel, errors = downloader.download_panel(tickers, '2021-01-01', '2024-01-01')
+    """
+
+    def __init__(self, source: Optional[Union[DataSource, Callable]] = None,
+                 max_workers: int = 8, rate_limit: float = 5.0,
+                 retries: int = 3, backoff: float = 1.0,
+                 cache: Optional[PriceCache] = None):
+        self.source = source or YahooSource()
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(rate_limit, burst=max_workers)
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache
+
+    def _fetch_once(self, ticker: str, start: str, end: str) -> pd.DataFrame:
+        if self.cache is None:
+            self.limiter.acquire()
+            df = self.source(ticker, start, end)
+        else:
+            def limited(t, s, e):
+                self.limiter.acquire()
+                return self.source(t, s, e)
+
+            # Missing days are downloaded through this downloader's source
+            df = self.cache.get(ticker, start, end, raise_errors=True,
+                                fetcher=limited)
+        if df is None or df.empty:
+            # Yahoo answers rate limits and network errors with an empty
+            # frame too, so no data is retried like any other failure
+            raise LookupError('no data')
+        return df
+
+    def _fetch(self, ticker: str, start: str, end: str) -> FetchResult:
+        began = time.monotonic()
+        try:
+            df, attempts = _retry(lambda: self._fetch_once(ticker, start, end),
+                                  self.retries, self.backoff)
+        except Exception as err:
+            return FetchResult(ticker, None, f"{type(err).__name__}: {err}",
+                               self.retries + 1, time.monotonic() - began)
+        if isinstance(df.columns, pd.MultiIndex):
+            df = df.droplevel(-1, axis=1)
+        return FetchResult(ticker, df, None, attempts, time.monotonic() - began)
+
+    def iter_download(self, tickers: Iterable[str], start, end) -> Iterator[FetchResult]:
+        """
+        Download tickers concurrently, yielding each result as it completes.
+
+        Parameters:
+        -----------
+        tickers : iterable of str
+            Stock tickers (e.g., ['1155.KL', '1295.KL'])
+        start, end : str or datetime
+            Date range, end exclusive like yf.download
+
+        Yields:
+        -------
+        FetchResult
+            One per ticker, in completion order
+        """
+        start = pd.Timestamp(start).strftime('%Y-%m-%d')
+        end = pd.Timestamp(end).strftime('%Y-%m-%d')
+        tickers = list(dict.fromkeys(tickers))
+
+        for _, future in _completed(lambda t: self._fetch(t, start, end), tickers,
+                                    self.max_workers):
+            yield future.result()
+
+    def download(self, tickers: Iterable[str], start, end,
+                 progress: bool = False):
+        """
+        Download tickers concurrently and collect the results.
+
+        Returns:
+        --------
+        tuple
+            (frames, errors): dict of ticker -> DataFrame for successful
+            downloads, and a DataFrame with Ticker / Error / Attempts for
+            failed ones
+        """
+        tickers = list(dict.fromkeys(tickers))
+        frames, failed = {}, []
+        for done, result in enumerate(self.iter_download(tickers, start, end), 1):
+            if result.ok:
+                frames[result.ticker] = result.data
+            else:
+                failed.append({'Ticker': result.ticker, 'Error': result.error,
+                               'Attempts': result.attempts})
+            if progress:
+                print(f"\r[{done}/{len(tickers)}] {result.ticker:<10}", end='')
+        if progress:
+            print(f"\n[OK] {len(frames)} downloaded, {len(failed)} failed")
+
+        # Keep the caller's ticker order rather than completion order
+        frames = {t: frames[t] for t in tickers if t in frames}
+        errors = pd.DataFrame(failed, columns=['Ticker', 'Error', 'Attempts'])
+        return frames, errors
+
+    def download_panel(self, tickers: Iterable[str], start, end,
+                       progress: bool = False):
+        """
+        Download tickers concurrently into one (dates x tickers) Panel.
+
+        Returns:
+        --------
+        tuple
+            (panel, errors) - see download() for the errors table
+        """
+        frames, errors = self.download(tickers, start, end, progress)
+        return Panel.from_frames(frames), errors
+
+
+def download_many(tickers: List[str], start, end, **kwargs):
+    """
+    Shortcut for BulkDownloader(**kwargs).download(tickers, start, end).
+
+    Example:
+    --------
+    >>> frames, errors = download_many(KLSE_TICKERS, '2021-01-01', '2024-01-01',
+    ...                                max_workers=16, rate_limit=8)
+    """
+    progress = kwargs.pop('progress', False)
+    return BulkDownloader(**kwargs).download(tickers, start, end, progress)
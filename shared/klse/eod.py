@@ -0,0 +1,365 @@
+"""
+End-of-Day Screening Runner
+Runs the screener without a notebook: after the market closes it refreshes
+the cached prices and fundamentals, brings the incremental indicator state of
+every stock up to date, evaluates a set of saved screens and writes the
+results, with a timestamp, to an SQLite file.
+
+Notebooks and dashboards then read the stored results (ResultStore) instead
+of downloading and recomputing the whole pipeline every time they open.
+
+Usage (from the shared/ directory):
+    python -m klse.eod run --tickers-file tickers.txt          # once, now
+    python -m klse.eod schedule --at 18:00                     # every weekday after the close
+    python -m klse.eod show --screen oversold_uptrend          # latest stored matches
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from .cache import PriceCache, period_to_start
+from .downloader import BulkDownloader
+from .fundamentals import COLUMNS as FUNDAMENTAL_COLUMNS, FundamentalsCache
+from .incremental import INDICATOR_COLUMNS, refresh_all
+from .intraday import TIMEZONE
+from .screener import FundamentalsTable
+
+
+DEFAULT_DB = 'data/eod/results.sqlite'
+
+# name -> query and ranking, in the format of a screens JSON file
+DEFAULT_SCREENS = {
+    'value': {'query': 'PE > 0 and PE < 15 and DY >= 3', 'rank_by': 'DY'},
+    'large_cap_dividend': {'query': 'MarketCap >= 10 and DY >= 4', 'rank_by': 'DY'},
+    'oversold_uptrend': {'query': 'RSI < 30 and Close > SMA_200',
+                         'rank_by': 'RSI', 'ascending': True},
+    'golden_cross': {'query': 'SMA_50 > SMA_200 and Close > SMA_50 and MACD > MACDs',
+                     'rank_by': 'MarketCap'},
+}
+
+# Columns stored for every ticker on every run (fixed, so runs stay comparable)
+SNAPSHOT_COLUMNS = (['Ticker', 'Date', 'Close'] + INDICATOR_COLUMNS
+                    + [c for c in FUNDAMENTAL_COLUMNS.values() if c != 'Ticker'])
+
+
+def load_screens(path: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    Saved screens from a JSON file ({name: {"query": ..., "rank_by": ...,
+    "ascending": ..., "top": ...}}), or DEFAULT_SCREENS.
+    """
+    if path is None:
+        return dict(DEFAULT_SCREENS)
+    with open(path, 'r', encoding='utf-8') as f:
+        screens = json.load(f)
+    for name, screen in screens.items():
+        if 'query' not in screen:
+            raise ValueError(f"Screen {name!r} has no query")
+    return screens
+
+
+def load_tickers(path: str) -> List[str]:
+    """Tickers from a text file (one per line, # comments) or a JSON list / dict."""
+    text = Path(path).read_text(encoding='utf-8')
+    if path.endswith('.json'):
+        return list(json.loads(text))
+    lines = (line.split('#')[0].strip() for line in text.splitlines())
+    return [line for line in lines if line]
+
+
+# ========== Result store ==========
+
+class ResultStore:
+    """
+    SQLite file holding every run, the per-ticker snapshot it screened and
+    the matches of each screen.
+
+    Tables:
+        runs: run_id, started, finished, as_of (latest bar date), tickers,
+            errors (JSON: ticker, or 'screen:<name>' for a screen, -> message)
+        snapshots: run_id plus SNAPSHOT_COLUMNS, one row per ticker
+        matches: run_id, screen, rank, Ticker
+
+    Example:
+        >>> store = ResultStore('data/eod/results.sqlite')
+        >>> store.latest('value')          # latest run's matches with their snapshot values
+        >>> store.history('value')         # which stocks matched, run by run
+        >>> store.runs()
+    """
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT, started TEXT, finished TEXT,
+                as_of TEXT, tickers INTEGER, errors TEXT)""")
+            db.execute("""CREATE TABLE IF NOT EXISTS matches (
+                run_id INTEGER, screen TEXT, rank INTEGER, Ticker TEXT)""")
+            db.execute("CREATE INDEX IF NOT EXISTS matches_run ON matches (run_id, screen)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path)
+
+    def write(self, started: datetime, snapshot: pd.DataFrame,
+              matches: Dict[str, pd.DataFrame], errors: Dict[str, str]) -> int:
+        """Store one run in a single transaction; returns its run_id."""
+        as_of = pd.to_datetime(snapshot['Date']).max() if len(snapshot) else None
+        snapshot = snapshot.reindex(columns=SNAPSHOT_COLUMNS)
+        snapshot['Date'] = pd.to_datetime(snapshot['Date']).dt.strftime('%Y-%m-%d')
+        with self._connect() as db:
+            cursor = db.execute(
+                "INSERT INTO runs (started, finished, as_of, tickers, errors) VALUES (?, ?, ?, ?, ?)",
+                (started.isoformat(timespec='seconds'),
+                 datetime.now(started.tzinfo).isoformat(timespec='seconds'),
+                 None if pd.isna(as_of) else as_of.strftime('%Y-%m-%d'),
+                 len(snapshot), json.dumps(errors)))
+            run_id = cursor.lastrowid
+            snapshot.insert(0, 'run_id', run_id)
+            snapshot.to_sql('snapshots', db, if_exists='append', index=False)
+            db.execute("CREATE INDEX IF NOT EXISTS snapshots_run ON snapshots (run_id, Ticker)")
+            rows = [(run_id, name, rank, ticker) for name, found in matches.items()
+                    for rank, ticker in enumerate(found['Ticker'], 1)]
+            db.executemany("INSERT INTO matches VALUES (?, ?, ?, ?)", rows)
+        return run_id
+
+    def runs(self) -> pd.DataFrame:
+        """Every stored run, newest first."""
+        with self._connect() as db:
+            return pd.read_sql("SELECT * FROM runs ORDER BY run_id DESC", db)
+
+    def last_run(self) -> Optional[int]:
+        with self._connect() as db:
+            row = db.execute("SELECT MAX(run_id) FROM runs").fetchone()
+        return row[0]
+
+    def snapshot(self, run_id: Optional[int] = None) -> pd.DataFrame:
+        """Latest values of every ticker as screened in a run (default: last run)."""
+        run_id = run_id or self.last_run()
+        with self._connect() as db:
+            try:
+                return pd.read_sql("SELECT * FROM snapshots WHERE run_id = ?", db,
+                                   params=(run_id,))
+            except pd.errors.DatabaseError:
+                return pd.DataFrame(columns=['run_id'] + SNAPSHOT_COLUMNS)
+
+    def latest(self, screen: Optional[str] = None, run_id: Optional[int] = None) -> pd.DataFrame:
+        """
+        Matches of a run (default: last run), ranked, with their snapshot values.
+        All screens unless one is named.
+        """
+        run_id = run_id or self.last_run()
+        sql = ("SELECT m.screen, m.rank, s.* FROM matches m JOIN snapshots s "
+               "ON s.run_id = m.run_id AND s.Ticker = m.Ticker WHERE m.run_id = ?")
+        params = [run_id]
+        if screen is not None:
+            sql += " AND m.screen = ?"
+            params.append(screen)
+        with self._connect() as db:
+            try:
+                return pd.read_sql(sql + " ORDER BY m.screen, m.rank", db, params=params)
+            except pd.errors.DatabaseError:
+                return pd.DataFrame(columns=['screen', 'rank', 'run_id'] + SNAPSHOT_COLUMNS)
+
+    def history(self, screen: str) -> pd.DataFrame:
+        """Tickers matching a screen in every run, with the run's as_of date."""
+        with self._connect() as db:
+            return pd.read_sql(
+                "SELECT r.run_id, r.as_of, m.rank, m.Ticker FROM matches m "
+                "JOIN runs r ON r.run_id = m.run_id WHERE m.screen = ? "
+                "ORDER BY r.run_id, m.rank", db, params=(screen,))
+
+
+# ========== Running ==========
+
+def run_eod(tickers: Iterable[str], screens: Optional[Dict[str, Dict]] = None,
+            prices: Optional[PriceCache] = None,
+            fundamentals: Optional[FundamentalsCache] = None,
+            store: Optional[ResultStore] = None, history: str = '2y',
+            max_workers: int = 8, verbose: bool = True) -> int:
+    """
+    One end-of-day run: refresh data, update indicators, screen, store.
+
+    Parameters:
+    -----------
+    tickers : iterable of str
+        Universe to screen
+    screens : dict, optional
+        name -> {'query', 'rank_by', 'ascending', 'top'} (default:
+        DEFAULT_SCREENS); see FundamentalsTable.query() for the syntax
+    prices : PriceCache, optional
+        Price cache to refresh (default: data/price_cache)
+    fundamentals : FundamentalsCache, optional
+        Fundamentals cache (default: data/fundamentals, one-day TTL)
+    store : ResultStore, optional
+        Where results go (default: DEFAULT_DB)
+    history : str
+        Price history kept in the cache ('2y' = two years)
+    max_workers : int
+        Concurrent downloads
+
+    Returns:
+    --------
+    int
+        run_id of the stored run
+    """
+    tz = ZoneInfo(TIMEZONE)
+    started = datetime.now(tz)
+    tickers = list(dict.fromkeys(tickers))
+    screens = screens if screens is not None else DEFAULT_SCREENS
+    prices = prices or PriceCache('data/price_cache')
+    fundamentals = fundamentals or FundamentalsCache('data/fundamentals')
+    store = store or ResultStore()
+
+    def log(message):
+        if verbose:
+            print(f"[{datetime.now(tz):%H:%M:%S}] {message}")
+
+    # 1. Prices: only the days missing from the cache are downloaded
+    start = period_to_start(history)
+    end = pd.Timestamp(started.date()) + timedelta(days=1)
+    downloader = BulkDownloader(max_workers=max_workers, cache=prices,
+                                source=prices.fetcher)
+    frames, price_errors = downloader.download(tickers, start, end)
+    errors = dict(zip(price_errors['Ticker'], price_errors['Error']))
+    log(f"prices: {len(frames)} tickers, {len(price_errors)} failed")
+
+    # 2. Fundamentals: fetched again only once older than the TTL
+    fundamental_table = fundamentals.get_many(tickers)
+    for ticker, error in fundamentals.errors.items():
+        errors.setdefault(ticker, error)
+    log(f"fundamentals: {len(fundamental_table)} tickers, {len(fundamentals.errors)} failed")
+
+    # 3. Indicators: each ticker's saved state only processes its new bars;
+    # a ticker that fails is recorded and left out of the screens
+    indicator_errors = {}
+    latest = refresh_all(prices, [t for t in tickers if t in frames], indicator_errors)
+    latest = latest.rename_axis('Ticker').reset_index()
+    for ticker, error in indicator_errors.items():
+        errors.setdefault(ticker, error)
+    log(f"indicators: {len(latest)} tickers up to date, {len(indicator_errors)} failed")
+
+    # 4. Screens over one table of latest indicators + fundamentals
+    snapshot = latest.merge(fundamental_table, on='Ticker', how='left') if len(latest) \
+        else pd.DataFrame(columns=SNAPSHOT_COLUMNS)
+    table = FundamentalsTable(snapshot)
+    matches = {}
+    for name, screen in screens.items():
+        try:
+            matches[name] = table.query(screen['query'], screen.get('rank_by'),
+                                        screen.get('ascending', False), screen.get('top'))
+        except Exception as err:
+            # A bad saved screen must not cost the other screens' results
+            errors[f'screen:{name}'] = f"{type(err).__name__}: {err}"
+            log(f"screen {name}: failed ({err})")
+            continue
+        log(f"screen {name}: {len(matches[name])} matches")
+
+    run_id = store.write(started, snapshot, matches, errors)
+    log(f"run {run_id} stored in {store.path}")
+    return run_id
+
+
+def next_run(at: str = '18:00', now: Optional[datetime] = None) -> datetime:
+    """Next weekday at the given Kuala Lumpur time (Bursa closes at 17:00)."""
+    tz = ZoneInfo(TIMEZONE)
+    now = now.astimezone(tz) if now is not None else datetime.now(tz)
+    hour, minute = (int(part) for part in at.split(':'))
+    candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate <= now:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def run_daily(tickers: Iterable[str], at: str = '18:00', max_runs: Optional[int] = None,
+              **kwargs):
+    """
+    Long-running scheduler: run_eod() every weekday at `at` (Kuala Lumpur
+    time) until interrupted. A failed run is reported and the scheduler
+    waits for the next day.
+    """
+    tickers = list(tickers)
+    done = 0
+    while max_runs is None or done < max_runs:
+        when = next_run(at)
+        print(f"Next run: {when:%Y-%m-%d %H:%M %Z}")
+        while True:
+            remaining = (when - datetime.now(when.tzinfo)).total_seconds()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 60))
+        try:
+            run_eod(tickers, **kwargs)
+        except Exception as err:
+            print(f"❌ Run failed: {type(err).__name__}: {err}")
+        done += 1
+
+
+# ========== Command line ==========
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='End-of-day KLSE screening')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_common(sub):
+        sub.add_argument('tickers', nargs='*', help='Tickers (or use --tickers-file)')
+        sub.add_argument('--tickers-file', help='Text file (one ticker per line) or JSON list')
+        sub.add_argument('--screens', help='JSON file of saved screens (default: built-in)')
+        sub.add_argument('--db', default=DEFAULT_DB)
+        sub.add_argument('--price-cache', default='data/price_cache')
+        sub.add_argument('--fundamentals', default='data/fundamentals')
+        sub.add_argument('--history', default='2y')
+        sub.add_argument('--workers', type=int, default=8)
+        sub.add_argument('--offline', action='store_true',
+                         help='Use cached data only, no downloads')
+
+    add_common(commands.add_parser('run', help='Run once now'))
+    schedule = commands.add_parser('schedule', help='Run every weekday after the close')
+    add_common(schedule)
+    schedule.add_argument('--at', default='18:00', help='Kuala Lumpur time (default: 18:00)')
+    show = commands.add_parser('show', help='Print stored results')
+    show.add_argument('--db', default=DEFAULT_DB)
+    show.add_argument('--screen', help='Only this screen')
+    show.add_argument('--runs', action='store_true', help='List runs instead')
+    args = parser.parse_args(argv)
+
+    if args.command == 'show':
+        store = ResultStore(args.db)
+        if args.runs:
+            print(store.runs().to_string(index=False))
+            return 0
+        results = store.latest(args.screen)
+        columns = ['screen', 'rank', 'Ticker', 'Date', 'Close', 'RSI', 'PE Ratio',
+                   'Dividend Yield (%)']
+        print(results[columns].to_string(index=False) if len(results) else "No results stored")
+        return 0
+
+    tickers = list(args.tickers)
+    if args.tickers_file:
+        tickers += load_tickers(args.tickers_file)
+    if not tickers:
+        parser.error('no tickers given (pass them or use --tickers-file)')
+    kwargs = dict(
+        screens=load_screens(args.screens),
+        prices=PriceCache(args.price_cache, offline=args.offline),
+        fundamentals=FundamentalsCache(args.fundamentals, offline=args.offline),
+        store=ResultStore(args.db), history=args.history, max_workers=args.workers)
+    if args.command == 'run':
+        run_eod(tickers, **kwargs)
+    else:
+        run_daily(tickers, at=args.at, **kwargs)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,322 @@
+"""
+Concurrent Fundamentals Service
+Fetches fundamental data (PE, market cap, dividend yield, ...) for many .KL
+tickers at once and keeps it on disk, so screening the universe does not
+wait on one slow yf.Ticker(t).info request after another every run.
+
+Only the 13 fields the screener uses are kept from the large info dict, as
+a compact typed record (Fundamentals). Records are stored in one Parquet
+table and served from disk until they are older than the time-to-live
+(one day by default - PE, market cap and dividend yield do not need
+fresher data than that). Expired or missing tickers are fetched in a
+bounded thread pool with rate limiting and retries.
+"""
+
+import os
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from .downloader import RateLimiter, _completed, _retry
+
+
+def yfinance_info(ticker: str) -> Dict:
+    """Default fetcher: the yf.Ticker(ticker).info dict from Yahoo Finance."""
+    import yfinance as yf
+
+    return yf.Ticker(ticker).info
+
+
+def _number(value) -> Optional[float]:
+    """Float value of a numeric info field, or None if missing / not numeric."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if np.isfinite(value) else None
+
+
+class Fundamentals(NamedTuple):
+    """
+    The fundamental metrics the screener uses for one stock.
+
+    Attributes:
+        ticker: Stock ticker
+        name: Company name (the ticker if Yahoo has none)
+        sector, industry: Classification ('N/A' if unknown)
+        market_cap_b: Market capitalisation in billions
+        pe, forward_pe, eps: Trailing PE, forward PE, trailing EPS
+        dividend_yield: Dividend yield in %
+        beta: Volatility relative to the market
+        price: Current price
+        high_52w, low_52w: 52-week high and low
+        fetched: When the data was downloaded (seconds since the epoch)
+    """
+
+    ticker: str
+    name: str
+    sector: str
+    industry: str
+    market_cap_b: Optional[float]
+    pe: Optional[float]
+    forward_pe: Optional[float]
+    eps: Optional[float]
+    dividend_yield: Optional[float]
+    beta: Optional[float]
+    price: Optional[float]
+    high_52w: Optional[float]
+    low_52w: Optional[float]
+    fetched: float
+
+    @classmethod
+    def from_info(cls, ticker: str, info: Dict, fetched: Optional[float] = None) -> 'Fundamentals':
+        """Extract the needed fields from a yfinance info dict."""
+        info = info or {}
+        market_cap = _number(info.get('marketCap'))
+        dividend_yield = _number(info.get('dividendYield'))
+        return cls(
+            ticker=ticker,
+            name=info.get('longName') or ticker,
+            sector=info.get('sector') or 'N/A',
+            industry=info.get('industry') or 'N/A',
+            market_cap_b=market_cap / 1e9 if market_cap else None,
+            pe=_number(info.get('trailingPE')),
+            forward_pe=_number(info.get('forwardPE')),
+            eps=_number(info.get('trailingEps')),
+            dividend_yield=dividend_yield * 100 if dividend_yield else None,
+            beta=_number(info.get('beta')),
+            price=_number(info.get('currentPrice')) or _number(info.get('regularMarketPrice')),
+            high_52w=_number(info.get('fiftyTwoWeekHigh')),
+            low_52w=_number(info.get('fiftyTwoWeekLow')),
+            fetched=time.time() if fetched is None else fetched,
+        )
+
+    def to_dict(self) -> Dict:
+        """The dict returned by get_fundamentals() in the screener notebook."""
+        return {column: getattr(self, field) for field, column in COLUMNS.items()}
+
+
+# Record field -> screener column name, in the notebook's column order
+COLUMNS = {
+    'ticker': 'Ticker',
+    'name': 'Name',
+    'sector': 'Sector',
+    'industry': 'Industry',
+    'market_cap_b': 'Market Cap (B)',
+    'pe': 'PE Ratio',
+    'forward_pe': 'Forward PE',
+    'eps': 'EPS',
+    'dividend_yield': 'Dividend Yield (%)',
+    'beta': 'Beta',
+    'price': 'Current Price',
+    'high_52w': '52W High',
+    'low_52w': '52W Low',
+}
+
+_TEXT_FIELDS = ['ticker', 'name', 'sector', 'industry']
+
+
+def to_frame(records: Iterable[Fundamentals]) -> pd.DataFrame:
+    """Records as a DataFrame with the screener's column names."""
+    df = pd.DataFrame(list(records), columns=list(Fundamentals._fields))
+    numeric = [f for f in COLUMNS if f not in _TEXT_FIELDS]
+    df[numeric] = df[numeric].astype('float64')
+    return df[list(COLUMNS)].rename(columns=COLUMNS)
+
+
+class FundamentalsCache:
+    """
+    On-disk fundamentals store with a time-to-live and concurrent refresh.
+
+    Args:
+        cache_dir: Directory for the fundamentals table
+        ttl: How long a record is served from disk before it is fetched again
+        fetcher: function(ticker) -> info dict (default: yf.Ticker(t).info)
+        max_workers: Maximum requests in flight at once
+        rate_limit: Maximum requests per second (0 = unlimited)
+        retries: Extra attempts after a failed request
+        backoff: Base delay in seconds; attempt n waits backoff * 2**(n-1)
+        offline: Never fetch; serve whatever is stored, however old
+
+    Attributes:
+        errors: Ticker -> error message for the tickers the last get_many()
+            could not fetch (expired records are still served for them)
+
+    Example:
+        >>> fundamentals = FundamentalsCache('data/fundamentals', ttl=timedelta(days=1))
+        >>> stocks_df = fundamentals.get_many(KLSE_STOCKS)    # concurrent, first run
+        >>> stocks_df = fundamentals.get_many(KLSE_STOCKS)    # from disk
+        >>> fundamentals.get('1155.KL').pe
+    """
+
+    def __init__(self, cache_dir: str = 'data/fundamentals',
+                 ttl: timedelta = timedelta(days=1),
+                 fetcher: Optional[Callable[[str], Dict]] = None,
+                 max_workers: int = 8, rate_limit: float = 4.0,
+                 retries: int = 2, backoff: float = 1.0,
+                 offline: bool = False):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.fetcher = fetcher or yfinance_info
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(rate_limit, burst=max_workers)
+        self.retries = retries
+        self.backoff = backoff
+        self.offline = offline
+        self.errors: Dict[str, str] = {}
+        self._file = self.cache_dir / 'fundamentals.parquet'
+        self._lock = threading.Lock()
+        self._records: Dict[str, Fundamentals] = self._load()
+
+    # ========== Storage ==========
+
+    def _load(self) -> Dict[str, Fundamentals]:
+        if not self._file.exists():
+            return {}
+        df = pd.read_parquet(self._file)
+        df = df.astype(object).where(df.notna(), None)
+        return {row[0]: Fundamentals(*row) for row in df.itertuples(index=False, name=None)}
+
+    def _save(self):
+        df = pd.DataFrame(list(self._records.values()), columns=list(Fundamentals._fields))
+        for field in Fundamentals._fields:
+            if field not in _TEXT_FIELDS:
+                df[field] = df[field].astype('float64')
+        tmp = self._file.with_suffix('.tmp')
+        df.to_parquet(tmp, index=False, compression='zstd')
+        os.replace(tmp, self._file)
+
+    def is_fresh(self, ticker: str) -> bool:
+        """True if a record is stored for ticker and is younger than the TTL."""
+        record = self._records.get(ticker)
+        return (record is not None
+                and time.time() - record.fetched < self.ttl.total_seconds())
+
+    # ========== Fetching ==========
+
+    def _fetch_once(self, ticker: str) -> Fundamentals:
+        self.limiter.acquire()
+        return Fundamentals.from_info(ticker, self.fetcher(ticker))
+
+    def _fetch(self, ticker: str) -> Fundamentals:
+        """One ticker's record, with the downloader's retries and backoff."""
+        return _retry(lambda: self._fetch_once(ticker), self.retries, self.backoff)[0]
+
+    def refresh(self, tickers: Iterable[str], progress: bool = False) -> Dict[str, str]:
+        """
+        Fetch tickers concurrently (whether fresh or not) and store them.
+
+        Returns:
+        --------
+        dict
+            Ticker -> error message for the tickers that failed
+        """
+        tickers = list(dict.fromkeys(tickers))
+        errors = {}
+        if not tickers:
+            return errors
+        for done, (ticker, future) in enumerate(
+                _completed(self._fetch, tickers, self.max_workers), 1):
+            try:
+                record = future.result()
+                with self._lock:
+                    self._records[ticker] = record
+            except Exception as err:
+                errors[ticker] = f"{type(err).__name__}: {err}"
+            if progress:
+                print(f"\r[{done}/{len(tickers)}] {ticker:<10}", end='')
+        if progress:
+            print(f"\n[OK] {len(tickers) - len(errors)} fetched, {len(errors)} failed")
+        with self._lock:
+            self._save()
+        return errors
+
+    # ========== Public API ==========
+
+    def get(self, ticker: str) -> Optional[Fundamentals]:
+        """Record for one ticker, fetched only if missing or expired."""
+        self.get_records([ticker])
+        return self._records.get(ticker)
+
+    def get_records(self, tickers: Iterable[str], refresh: bool = False,
+                    progress: bool = False) -> List[Fundamentals]:
+        """
+        Records for many tickers, fetching the missing or expired ones
+        concurrently.
+
+        Parameters:
+        -----------
+        tickers : iterable of str
+            Stock tickers (a dict such as KLSE_STOCKS uses its keys)
+        refresh : bool
+            Fetch every ticker, even if its record is still fresh
+        progress : bool
+            Print a progress line while fetching
+
+        Returns:
+        --------
+        list of Fundamentals
+            In ticker order; tickers that failed and were never stored are
+            left out (see errors)
+        """
+        tickers = list(dict.fromkeys(tickers))
+        self.errors = {}
+        if not self.offline:
+            todo = tickers if refresh else [t for t in tickers if not self.is_fresh(t)]
+            self.errors = self.refresh(todo, progress)
+        return [self._records[t] for t in tickers if t in self._records]
+
+    def get_many(self, tickers: Iterable[str], refresh: bool = False,
+                 progress: bool = False) -> pd.DataFrame:
+        """
+        Fundamentals table for many tickers (same columns as the screener's
+        stocks_df). See get_records() for the parameters.
+        """
+        return to_frame(self.get_records(tickers, refresh, progress))
+
+    def frame(self) -> pd.DataFrame:
+        """Every stored record, with a Fetched timestamp column."""
+        records = list(self._records.values())
+        df = to_frame(records)
+        df['Fetched'] = pd.to_datetime([r.fetched for r in records], unit='s')
+        return df
+
+    def invalidate(self, ticker: Optional[str] = None):
+        """Forget one ticker (or every ticker) so it is fetched again."""
+        with self._lock:
+            if ticker is None:
+                self._records.clear()
+            else:
+                self._records.pop(ticker, None)
+            self._save()
+
+    def tickers(self) -> List[str]:
+        """Tickers currently stored."""
+        return sorted(self._records)
+
+    def stats(self) -> Dict[str, int]:
+        """Number of stored records and how many of them are still fresh."""
+        fresh = sum(self.is_fresh(t) for t in self._records)
+        return {'records': len(self._records), 'fresh': fresh,
+                'expired': len(self._records) - fresh}
+
+
+def fetch_fundamentals(tickers: Iterable[str], cache_dir: str = 'data/fundamentals',
+                       ttl: timedelta = timedelta(days=1), **kwargs) -> pd.DataFrame:
+    """
+    Shortcut for FundamentalsCache(cache_dir, ttl, **kwargs).get_many(tickers).
+
+    Example:
+    --------
+    >>> stocks_df = fetch_fundamentals(KLSE_STOCKS, max_workers=16)
+    """
+    progress = kwargs.pop('progress', False)
+    return FundamentalsCache(cache_dir, ttl, **kwargs).get_many(tickers, progress=progress)
@@ -0,0 +1,423 @@
+"""
+Incremental Indicator Engine
+Keeps the running state behind add_technical_indicators() for one ticker, so a
+new daily bar updates every indicator in O(1) instead of recomputing the full
+history.
+
+- SMA / Volume SMA: ring buffer + running sum
+- EMA, MACD: recursive state, seeded with an SMA like pandas_ta
+- RSI, ATR: Wilder (RMA) recursive state
+- Bollinger Bands: ring buffer of the last 20 closes
+
+Values match the batch pandas_ta output used in the notebooks (same column
+names, same warm-up). The state can be saved as JSON next to the cached prices
+and picked up again the next day.
+"""
+
+import json
+import math
+import os
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from .cache import PriceCache
+
+
+NAN = float('nan')
+
+
+def _ewm_alpha(span: Optional[float] = None, alpha: Optional[float] = None) -> float:
+    """Smoothing factor exactly as pandas derives it (via the centre of mass)."""
+    if span is not None:
+        com = (span - 1) / 2.0
+    else:
+        com = (1.0 - alpha) / alpha
+    return 1.0 / (1.0 + com)
+
+
+# ========== Building blocks ==========
+
+class RollingMean:
+    """Simple moving average over the last `length` values."""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.window = deque(maxlen=length)
+        self.total = 0.0
+        self._updates = 0
+
+    def update(self, x: float) -> float:
+        if math.isnan(x):
+            # A missing value is skipped: the window keeps the last valid ones
+            return NAN
+        if len(self.window) == self.length:
+            self.total -= self.window[0]
+        self.window.append(x)
+        self.total += x
+        self._updates += 1
+        if self._updates % self.length == 0:
+            # Re-sum now and then so rounding errors never build up
+            self.total = math.fsum(self.window)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if len(self.window) < self.length:
+            return NAN
+        return self.total / self.length
+
+    def to_dict(self) -> Dict:
+        return {'length': self.length, 'window': list(self.window)}
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> 'RollingMean':
+        state = cls(d['length'])
+        state.window.extend(d['window'])
+        state.total = math.fsum(state.window)
+        return state
+
+
+class EMA:
+    """
+    pandas_ta EMA: NaN for the first length-1 values, then seeded with their
+    SMA and continued with pandas' adjust=False recursion.
+    """
+
+    def __init__(self, length: int):
+        self.length = length
+        self.alpha = _ewm_alpha(span=length)
+        self.count = 0
+        self.seed_total = 0.0
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        if math.isnan(x):
+            # Skipped like a dropped row; the carried value is untouched
+            return NAN
+        self.count += 1
+        if self.count < self.length:
+            self.seed_total += x
+            return NAN
+        if self.count == self.length:
+            self.value = (self.seed_total + x) / self.length
+            return self.value
+        if self.value != x:
+            old_wt = 1.0 - self.alpha
+            self.value = ((old_wt * self.value + self.alpha * x)
+                          / (old_wt + self.alpha))
+        return self.value
+
+    def to_dict(self) -> Dict:
+        return {'length': self.length, 'count': self.count,
+                'seed_total': self.seed_total, 'value': self.value}
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> 'EMA':
+        state = cls(d['length'])
+        state.count, state.seed_total, state.value = d['count'], d['seed_total'], d['value']
+        return state
+
+
+class Wilder:
+    """
+    Wilder's smoothing (pandas_ta RMA): ewm(alpha=1/length, adjust=True)
+    with min_periods=length, using pandas' own recursion.
+    """
+
+    def __init__(self, length: int):
+        self.length = length
+        self.alpha = _ewm_alpha(alpha=1.0 / length)
+        self.count = 0
+        self.weight = 1.0
+        self.mean = NAN
+
+    def update(self, x: float) -> float:
+        if math.isnan(x):
+            return NAN
+        self.count += 1
+        if self.count == 1:
+            self.mean = x
+        else:
+            self.weight *= 1.0 - self.alpha
+            if self.mean != x:
+                self.mean = (self.weight * self.mean + x) / (self.weight + 1.0)
+            self.weight += 1.0
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self.mean if self.count >= self.length else NAN
+
+    def to_dict(self) -> Dict:
+        return {'length': self.length, 'count': self.count,
+                'weight': self.weight, 'mean': self.mean}
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> 'Wilder':
+        state = cls(d['length'])
+        state.count, state.weight, state.mean = d['count'], d['weight'], d['mean']
+        return state
+
+
+# ========== Per-ticker state ==========
+
+INDICATOR_COLUMNS = [
+    'SMA_20', 'SMA_50', 'SMA_200', 'EMA_20', 'RSI',
+    'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9',
+    'BBL_20_2.0', 'BBM_20_2.0', 'BBU_20_2.0', 'BBB_20_2.0', 'BBP_20_2.0',
+    'ATR', 'Volume_SMA',
+]
+
+
+class IndicatorState:
+    """
+    Running indicator state for one ticker.
+
+    Produces the same columns as add_technical_indicators() in the screener
+    notebook, one bar at a time.
+
+    Example:
+        >>> state = IndicatorState.from_history(df)      # once, O(history)
+        >>> row = state.update(date, o, h, l, c, v)      # every new bar, O(1)
+        >>> row['RSI'], row['SMA_200']
+        >>> state.save('data/price_cache/1155_KL.indicators.json')
+    """
+
+    def __init__(self):
+        self.sma = {n: RollingMean(n) for n in (20, 50, 200)}
+        self.ema_20 = EMA(20)
+        self.rsi_gain = Wilder(14)
+        self.rsi_loss = Wilder(14)
+        self.ema_fast = EMA(12)
+        self.ema_slow = EMA(26)
+        self.macd_signal = EMA(9)
+        self.bb_window = deque(maxlen=20)
+        self.atr = Wilder(14)
+        self.volume_sma = RollingMean(20)
+        self.prev_close = NAN
+        self.last_date: Optional[pd.Timestamp] = None
+        self.bars = 0
+        self.latest: Dict[str, float] = {c: NAN for c in INDICATOR_COLUMNS}
+
+    def update(self, date, open_: float, high: float, low: float, close: float,
+               volume: float) -> Dict[str, float]:
+        """
+        Add one bar and return the indicator values for it.
+
+        Bars must arrive in date order; a bar that is not newer than the
+        last one raises ValueError. A bar with a NaN close (e.g. a suspended
+        counter) leaves the price indicators' state untouched and returns
+        NaN for them, as if the row had been dropped.
+        """
+        date = pd.Timestamp(date)
+        if self.last_date is not None and date <= self.last_date:
+            raise ValueError(f"Bar {date.date()} is not after {self.last_date.date()}")
+
+        close, high, low = float(close), float(high), float(low)
+        row = {}
+        row['SMA_20'] = self.sma[20].update(close)
+        row['SMA_50'] = self.sma[50].update(close)
+        row['SMA_200'] = self.sma[200].update(close)
+        row['EMA_20'] = self.ema_20.update(close)
+
+        # RSI: Wilder-smoothed gains and losses
+        has_prev = not math.isnan(self.prev_close)
+        if has_prev and not math.isnan(close):
+            change = close - self.prev_close
+            gain = self.rsi_gain.update(change if change > 0 else 0.0)
+            loss = abs(self.rsi_loss.update(change if change < 0 else 0.0))
+            # Flat closes (new listings, suspended counters): 0 / 0 is NaN
+            row['RSI'] = 100 * gain / (gain + loss) if gain + loss > 0 else NAN
+        else:
+            row['RSI'] = NAN
+
+        # MACD: signal line starts once the MACD line exists
+        macd = self.ema_fast.update(close) - self.ema_slow.update(close)
+        signal = self.macd_signal.update(macd) if not math.isnan(macd) else NAN
+        row['MACD_12_26_9'] = macd
+        row['MACDh_12_26_9'] = macd - signal
+        row['MACDs_12_26_9'] = signal
+
+        # Bollinger Bands (population std over the last 20 closes)
+        if not math.isnan(close):
+            self.bb_window.append(close)
+        if len(self.bb_window) == 20 and not math.isnan(close):
+            mid = row['SMA_20']
+            std = math.sqrt(math.fsum((x - mid) ** 2 for x in self.bb_window) / 20)
+            lower, upper = mid - 2.0 * std, mid + 2.0 * std
+            width = upper - lower
+            if width == 0:
+                width += 2.220446049250313e-16
+            row['BBL_20_2.0'], row['BBM_20_2.0'], row['BBU_20_2.0'] = lower, mid, upper
+            row['BBB_20_2.0'] = 100 * width / mid
+            row['BBP_20_2.0'] = (close - lower) / width
+        else:
+            for col in ['BBL_20_2.0', 'BBM_20_2.0', 'BBU_20_2.0', 'BBB_20_2.0', 'BBP_20_2.0']:
+                row[col] = NAN
+
+        # ATR: Wilder-smoothed true range (needs a previous close)
+        if has_prev:
+            true_range = max(high - low, abs(high - self.prev_close),
+                             abs(self.prev_close - low))
+            if math.isnan(high) or math.isnan(low) or math.isnan(close):
+                true_range = NAN
+            row['ATR'] = self.atr.update(true_range)
+        else:
+            row['ATR'] = NAN
+
+        row['Volume_SMA'] = self.volume_sma.update(float(volume))
+
+        if not math.isnan(close):
+            self.prev_close = close
+        self.last_date = date
+        self.bars += 1
+        self.latest = row
+        return row
+
+    def update_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Feed every bar of an OHLCV frame; returns the indicator rows."""
+        rows = [self.update(date, o, h, l, c, v) for date, o, h, l, c, v in zip(
+            df.index, df['Open'], df['High'], df['Low'], df['Close'], df['Volume'])]
+        return pd.DataFrame(rows, index=df.index, columns=INDICATOR_COLUMNS)
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame) -> 'IndicatorState':
+        """Build the state by replaying a ticker's full OHLCV history."""
+        state = cls()
+        state.update_frame(df)
+        return state
+
+    # ========== Serialization ==========
+
+    def to_dict(self) -> Dict:
+        return {
+            'sma': {str(n): s.to_dict() for n, s in self.sma.items()},
+            'ema_20': self.ema_20.to_dict(),
+            'rsi_gain': self.rsi_gain.to_dict(),
+            'rsi_loss': self.rsi_loss.to_dict(),
+            'ema_fast': self.ema_fast.to_dict(),
+            'ema_slow': self.ema_slow.to_dict(),
+            'macd_signal': self.macd_signal.to_dict(),
+            'bb_window': list(self.bb_window),
+            'atr': self.atr.to_dict(),
+            'volume_sma': self.volume_sma.to_dict(),
+            'prev_close': self.prev_close,
+            'last_date': None if self.last_date is None else self.last_date.isoformat(),
+            'bars': self.bars,
+            'latest': self.latest,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> 'IndicatorState':
+        state = cls()
+        state.sma = {int(n): RollingMean.from_dict(s) for n, s in d['sma'].items()}
+        state.ema_20 = EMA.from_dict(d['ema_20'])
+        state.rsi_gain = Wilder.from_dict(d['rsi_gain'])
+        state.rsi_loss = Wilder.from_dict(d['rsi_loss'])
+        state.ema_fast = EMA.from_dict(d['ema_fast'])
+        state.ema_slow = EMA.from_dict(d['ema_slow'])
+        state.macd_signal = EMA.from_dict(d['macd_signal'])
+        state.bb_window.extend(d['bb_window'])
+        state.atr = Wilder.from_dict(d['atr'])
+        state.volume_sma = RollingMean.from_dict(d['volume_sma'])
+        state.prev_close = d['prev_close']
+        state.last_date = None if d['last_date'] is None else pd.Timestamp(d['last_date'])
+        state.bars = d['bars']
+        state.latest = d['latest']
+        return state
+
+    def save(self, path):
+        path = Path(path)
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path) -> 'IndicatorState':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+# ========== Working with the price cache ==========
+
+def state_path(cache: PriceCache, ticker: str) -> Path:
+    """Indicator state file stored next to the ticker's cached prices."""
+    return cache.path(ticker).with_suffix('.indicators.json')
+
+
+def refresh_indicators(cache: PriceCache, ticker: str) -> Optional[IndicatorState]:
+    """
+    Bring a ticker's saved indicator state up to date with its cached prices.
+
+    Only bars newer than the saved state are processed. If the cached
+    history changed underneath the state (e.g. after cache.invalidate()
+    re-downloaded adjusted prices), the state is rebuilt from scratch.
+
+    Returns:
+    --------
+    IndicatorState or None
+        Updated state (also saved to disk), or None if nothing is cached
+    """
+    prices = cache.load_stock_data(ticker)
+    if prices is None:
+        return None
+
+    path = state_path(cache, ticker)
+    state = IndicatorState.load(path) if path.exists() else None
+
+    if state is not None and state.last_date is not None:
+        # prev_close is the last valid close up to last_date (NaN closes are skipped)
+        closes = prices.loc[prices.index <= state.last_date, 'Close'].dropna()
+        still_valid = ((prices.index == state.last_date).any() and not closes.empty
+                       and math.isclose(float(closes.iloc[-1]), state.prev_close,
+                                        rel_tol=1e-9))
+        if still_valid:
+            new_bars = prices[prices.index > state.last_date]
+            if not new_bars.empty:
+                state.update_frame(new_bars)
+                state.save(path)
+            return state
+
+    state = IndicatorState.from_history(prices)
+    state.save(path)
+    return state
+
+
+def refresh_all(cache: PriceCache, tickers: Optional[List[str]] = None,
+                errors: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Refresh indicator state for many tickers and return their latest values.
+
+    Parameters:
+    -----------
+    cache : PriceCache
+        Cache holding the prices (and the saved indicator state)
+    tickers : list of str, optional
+        Tickers to refresh (default: every cached ticker; an empty list
+        refreshes none)
+    errors : dict, optional
+        If given, a ticker whose refresh fails is skipped and recorded here
+        as ticker -> error message instead of raising
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per ticker (latest bar) with the add_technical_indicators() columns
+    """
+    rows = {}
+    for ticker in cache.tickers() if tickers is None else tickers:
+        try:
+            state = refresh_indicators(cache, ticker)
+        except Exception as err:
+            if errors is None:
+                raise
+            errors[ticker] = f"{type(err).__name__}: {err}"
+            continue
+        if state is not None:
+            rows[ticker] = {'Date': state.last_date, 'Close': state.prev_close,
+                            **state.latest}
+    return pd.DataFrame.from_dict(rows, orient='index')
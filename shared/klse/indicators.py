@@ -0,0 +1,490 @@
+"""
+NumPy Technical Indicators
+Vectorized replacements for the pandas_ta indicators used in the notebooks:
+SMA, EMA, RSI (Wilder), MACD, Bollinger Bands, ATR and OBV.
+
+Every kernel takes a 1-D array (one ticker) or a 2-D (dates x tickers) array
+and returns arrays of the same shape, with the same warm-up NaNs and values as
+pandas_ta. Multi-column indicators return dicts keyed by pandas_ta's column
+names, so pd.DataFrame(macd(close), index=df.index) looks like df.ta.macd().
+
+Leading NaNs (tickers that start trading later) are handled per column. A
+ticker with gaps in the middle is computed over its own rows only, exactly as
+if the missing dates had been dropped, and the gap rows are NaN.
+
+Run `python -m klse.indicators` from the shared/ directory for a benchmark
+against pandas / pandas_ta.
+"""
+
+import math
+import time
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+
+# ========== Helpers ==========
+
+def _as_2d(values) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    return values[:, None] if values.ndim == 1 else values
+
+
+def _like(result: np.ndarray, values) -> np.ndarray:
+    """Return result with the dimensionality of the caller's input."""
+    return result[:, 0] if np.ndim(values) == 1 else result
+
+
+def _first_valid(values: np.ndarray) -> np.ndarray:
+    """Row of the first non-NaN value in each column (len(values) if none)."""
+    notna = ~np.isnan(values)
+    first = notna.argmax(axis=0)
+    first[~notna.any(axis=0)] = len(values)
+    return first
+
+
+def _gap_columns(*arrays: np.ndarray) -> np.ndarray:
+    """Columns with a NaN after their first valid value (in any input)."""
+    gaps = np.zeros(arrays[0].shape[1], dtype=bool)
+    for values in arrays:
+        isnan = np.isnan(values)
+        after_start = np.maximum.accumulate(~isnan, axis=0)
+        gaps |= (isnan & after_start).any(axis=0)
+    return gaps
+
+
+def _per_ticker(kernel: Callable[..., np.ndarray], *arrays: np.ndarray) -> np.ndarray:
+    """
+    Run a kernel that expects NaNs only at the start of each column.
+
+    Columns with gaps are computed on their valid rows only and scattered
+    back, so the result equals running the indicator ticker by ticker.
+    """
+    if arrays[0].size == 0:
+        return np.full(arrays[0].shape, np.nan)
+    gaps = _gap_columns(*arrays)
+    if not gaps.any():
+        return kernel(*arrays)
+
+    out = np.full(arrays[0].shape, np.nan)
+    clean = np.flatnonzero(~gaps)
+    if len(clean):
+        out[:, clean] = kernel(*(a[:, clean] for a in arrays))
+    for col in np.flatnonzero(gaps):
+        rows = np.ones(len(arrays[0]), dtype=bool)
+        for values in arrays:
+            rows &= ~np.isnan(values[:, col])
+        out[rows, col] = kernel(*(a[rows, col][:, None] for a in arrays))[:, 0]
+    return out
+
+
+def _decay_block(decay: float, n: int = 512) -> int:
+    """Rows per closed-form block; keeps decay**-block finite."""
+    return int(min(n, 512, max(1, 300 / -math.log(decay))))
+
+
+def _decay_filter(u: np.ndarray, decay: float, carry: np.ndarray = None,
+                  block: int = None) -> np.ndarray:
+    """
+    Solve y[t] = decay * y[t-1] + u[t] (y[-1] = carry, default 0) column-wise.
+
+    Blocks of rows are solved in closed form with cumsum, so the Python loop
+    runs over blocks rather than bars. Passing the last row of one call as
+    `carry` to the next (with chunks that start on a block boundary) gives
+    exactly the same values as one call over all rows.
+    """
+    if decay == 0:
+        return u.copy()
+    n = len(u)
+    block = _decay_block(decay, n) if block is None else block
+    powers = decay ** np.arange(block, dtype=np.float64)
+
+    y = np.empty_like(u)
+    carry = np.zeros(u.shape[1]) if carry is None else np.asarray(carry, dtype=np.float64)
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        p = powers[:stop - start, None]
+        y[start:stop] = p * (decay * carry + np.cumsum(u[start:stop] / p, axis=0))
+        carry = y[stop - 1]
+    return y
+
+
+# ========== Moving averages ==========
+
+def _sma_kernel(values: np.ndarray, length: int) -> np.ndarray:
+    n, m = values.shape
+    first = _first_valid(values)
+    # Centre each column on its first value so the running sum stays small
+    origin = np.where(first < n, values[np.minimum(first, n - 1), np.arange(m)], 0.0)
+    csum = np.zeros((n + 1, m))
+    np.cumsum(np.nan_to_num(values - origin), axis=0, out=csum[1:])
+
+    out = np.full((n, m), np.nan)
+    if length <= n:
+        out[length - 1:] = (csum[length:] - csum[:-length]) / length + origin
+    out[np.arange(n)[:, None] < (first + length - 1)[None, :]] = np.nan
+    return out
+
+
+def sma(values, length: int = 10) -> np.ndarray:
+    """Simple moving average (pandas_ta SMA_<length>)."""
+    values2d = _as_2d(values)
+    return _like(_per_ticker(lambda v: _sma_kernel(v, length), values2d), values)
+
+
+def _ema_kernel(values: np.ndarray, length: int) -> np.ndarray:
+    n, m = values.shape
+    alpha = 2.0 / (length + 1)
+    first = _first_valid(values)
+    seed_row = first + length - 1
+    cols = np.flatnonzero(seed_row < n)
+
+    rows = np.arange(n)[:, None]
+    u = np.where(rows > seed_row[None, :], alpha * values, 0.0)
+    seed = np.nan_to_num(_sma_kernel(values, length))
+    u[seed_row[cols], cols] = seed[seed_row[cols], cols]
+
+    out = _decay_filter(u, 1.0 - alpha)
+    out[rows < seed_row[None, :]] = np.nan
+    return out
+
+
+def ema(values, length: int = 10) -> np.ndarray:
+    """
+    Exponential moving average (pandas_ta EMA_<length>): NaN for the first
+    length-1 values, seeded with their SMA, then the usual recursion.
+    """
+    values2d = _as_2d(values)
+    return _like(_per_ticker(lambda v: _ema_kernel(v, length), values2d), values)
+
+
+def _rma_kernel(values: np.ndarray, length: int) -> np.ndarray:
+    n = len(values)
+    decay = 1.0 - 1.0 / length
+    first = _first_valid(values)
+    # Number of observations seen so far (pandas ewm, adjust=True)
+    count = np.maximum(np.arange(n)[:, None] - first[None, :] + 1, 0)
+
+    total = _decay_filter(np.nan_to_num(values), decay)
+    weight = (1.0 - decay ** count) / (1.0 - decay)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = total / weight
+    out[count < length] = np.nan
+    return out
+
+
+def rma(values, length: int = 10) -> np.ndarray:
+    """Wilder's moving average (pandas_ta RMA: ewm(alpha=1/length), adjust=True)."""
+    values2d = _as_2d(values)
+    return _like(_per_ticker(lambda v: _rma_kernel(v, length), values2d), values)
+
+
+# ========== Momentum ==========
+
+def _rsi_kernel(close: np.ndarray, length: int) -> np.ndarray:
+    diff = np.full_like(close, np.nan)
+    diff[1:] = close[1:] - close[:-1]
+    positive = np.where(diff < 0, 0.0, diff)
+    negative = np.where(diff > 0, 0.0, diff)
+    pos_avg = _rma_kernel(positive, length)
+    neg_avg = _rma_kernel(negative, length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 * pos_avg / (pos_avg + np.abs(neg_avg))
+
+
+def rsi(close, length: int = 14) -> np.ndarray:
+    """Relative Strength Index with Wilder smoothing (pandas_ta RSI_<length>)."""
+    close2d = _as_2d(close)
+    return _like(_per_ticker(lambda c: _rsi_kernel(c, length), close2d), close)
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    """
+    MACD line, histogram and signal line.
+
+    Returns:
+    --------
+    dict
+        {'MACD_12_26_9': ..., 'MACDh_12_26_9': ..., 'MACDs_12_26_9': ...}
+        (names follow the parameters, like df.ta.macd())
+    """
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    suffix = f"_{fast}_{slow}_{signal}"
+    return {
+        f"MACD{suffix}": line,
+        f"MACDh{suffix}": line - signal_line,
+        f"MACDs{suffix}": signal_line,
+    }
+
+
+# ========== Volatility ==========
+
+def _rolling_std(values: np.ndarray, mean: np.ndarray, length: int) -> np.ndarray:
+    """Population std over the last `length` rows (one pass per lag)."""
+    squares = np.zeros_like(values)
+    for lag in range(length):
+        lagged = np.full_like(values, np.nan)
+        lagged[lag:] = values[:len(values) - lag]
+        squares += (lagged - mean) ** 2
+    return np.sqrt(squares / length)
+
+
+def bbands(close, length: int = 20, std: float = 2.0) -> Dict[str, np.ndarray]:
+    """
+    Bollinger Bands (population standard deviation, like pandas_ta).
+
+    Returns:
+    --------
+    dict
+        {'BBL_20_2.0', 'BBM_20_2.0', 'BBU_20_2.0', 'BBB_20_2.0', 'BBP_20_2.0'}:
+        lower, middle, upper band, bandwidth (%) and %B
+    """
+    def kernel(c):
+        mid = _sma_kernel(c, length)
+        dev = _rolling_std(c, mid, length)
+        lower, upper = mid - std * dev, mid + std * dev
+        width = upper - lower
+        width = np.where(width == 0, width + np.finfo(np.float64).eps, width)
+        return np.stack([lower, mid, upper, 100 * width / mid, (c - lower) / width])
+
+    close2d = _as_2d(close)
+    gaps = _gap_columns(close2d)
+    stacked = np.full((5,) + close2d.shape, np.nan)
+    clean = np.flatnonzero(~gaps) if close2d.size else []
+    if len(clean):
+        stacked[:, :, clean] = kernel(close2d[:, clean])
+    for col in np.flatnonzero(gaps):
+        rows = ~np.isnan(close2d[:, col])
+        stacked[:, rows, col] = kernel(close2d[rows, col][:, None])[:, :, 0]
+
+    suffix = f"_{length}_{float(std)}"
+    names = ['BBL', 'BBM', 'BBU', 'BBB', 'BBP']
+    return {name + suffix: _like(values, close) for name, values in zip(names, stacked)}
+
+
+def true_range(high, low, close) -> np.ndarray:
+    """True range; NaN on the first bar (no previous close), like pandas_ta."""
+    high, low, close = _as_2d(high), _as_2d(low), _as_2d(close)
+    prev_close = np.full_like(close, np.nan)
+    prev_close[1:] = close[:-1]
+    out = np.fmax(np.abs(high - low),
+                  np.fmax(np.abs(high - prev_close), np.abs(prev_close - low)))
+    out[np.isnan(prev_close)] = np.nan
+    return out
+
+
+def atr(high, low, close, length: int = 14) -> np.ndarray:
+    """Average True Range, Wilder-smoothed (pandas_ta ATRr_<length>)."""
+    def kernel(h, l, c):
+        return _rma_kernel(true_range(h, l, c), length)
+
+    out = _per_ticker(kernel, _as_2d(high), _as_2d(low), _as_2d(close))
+    return _like(out, close)
+
+
+# ========== Volume ==========
+
+def obv(close, volume) -> np.ndarray:
+    """On-Balance Volume (pandas_ta OBV): running sum of signed volume."""
+    def kernel(c, v):
+        direction = np.ones_like(c)
+        direction[1:] = np.sign(c[1:] - c[:-1])
+        first = _first_valid(c)
+        cols = np.flatnonzero(first < len(c))
+        direction[first[cols], cols] = 1.0
+        out = np.cumsum(np.nan_to_num(direction * v), axis=0)
+        out[np.arange(len(c))[:, None] < first[None, :]] = np.nan
+        return out
+
+    return _like(_per_ticker(kernel, _as_2d(close), _as_2d(volume)), close)
+
+
+# ========== Notebook functions ==========
+
+def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    NumPy version of add_indicators() from the backtesting notebook.
+
+    Adds SMA_20, SMA_50, SMA_200, RSI and MACD_12_26_9 / MACDh_12_26_9 /
+    MACDs_12_26_9 without pandas_ta.
+    """
+    close = df['Close'].to_numpy(dtype=np.float64)
+    columns = {
+        'SMA_20': sma(close, 20),
+        'SMA_50': sma(close, 50),
+        'SMA_200': sma(close, 200),
+        'RSI': rsi(close, 14),
+        **macd(close),
+    }
+    return _assign(df, columns)
+
+
+def add_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    NumPy version of add_technical_indicators() from the screener notebook.
+
+    Same columns: SMA_20/50/200, EMA_20, RSI, MACD (3 columns), Bollinger
+    Bands (5 columns), ATR and Volume_SMA.
+    """
+    close = df['Close'].to_numpy(dtype=np.float64)
+    high = df['High'].to_numpy(dtype=np.float64)
+    low = df['Low'].to_numpy(dtype=np.float64)
+    volume = df['Volume'].to_numpy(dtype=np.float64)
+    columns = {
+        'SMA_20': sma(close, 20),
+        'SMA_50': sma(close, 50),
+        'SMA_200': sma(close, 200),
+        'EMA_20': ema(close, 20),
+        'RSI': rsi(close, 14),
+        **macd(close),
+        **bbands(close, 20, 2),
+        'ATR': atr(high, low, close, 14),
+        'Volume_SMA': sma(volume, 20),
+    }
+    return _assign(df, columns)
+
+
+def _assign(df: pd.DataFrame, columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """Copy of df with the new columns added in one concat."""
+    new = pd.DataFrame(columns, index=df.index)
+    return pd.concat([df.drop(columns=new.columns, errors='ignore'), new], axis=1)
+
+
+# ========== Benchmark ==========
+
+def _pandas_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """add_technical_indicators() through pandas_ta (as in the notebook)."""
+    import pandas_ta  # noqa: F401  (registers the df.ta accessor)
+
+    df = df.copy()
+    df['SMA_20'] = df.ta.sma(length=20)
+    df['SMA_50'] = df.ta.sma(length=50)
+    df['SMA_200'] = df.ta.sma(length=200)
+    df['EMA_20'] = df.ta.ema(length=20)
+    df['RSI'] = df.ta.rsi(length=14)
+    df = pd.concat([df, df.ta.macd()], axis=1)
+    df = pd.concat([df, df.ta.bbands(length=20, std=2)], axis=1)
+    df['ATR'] = df.ta.atr(length=14)
+    df['Volume_SMA'] = df['Volume'].rolling(window=20).mean()
+    return df
+
+
+def _pandas_reference(df: pd.DataFrame) -> pd.DataFrame:
+    """Same calculations as pandas_ta, written with pandas rolling / ewm."""
+    df = df.copy()
+    close = df['Close']
+
+    def ema_(s, n):
+        s = s.copy()
+        start = s.first_valid_index()
+        pos = s.index.get_loc(start)
+        seed = s.iloc[pos:pos + n].mean()
+        s.iloc[:pos + n - 1] = np.nan
+        s.iloc[pos + n - 1] = seed
+        return s.ewm(span=n, adjust=False).mean()
+
+    def rma_(s, n):
+        return s.ewm(alpha=1 / n, min_periods=n).mean()
+
+    for n in (20, 50, 200):
+        df[f'SMA_{n}'] = close.rolling(n).mean()
+    df['EMA_20'] = ema_(close, 20)
+    diff = close.diff()
+    pos, neg = rma_(diff.clip(lower=0), 14), rma_(diff.clip(upper=0), 14)
+    df['RSI'] = 100 * pos / (pos + neg.abs())
+    line = ema_(close, 12) - ema_(close, 26)
+    signal = ema_(line, 9)
+    df['MACD_12_26_9'], df['MACDh_12_26_9'], df['MACDs_12_26_9'] = line, line - signal, signal
+    mid, dev = close.rolling(20).mean(), close.rolling(20).std(ddof=0)
+    lower, upper = mid - 2 * dev, mid + 2 * dev
+    df['BBL_20_2.0'], df['BBM_20_2.0'], df['BBU_20_2.0'] = lower, mid, upper
+    df['BBB_20_2.0'] = 100 * (upper - lower) / mid
+    df['BBP_20_2.0'] = (close - lower) / (upper - lower)
+    prev = close.shift()
+    tr = pd.concat([df['High'] - df['Low'], (df['High'] - prev).abs(),
+                    (prev - df['Low']).abs()], axis=1).max(axis=1)
+    tr[prev.isna()] = np.nan
+    df['ATR'] = rma_(tr, 14)
+    df['Volume_SMA'] = df['Volume'].rolling(20).mean()
+    return df
+
+
+def _synthetic_ohlcv(n_days: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 5 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, n_days)))
+    high = close * (1 + np.abs(rng.normal(0, 0.01, n_days)))
+    low = close * (1 - np.abs(rng.normal(0, 0.01, n_days)))
+    return pd.DataFrame({
+        'Open': low + (high - low) * rng.random(n_days),
+        'High': high, 'Low': low, 'Close': close,
+        'Volume': rng.integers(100_000, 10_000_000, n_days).astype(np.float64),
+    }, index=pd.bdate_range('2010-01-01', periods=n_days))
+
+
+def benchmark(n_tickers: int = 200, n_days: int = 2500, repeat: int = 3) -> pd.DataFrame:
+    """
+    Time add_technical_indicators() for n_tickers stocks of n_days bars.
+
+    Compares pandas_ta (if installed), the equivalent pandas code, the NumPy
+    kernels ticker by ticker, and the NumPy kernels on one 2-D array.
+
+    Returns:
+    --------
+    pd.DataFrame
+        Seconds per method, speedup vs the slowest, and the largest
+        difference from the pandas reference
+    """
+    frames = [_synthetic_ohlcv(n_days, seed) for seed in range(n_tickers)]
+    wide = {f: np.column_stack([df[f].to_numpy() for df in frames])
+            for f in ['High', 'Low', 'Close', 'Volume']}
+
+    def all_at_once():
+        out = {
+            'SMA_20': sma(wide['Close'], 20), 'SMA_50': sma(wide['Close'], 50),
+            'SMA_200': sma(wide['Close'], 200), 'EMA_20': ema(wide['Close'], 20),
+            'RSI': rsi(wide['Close'], 14), **macd(wide['Close']),
+            **bbands(wide['Close'], 20, 2),
+            'ATR': atr(wide['High'], wide['Low'], wide['Close'], 14),
+            'Volume_SMA': sma(wide['Volume'], 20),
+        }
+        return out
+
+    methods = {
+        'pandas (rolling / ewm)': lambda: [_pandas_reference(df) for df in frames],
+        'numpy, per ticker': lambda: [add_technical_indicators(df) for df in frames],
+        'numpy, 2-D panel': all_at_once,
+    }
+    try:
+        import pandas_ta  # noqa: F401
+        methods = {'pandas_ta': lambda: [_pandas_technical_indicators(df) for df in frames],
+                   **methods}
+    except ImportError:
+        pass
+
+    rows = []
+    for name, run in methods.items():
+        best = min(_timed(run) for _ in range(repeat))
+        rows.append({'Method': name, 'Seconds': best})
+    result = pd.DataFrame(rows).set_index('Method')
+    result['Speedup'] = result['Seconds'].max() / result['Seconds']
+
+    # Accuracy check against the pandas reference on the first ticker
+    ref = _pandas_reference(frames[0])
+    fast = add_technical_indicators(frames[0])
+    cols = [c for c in fast.columns if c not in frames[0].columns]
+    result.attrs['max_abs_diff'] = float(np.nanmax(np.abs(fast[cols] - ref[cols]).to_numpy()))
+    return result
+
+
+def _timed(run: Callable) -> float:
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    table = benchmark()
+    print(table.round(3).to_string())
+    print(f"\nLargest difference from pandas: {table.attrs['max_abs_diff']:.2e}")
@@ -0,0 +1,159 @@
+"""
+Latest-Bar Technical Screening
+Screens the universe on today's indicator values without computing them over
+each stock's full history.
+
+To screen on technicals the notebook runs add_technical_indicators() over
+the whole history of every stock and then reads iloc[-1]. Only the last row
+matters, and it only depends on a trailing window:
+
+- SMA-20/50/200, Bollinger Bands, Volume SMA: exactly the last 20/50/200 bars
+- EMA, MACD, RSI and ATR are recursive, but the weight of a bar k bars back
+  decays like (1 - alpha)**k. Seeded (with an SMA, like pandas_ta) at the
+  start of a long enough window they agree with the full-history value to
+  within a chosen tolerance.
+
+latest_indicators() cuts the last tail_length() bars of every stock, lines
+them up in one (bars x tickers) array and runs the NumPy kernels once for
+the whole universe - the same work per ticker however long its history.
+screen_latest() joins the result with fundamentals and evaluates a query
+such as "RSI < 30 and Close > SMA_200 and PE < 15".
+"""
+
+import math
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import indicators
+from .incremental import INDICATOR_COLUMNS, _ewm_alpha
+from .screener import FundamentalsTable
+
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def tail_length(tolerance: float = 1e-6) -> int:
+    """
+    Trailing bars needed for the latest value of every indicator.
+
+    SMA-200 needs 200 bars. The recursive indicators need their seed
+    (26 bars for the slow MACD EMA, then 9 for the signal line) plus enough
+    bars for the seed's weight to fall below `tolerance`; the slowest decay
+    is Wilder's 13/14 (RSI, ATR).
+    """
+    slowest = max(1.0 - _ewm_alpha(span=26), 1.0 - 1.0 / 14)
+    warmup = math.ceil(math.log(tolerance) / math.log(slowest))
+    return max(200, 26 + 9 + warmup)
+
+
+def _stack_tails(frames: Dict[str, pd.DataFrame], tail: int):
+    """Last `tail` bars of every ticker, right-aligned in (field, bar, ticker) arrays."""
+    tickers = list(frames)
+    stacked = np.full((len(OHLCV_COLUMNS), tail, len(tickers)), np.nan)
+    dates = []
+    for k, ticker in enumerate(tickers):
+        df = frames[ticker]
+        if df is None or df.empty:
+            dates.append(pd.NaT)
+            continue
+        rows = min(tail, len(df))
+        for f, column in enumerate(OHLCV_COLUMNS):
+            # A view of the column's last rows: the full history is never copied
+            stacked[f, tail - rows:, k] = df[column].to_numpy()[-rows:]
+        dates.append(df.index[-1])
+    return tickers, stacked, dates
+
+
+def latest_indicators(frames: Dict[str, pd.DataFrame], tail: Optional[int] = None,
+                      tolerance: float = 1e-6) -> pd.DataFrame:
+    """
+    Latest OHLCV bar and indicator values of every ticker.
+
+    Parameters:
+    -----------
+    frames : dict
+        Ticker -> OHLCV DataFrame (e.g. from BulkDownloader.download() or a
+        PriceCache)
+    tail : int, optional
+        Trailing bars to compute over (default: tail_length(tolerance))
+    tolerance : float
+        Largest acceptable difference of EMA / MACD / RSI / ATR from the
+        full-history value, relative to the indicator's scale
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per ticker: Ticker, Date of the latest bar, OHLCV and the
+        add_technical_indicators() columns (NaN while an indicator is still
+        warming up, e.g. SMA_200 for a stock with 150 bars)
+
+    Example:
+    --------
+    >>> frames, errors = download_many(tickers, '2023-01-01', '2024-06-30')
+    >>> latest = latest_indicators(frames)
+    >>> latest.loc[latest['RSI'] < 30, ['Ticker', 'Close', 'RSI']]
+    """
+    tail = tail or tail_length(tolerance)
+    tickers, (open_, high, low, close, volume), dates = _stack_tails(frames, tail)
+
+    columns = {
+        'SMA_20': indicators.sma(close, 20),
+        'SMA_50': indicators.sma(close, 50),
+        'SMA_200': indicators.sma(close, 200),
+        'EMA_20': indicators.ema(close, 20),
+        'RSI': indicators.rsi(close, 14),
+        **indicators.macd(close),
+        **indicators.bbands(close, 20, 2),
+        'ATR': indicators.atr(high, low, close, 14),
+        'Volume_SMA': indicators.sma(volume, 20),
+    }
+    table = pd.DataFrame({'Ticker': tickers, 'Date': dates})
+    for name, values in zip(OHLCV_COLUMNS, (open_, high, low, close, volume)):
+        table[name] = values[-1]
+    for name in INDICATOR_COLUMNS:
+        table[name] = columns[name][-1]
+    return table
+
+
+def screen_latest(query: str, frames: Dict[str, pd.DataFrame],
+                  fundamentals: Optional[pd.DataFrame] = None,
+                  rank_by=None, ascending=False, top: Optional[int] = None,
+                  tail: Optional[int] = None, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    Technical + fundamental screen on the latest bar of every ticker.
+
+    Parameters:
+    -----------
+    query : str
+        Conditions on indicator and fundamental columns, e.g.
+        "RSI < 30 and Close > SMA_200 and PE < 15" (see
+        FundamentalsTable.query() for the syntax and short names)
+    frames : dict
+        Ticker -> OHLCV DataFrame
+    fundamentals : pd.DataFrame, optional
+        One row per stock with a Ticker column (stocks_df,
+        FundamentalsCache.get_many()); joined on Ticker
+    rank_by, ascending, top
+        Ranking of the matches (see FundamentalsTable.select())
+    tail : int, optional
+        Trailing bars per ticker (default: tail_length())
+    columns : list of str, optional
+        Columns to return (default: all)
+
+    Returns:
+    --------
+    pd.DataFrame
+        Matching stocks with their latest indicator values and fundamentals
+
+    Example:
+    --------
+    >>> screen_latest("RSI < 30 and Close > SMA_200 and PE < 15",
+    ...               frames, stocks_df, rank_by='RSI', ascending=True)
+    """
+    table = latest_indicators(frames, tail)
+    if fundamentals is not None:
+        table = table.merge(fundamentals, on='Ticker', how='left')
+    return FundamentalsTable(table).query(query, rank_by, ascending, top,
+                                          list(columns) if columns else None)
@@ -0,0 +1,366 @@
+"""
+Trade-Ledger Backtester
+Simulates actual orders instead of percentage returns: whole 100-share board
+lots, Bursa Malaysia trading costs (brokerage, stamp duty, clearing fee,
+service tax) and slippage. Every fill is recorded, and the result has an
+equity curve in ringgit plus a list of round-trip trades.
+
+The fast mode in panel.backtest() charges `commission` on each change of
+position and compounds returns. Use that for quick comparisons and parameter
+sweeps; use the ledger when you need realistic net results for small
+accounts, where the RM minimum brokerage and board lots make a difference.
+
+Trades are simulated one trade number at a time for all tickers together, so
+the Python loop runs over trades per ticker (dozens), not over bars.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .panel import Panel, _previous, calc_metrics
+
+
+BOARD_LOT = 100
+
+FILL_COLUMNS = [
+    'Ticker', 'Date', 'Side', 'Shares', 'Price', 'Value', 'Brokerage',
+    'Stamp Duty', 'Clearing Fee', 'Service Tax', 'Total Cost', 'Cash',
+]
+
+TRADE_COLUMNS = [
+    'Ticker', 'Entry Date', 'Entry Price', 'Exit Date', 'Exit Price', 'Shares',
+    'Costs', 'PnL', 'Return (%)', 'Bars Held',
+]
+
+
+class BursaCosts:
+    """
+    Trading costs on Bursa Malaysia, charged on both buy and sell.
+
+    Defaults follow a typical online brokerage account; check your broker's
+    rates and adjust.
+
+    Args:
+        brokerage_rate: Brokerage as a fraction of contract value (0.1%)
+        min_brokerage: Minimum brokerage per contract in RM
+        stamp_duty: RM per RM 1,000 (or part of it) of contract value
+        stamp_duty_cap: Maximum stamp duty per contract in RM
+        clearing_rate: Clearing fee as a fraction of contract value (0.03%)
+        clearing_cap: Maximum clearing fee per contract in RM
+        service_tax: SST charged on brokerage and clearing fee (8%)
+        slippage: Fraction the fill price moves against you (buys pay more,
+            sells receive less)
+        lot_size: Shares per board lot
+
+    Example:
+        >>> costs = BursaCosts(min_brokerage=8, slippage=0.001)
+        >>> costs.fees(np.array([5000.0]))['Total Cost']
+    """
+
+    def __init__(self, brokerage_rate: float = 0.001, min_brokerage: float = 8.0,
+                 stamp_duty: float = 1.5, stamp_duty_cap: float = 1000.0,
+                 clearing_rate: float = 0.0003, clearing_cap: float = 1000.0,
+                 service_tax: float = 0.08, slippage: float = 0.0,
+                 lot_size: int = BOARD_LOT):
+        self.brokerage_rate = brokerage_rate
+        self.min_brokerage = min_brokerage
+        self.stamp_duty = stamp_duty
+        self.stamp_duty_cap = stamp_duty_cap
+        self.clearing_rate = clearing_rate
+        self.clearing_cap = clearing_cap
+        self.service_tax = service_tax
+        self.slippage = slippage
+        self.lot_size = lot_size
+
+    @classmethod
+    def commission_only(cls, commission: float = 0.001, **kwargs) -> 'BursaCosts':
+        """Flat percentage cost, like the fast mode's `commission`."""
+        options = dict(brokerage_rate=commission, min_brokerage=0.0, stamp_duty=0.0,
+                       clearing_rate=0.0, service_tax=0.0)
+        options.update(kwargs)
+        return cls(**options)
+
+    def fees(self, value: np.ndarray) -> Dict[str, np.ndarray]:
+        """Cost breakdown for contracts worth `value` RM (zero for no trade)."""
+        value = np.asarray(value, dtype=np.float64)
+        traded = value > 0
+        brokerage = np.where(traded, np.maximum(value * self.brokerage_rate,
+                                                self.min_brokerage), 0.0)
+        stamp = np.minimum(np.ceil(value / 1000) * self.stamp_duty, self.stamp_duty_cap)
+        clearing = np.minimum(value * self.clearing_rate, self.clearing_cap)
+        tax = (brokerage + clearing) * self.service_tax
+        return {
+            'Brokerage': brokerage,
+            'Stamp Duty': np.where(traded, stamp, 0.0),
+            'Clearing Fee': clearing,
+            'Service Tax': tax,
+            'Total Cost': brokerage + np.where(traded, stamp, 0.0) + clearing + tax,
+        }
+
+    def total(self, value: np.ndarray) -> np.ndarray:
+        return self.fees(value)['Total Cost']
+
+    def affordable_lots(self, cash: np.ndarray, price: np.ndarray) -> np.ndarray:
+        """Largest number of board lots whose value plus costs fits in cash."""
+        lot_value = price * self.lot_size
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lots = np.floor(np.nan_to_num(cash / lot_value))
+        lots = np.maximum(lots, 0)
+        while True:
+            value = lots * lot_value
+            excess = value + self.total(value) - cash
+            over = (excess > 1e-9) & (lots > 0)
+            if not over.any():
+                return lots
+            lots[over] -= np.maximum(np.ceil(excess[over] / lot_value[over]), 1)
+            lots = np.maximum(lots, 0)
+
+
+class LedgerResult:
+    """
+    Output of ledger_backtest().
+
+    Attributes:
+        panel: Panel with Signal, Shares, Cash, Portfolio (equity in RM),
+            Strategy_Returns and BuyHold fields
+        fills: One row per executed order (see FILL_COLUMNS)
+        trades: One row per round trip; trades still open at the end have
+            no exit and are valued at the last Close
+        periods: Bars per year for the Sharpe ratio in metrics()
+        risk_free: Annual risk-free rate for metrics()
+    """
+
+    def __init__(self, panel: Panel, fills: pd.DataFrame, trades: pd.DataFrame,
+                 capital: float, periods: float = 252, risk_free: float = 0.03):
+        self.panel = panel
+        self.fills = fills
+        self.trades = trades
+        self.capital = capital
+        self.periods = periods
+        self.risk_free = risk_free
+
+    def equity(self) -> pd.DataFrame:
+        """Equity curve in RM, one column per ticker."""
+        return self.panel.frame('Portfolio')
+
+    def metrics(self) -> pd.DataFrame:
+        """calc_metrics() on the equity curve, plus cost and trade totals."""
+        result = calc_metrics(self.panel, self.capital, self.periods, self.risk_free)
+        costs = self.fills.groupby('Ticker')['Total Cost'].sum()
+        round_trips = self.trades.groupby('Ticker').size()
+        result['Costs (RM)'] = costs.reindex(result.index).fillna(0).round(2)
+        result['Round Trips'] = round_trips.reindex(result.index).fillna(0).astype(int)
+        return result
+
+
+def _held(signal: np.ndarray) -> np.ndarray:
+    """Desired holding (0/1) per bar: NaN inside the data keeps the last state."""
+    held = pd.DataFrame(signal).ffill().to_numpy()
+    return np.nan_to_num(held, nan=0.0)
+
+
+def ledger_backtest(panel: Panel, signal: np.ndarray, capital: float = 100000,
+                    costs: Optional[BursaCosts] = None,
+                    fill: str = 'close', periods: float = 252,
+                    risk_free: float = 0.03) -> LedgerResult:
+    """
+    Simulate board-lot orders with Bursa costs for every ticker.
+
+    A buy is placed whenever Signal turns 1 and a sell (of all shares)
+    whenever it turns 0. Each buy uses all available cash for as many whole
+    lots as it can afford after costs. An order on a bar without a price
+    (suspension, missing date) is filled on the ticker's next bar with one.
+
+    Parameters:
+    -----------
+    panel : Panel
+        Panel returned by add_indicators() (needs Close, and Open for
+        fill='next_open')
+    signal : np.ndarray
+        Signal array from one of the strategies (1 = long, 0 = flat)
+    capital : float
+        Starting cash per ticker in RM
+    costs : BursaCosts, optional
+        Cost model (default: BursaCosts())
+    fill : str
+        'close' fills at the Close of the signal bar (same timing as the fast
+        mode); 'next_open' fills at the next bar's Open
+    periods : float
+        Bars per year for Sharpe in metrics() (see intraday.periods_per_year())
+    risk_free : float
+        Annual risk-free rate for metrics()
+
+    Returns:
+    --------
+    LedgerResult
+        Equity panel, fills and trades
+
+    Example:
+    --------
+    >>> ind = add_indicators(panel)
+    >>> result = ledger_backtest(ind, ma_crossover(ind), capital=20000)
+    >>> result.trades.head()
+    >>> result.metrics()
+    """
+    if fill not in ('close', 'next_open'):
+        raise ValueError("fill must be 'close' or 'next_open'")
+    costs = costs or BursaCosts()
+    panel = panel.copy()
+    close = panel['Close']
+    n, m = close.shape
+    cols = np.arange(m)
+
+    # ---- Order events: bars where the desired holding changes ----
+    held = _held(signal)
+    change = np.diff(np.vstack([np.zeros((1, m)), held]), axis=0) != 0
+    ev_col, ev_row = np.nonzero(change.T)             # sorted by ticker, then bar
+    ev_buy = held[ev_row, ev_col] > 0
+    if fill == 'next_open':
+        price_field = panel['Open']
+        ev_row = ev_row + 1
+    else:
+        price_field = close
+    # Orders without a price wait for the ticker's next priced bar
+    priced_rows = np.where(np.isnan(price_field), n, np.arange(n)[:, None])
+    next_priced = np.vstack([np.minimum.accumulate(priced_rows[::-1], axis=0)[::-1],
+                             np.full((1, m), n)])
+    ev_row = next_priced[ev_row, ev_col]
+    keep = ev_row < n
+    ev_col, ev_row, ev_buy = ev_col[keep], ev_row[keep], ev_buy[keep]
+
+    counts = np.bincount(ev_col, minlength=m)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    ev_num = np.arange(len(ev_col)) - starts[ev_col]
+    n_events = int(counts.max()) if m and len(ev_col) else 0
+    event_bar = np.full((m, n_events), -1)
+    event_bar[ev_col, ev_num] = ev_row
+    event_buy = np.zeros((m, n_events), dtype=bool)
+    event_buy[ev_col, ev_num] = ev_buy
+
+    # ---- Simulate trade by trade, all tickers at once ----
+    # The account opens on the first bar with indicators (or with a Close)
+    tradable = panel['Valid'] > 0 if 'Valid' in panel else ~np.isnan(close)
+    first_valid = np.where(tradable.any(axis=0), tradable.argmax(axis=0), n)
+    cash = np.full(m, float(capital))
+    shares = np.zeros(m)
+    cash_at = np.full((n, m), np.nan)
+    shares_at = np.full((n, m), np.nan)
+    start_rows = first_valid < n
+    cash_at[first_valid[start_rows], cols[start_rows]] = capital
+    shares_at[first_valid[start_rows], cols[start_rows]] = 0.0
+
+    records = []
+    for k in range(n_events):
+        bar = event_bar[:, k]
+        active = bar >= 0
+        rows = np.where(active, bar, 0)
+        raw_price = price_field[rows, cols]
+        # Buy only when flat and sell only what is held, so an order that
+        # bought nothing (too little cash) does not turn the next one around
+        is_buy = active & event_buy[:, k] & (shares == 0)
+        is_sell = active & ~event_buy[:, k] & (shares > 0)
+        active = is_buy | is_sell
+
+        price = np.where(is_buy, raw_price * (1 + costs.slippage),
+                         raw_price * (1 - costs.slippage))
+        qty = np.where(is_buy, costs.affordable_lots(cash, price) * costs.lot_size,
+                       np.where(is_sell, shares, 0.0))
+        qty[~active] = 0
+        value = np.nan_to_num(qty * price)
+        fees = costs.fees(value)
+        executed = qty > 0
+
+        cash = np.where(is_buy & executed, cash - value - fees['Total Cost'], cash)
+        cash = np.where(is_sell, cash + value - fees['Total Cost'], cash)
+        shares = np.where(is_buy, shares + qty, np.where(is_sell, 0.0, shares))
+
+        done = np.flatnonzero(executed)
+        cash_at[bar[done], done] = cash[done]
+        shares_at[bar[done], done] = shares[done]
+        records.append({
+            'col': done, 'bar': bar[done], 'buy': is_buy[done],
+            'shares': qty[done], 'price': price[done], 'value': value[done],
+            'cash': cash[done], **{name: fee[done] for name, fee in fees.items()},
+        })
+
+    # ---- Equity curve: holdings are constant between fills ----
+    cash_at = pd.DataFrame(cash_at).ffill().to_numpy()
+    shares_at = pd.DataFrame(shares_at).ffill().to_numpy()
+    valid_close = pd.DataFrame(close).ffill().to_numpy()
+    equity = cash_at + shares_at * valid_close
+    equity[np.isnan(close)] = np.nan
+
+    panel['Signal'] = signal
+    panel['Shares'] = shares_at
+    panel['Cash'] = cash_at
+    panel['Portfolio'] = equity
+    panel['Strategy_Returns'] = equity / _previous(equity, ~np.isnan(equity)) - 1
+    panel['BuyHold'] = capital * close / close[np.minimum(first_valid, n - 1), cols]
+
+    fills = _fills_frame(panel, records)
+    trades = _trades_frame(fills, panel)
+    return LedgerResult(panel, fills.drop(columns='_bar'), trades, capital,
+                        periods, risk_free)
+
+
+def _fills_frame(panel: Panel, records) -> pd.DataFrame:
+    if not records or not sum(len(r['col']) for r in records):
+        return pd.DataFrame(columns=FILL_COLUMNS + ['_bar'])
+    cat = {key: np.concatenate([r[key] for r in records]) for key in records[0]}
+    fills = pd.DataFrame({
+        'Ticker': np.asarray(panel.tickers, dtype=object)[cat['col']],
+        'Date': panel.index[cat['bar']],
+        'Side': np.where(cat['buy'], 'BUY', 'SELL'),
+        'Shares': cat['shares'].astype(np.int64),
+        'Price': cat['price'],
+        'Value': cat['value'],
+        'Brokerage': cat['Brokerage'],
+        'Stamp Duty': cat['Stamp Duty'],
+        'Clearing Fee': cat['Clearing Fee'],
+        'Service Tax': cat['Service Tax'],
+        'Total Cost': cat['Total Cost'],
+        'Cash': cat['cash'],
+    })
+    fills['_bar'] = cat['bar']
+    fills = fills.sort_values(['Ticker', '_bar'], kind='stable').reset_index(drop=True)
+    return fills
+
+
+def _trades_frame(fills: pd.DataFrame, panel: Panel) -> pd.DataFrame:
+    """Pair each buy with the following sell of the same ticker."""
+    if fills.empty:
+        return pd.DataFrame(columns=TRADE_COLUMNS)
+
+    # Walk the position: a fill belongs to the trade numbered by the sells
+    # before it, so a buy is closed by the next sell however fills are spaced
+    sell = (fills['Side'] == 'SELL').astype(int)
+    fills = fills.assign(_k=sell.groupby(fills['Ticker']).cumsum() - sell)
+    buys = fills[fills['Side'] == 'BUY'].reset_index(drop=True)
+    sells = fills[fills['Side'] == 'SELL'].reset_index(drop=True)
+    trades = buys.merge(sells, on=['Ticker', '_k'], how='left', suffixes=('', '_exit'))
+
+    close = panel['Close']
+    last_close = pd.DataFrame(close).ffill().to_numpy()[-1]
+    col = pd.Index(panel.tickers).get_indexer(trades['Ticker'])
+    open_trade = trades['Date_exit'].isna()
+    exit_value = np.where(open_trade, trades['Shares'] * last_close[col],
+                          trades['Value_exit'])
+    exit_cost = trades['Total Cost_exit'].fillna(0).to_numpy()
+    entry_cost = trades['Value'] + trades['Total Cost']
+
+    result = pd.DataFrame({
+        'Ticker': trades['Ticker'],
+        'Entry Date': trades['Date'],
+        'Entry Price': trades['Price'],
+        'Exit Date': trades['Date_exit'],
+        'Exit Price': trades['Price_exit'],
+        'Shares': trades['Shares'],
+        'Costs': trades['Total Cost'] + exit_cost,
+        'PnL': exit_value - exit_cost - entry_cost,
+        'Return (%)': (exit_value - exit_cost) / entry_cost * 100 - 100,
+        'Bars Held': (np.where(open_trade, len(panel.index) - 1, trades['_bar_exit'])
+                      - trades['_bar']).astype(int),
+    })
+    return result[TRADE_COLUMNS]
@@ -0,0 +1,548 @@
+"""
+Streaming and Rolling Performance Metrics
+calc_metrics() measures a finished backtest once, over the whole series. This
+module keeps the same measurements up to date while the series grows, and
+computes them over a moving window without calling calc_metrics() per window.
+
+- StreamingMetrics: running totals for one strategy, O(1) per new bar
+  (Sharpe, Sortino, drawdown, CAGR, Calmar, exposure, hit rate)
+- rolling_metrics(): the same metrics over the last `window` bars, for every
+  bar and any number of runs (bars x runs arrays) in one vectorized pass
+- batch_metrics(): calc_metrics() for many runs at once, e.g. every
+  combination of a sweep, in one NumPy pass instead of one call per run
+
+Definitions follow calc_metrics(): 3% risk-free rate, 252 bars per year,
+Sharpe from the sample standard deviation, drawdown from the running peak of
+the portfolio value, hit rate = winning bars / bars with a non-zero return.
+"""
+
+import math
+import warnings
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+NAN = float('nan')
+
+METRIC_COLUMNS = [
+    'Total Return (%)',
+    'CAGR (%)',
+    'Sharpe Ratio',
+    'Max Drawdown (%)',
+    'Win Rate (%)',
+    'Total Trades',
+]
+
+ROLLING_COLUMNS = [
+    'Return (%)', 'Sharpe Ratio', 'Sortino Ratio', 'Max Drawdown (%)',
+    'Calmar Ratio', 'Exposure (%)', 'Hit Rate (%)',
+]
+
+
+# ========== Batched ==========
+
+def _as_columns(values, dtype=np.float64) -> np.ndarray:
+    """2-D array, a 1-D input becoming a single run."""
+    values = np.asarray(values, dtype=dtype)
+    return values[:, None] if values.ndim == 1 else values
+
+
+def batch_metrics(returns=None, portfolio=None, capital: float = 100000,
+                  dates=None, valid=None, periods: float = 252,
+                  risk_free: float = 0.03) -> pd.DataFrame:
+    """
+    calc_metrics() for many runs at once.
+
+    Parameters:
+    -----------
+    returns : pd.DataFrame or np.ndarray, optional
+        Strategy returns, shaped (bars x runs) like every Panel field. NaN
+        rows are skipped, like returns.dropna() in calc_metrics().
+    portfolio : pd.DataFrame or np.ndarray, optional
+        Portfolio values, same shape. Derived from the other input when only
+        one of returns / portfolio is given.
+    capital : float
+        Starting capital
+    dates : pd.DatetimeIndex, optional
+        Date of each bar, for CAGR (default: the DataFrame index; without
+        dates, years = bars / 252)
+    valid : np.ndarray, optional
+        Boolean (bars x runs) mask of the rows that belong to each run, for
+        runs that start or end on different bars (default: every row)
+    periods : float
+        Bars per year for Sharpe (252 for daily bars; see
+        intraday.periods_per_year() for minute and hourly bars)
+    risk_free : float
+        Annual risk-free rate
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per run with the calc_metrics() columns (METRIC_COLUMNS),
+        indexed by the DataFrame's columns or by run number
+
+    Notes:
+    ------
+    Each row equals calc_metrics() on that run's own rows: the span from the
+    first to the last valid row sets the dates for CAGR, the last value sets
+    the total return. Runs with no valid rows get NaN and 0 trades.
+
+    Example:
+    --------
+    >>> runs = pd.DataFrame({name: df['Strategy_Returns'] for name, df in results.items()})
+    >>> batch_metrics(runs).sort_values('Sharpe Ratio', ascending=False)
+    """
+    if returns is None and portfolio is None:
+        raise ValueError("Pass returns, portfolio or both")
+    frame = returns if isinstance(returns, pd.DataFrame) else portfolio
+    if isinstance(frame, pd.DataFrame):
+        labels = frame.columns
+        dates = frame.index if dates is None else dates
+    else:
+        labels = None
+
+    if returns is not None:
+        returns = _as_columns(returns)
+    if portfolio is not None:
+        portfolio = _as_columns(portfolio)
+    if returns is None:
+        returns = np.full_like(portfolio, np.nan)
+        returns[1:] = portfolio[1:] / portfolio[:-1] - 1
+    if portfolio is None:
+        # Cumulative product that skips NaN, like pandas' cumprod()
+        growth = np.nancumprod(1 + returns, axis=0)
+        growth[np.isnan(returns)] = np.nan
+        portfolio = capital * growth
+
+    n, m = returns.shape
+    if valid is None:
+        valid = np.ones((n, m), dtype=bool)
+    else:
+        valid = _as_columns(valid, dtype=bool)
+        returns = np.where(valid, returns, np.nan)
+        portfolio = np.where(valid, portfolio, np.nan)
+
+    has_rows = valid.any(axis=0)
+    first = valid.argmax(axis=0)
+    last = n - 1 - valid[::-1].argmax(axis=0)
+    final = np.where(has_rows, portfolio[last, np.arange(m)], np.nan)
+
+    if dates is not None:
+        dates = pd.DatetimeIndex(dates)
+        # Fractional days, so intraday runs shorter than a day still get a span
+        days = (dates[last] - dates[first]) / pd.Timedelta(days=1)
+        years = np.asarray(days, dtype=np.float64) / 365.25
+    else:
+        years = (last - first) / periods
+
+    with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        total_ret = ((final / capital) - 1) * 100
+        cagr = ((final / capital) ** (1 / years) - 1) * 100
+
+        excess = returns - (risk_free / periods)
+        sharpe = (np.sqrt(periods) * np.nanmean(excess, axis=0)
+                  / np.nanstd(returns, axis=0, ddof=1))
+
+        cummax = np.fmax.accumulate(portfolio, axis=0)
+        max_dd = np.nanmin((portfolio - cummax) / cummax, axis=0) * 100
+
+    wins = (returns > 0).sum(axis=0)
+    total = ((returns != 0) & ~np.isnan(returns)).sum(axis=0)
+    win_rate = np.where(total > 0, wins / np.maximum(total, 1) * 100, 0)
+    win_rate = np.where(has_rows, win_rate, np.nan)
+
+    return pd.DataFrame({
+        'Total Return (%)': np.round(total_ret, 2),
+        'CAGR (%)': np.round(cagr, 2),
+        'Sharpe Ratio': np.round(sharpe, 2),
+        'Max Drawdown (%)': np.round(max_dd, 2),
+        'Win Rate (%)': np.round(win_rate, 2),
+        'Total Trades': total.astype(int),
+    }, index=labels)
+
+
+# ========== Streaming ==========
+
+class StreamingMetrics:
+    """
+    Running performance metrics for one strategy.
+
+    Feed each bar's strategy return (and optionally its position) with
+    update(); every metric is available at any time from running sums, so
+    monitoring a live strategy costs O(1) per bar regardless of history.
+
+    Args:
+        capital: Starting capital
+        risk_free: Annual risk-free rate used by Sharpe and Sortino
+        periods: Bars per year
+
+    Example:
+        >>> live = StreamingMetrics(capital=100000)
+        >>> for date, ret, pos in zip(df.index, df['Strategy_Returns'], df['Signal'].shift()):
+        ...     live.update(ret, pos, date)
+        >>> live.metrics()      # same values as calc_metrics(df), plus extras
+        >>> live.sharpe, live.drawdown
+    """
+
+    def __init__(self, capital: float = 100000, risk_free: float = 0.03,
+                 periods: int = 252):
+        self.capital = capital
+        self.risk_free = risk_free
+        self.periods = periods
+        self.value = float(capital)
+        self.peak = NAN
+        self.max_drawdown = 0.0
+        self.drawdown = 0.0
+        # Welford mean / sum of squared deviations of the returns
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.downside = 0.0
+        self.wins = 0
+        self.nonzero = 0
+        self.bars = 0
+        self.exposed = 0
+        self.first_date: Optional[pd.Timestamp] = None
+        self.last_date: Optional[pd.Timestamp] = None
+
+    def update(self, ret: float, position: Optional[float] = None,
+               date=None) -> 'StreamingMetrics':
+        """
+        Add one bar.
+
+        ret is the bar's strategy return (NaN = no return yet, e.g. the first
+        bar of a backtest). position is what was held during the bar; any
+        non-zero value counts as exposed.
+        """
+        previous = self.last_date
+        if date is not None:
+            self.last_date = pd.Timestamp(date)
+        self.bars += 1
+        if position is not None and position == position and position != 0:
+            self.exposed += 1
+
+        ret = float(ret)
+        if math.isnan(ret):
+            return self
+
+        if self.count == 0 and self.last_date is not None:
+            # The first return is earned from the previous bar's close
+            self.first_date = previous if previous is not None else self.last_date
+        self.count += 1
+        delta = ret - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (ret - self.mean)
+        excess = ret - self.risk_free / self.periods
+        if excess < 0:
+            self.downside += excess * excess
+        if ret > 0:
+            self.wins += 1
+        if ret != 0:
+            self.nonzero += 1
+
+        self.value *= 1 + ret
+        if not self.value <= self.peak:
+            self.peak = self.value
+        self.drawdown = (self.value - self.peak) / self.peak
+        self.max_drawdown = min(self.max_drawdown, self.drawdown)
+        return self
+
+    def update_many(self, returns, positions=None, dates=None) -> 'StreamingMetrics':
+        """
+        Add a block of bars at once (vectorized; same result as calling
+        update() for each bar, up to rounding).
+        """
+        returns = np.asarray(returns, dtype=np.float64)
+        if len(returns) == 0:
+            return self
+        previous = self.last_date
+        if dates is not None:
+            dates = pd.DatetimeIndex(dates)
+            self.last_date = dates[-1]
+        self.bars += len(returns)
+        if positions is not None:
+            positions = np.asarray(positions, dtype=np.float64)
+            self.exposed += int((np.nan_to_num(positions) != 0).sum())
+
+        has_return = ~np.isnan(returns)
+        r = returns[has_return]
+        if len(r) == 0:
+            return self
+        if self.count == 0 and dates is not None:
+            first = int(has_return.argmax())
+            if first > 0:
+                self.first_date = dates[first - 1]
+            else:
+                self.first_date = previous if previous is not None else dates[0]
+
+        # Merge the block's mean / squared deviations (Chan et al.)
+        k = len(r)
+        block_mean = r.mean()
+        block_m2 = ((r - block_mean) ** 2).sum()
+        total = self.count + k
+        delta = block_mean - self.mean
+        self.mean += delta * k / total
+        self.m2 += block_m2 + delta * delta * self.count * k / total
+        self.count = total
+        excess = r - self.risk_free / self.periods
+        self.downside += float((np.minimum(excess, 0.0) ** 2).sum())
+        self.wins += int((r > 0).sum())
+        self.nonzero += int((r != 0).sum())
+
+        values = self.value * np.cumprod(1 + r)
+        peaks = np.fmax(np.maximum.accumulate(values), self.peak)
+        drawdowns = (values - peaks) / peaks
+        self.value = float(values[-1])
+        self.peak = float(peaks[-1])
+        self.drawdown = float(drawdowns[-1])
+        self.max_drawdown = min(self.max_drawdown, float(drawdowns.min()))
+        return self
+
+    # ========== Metrics ==========
+
+    @property
+    def total_return(self) -> float:
+        return self.value / self.capital - 1
+
+    @property
+    def years(self) -> float:
+        """
+        Calendar years from the bar before the first return to the last bar
+        (the span calc_metrics() uses), else returns / periods.
+        """
+        if self.first_date is not None:
+            return (self.last_date - self.first_date) / pd.Timedelta(days=1) / 365.25
+        return self.count / self.periods
+
+    @property
+    def cagr(self) -> float:
+        if self.years <= 0 or self.value < 0:
+            return NAN
+        return (self.value / self.capital) ** (1 / self.years) - 1
+
+    @property
+    def sharpe(self) -> float:
+        if self.count < 2 or self.m2 <= 0:
+            return NAN
+        std = math.sqrt(self.m2 / (self.count - 1))
+        return math.sqrt(self.periods) * (self.mean - self.risk_free / self.periods) / std
+
+    @property
+    def sortino(self) -> float:
+        if self.count == 0 or self.downside <= 0:
+            return NAN
+        downside_dev = math.sqrt(self.downside / self.count)
+        return math.sqrt(self.periods) * (self.mean - self.risk_free / self.periods) / downside_dev
+
+    @property
+    def calmar(self) -> float:
+        if self.max_drawdown == 0:
+            return NAN
+        return self.cagr / abs(self.max_drawdown)
+
+    @property
+    def exposure(self) -> float:
+        return self.exposed / self.bars if self.bars else NAN
+
+    @property
+    def hit_rate(self) -> float:
+        return self.wins / self.nonzero if self.nonzero else 0.0
+
+    def metrics(self) -> Dict[str, float]:
+        """calc_metrics() keys and rounding, plus Sortino, Calmar and exposure."""
+        return {
+            'Total Return (%)': round(self.total_return * 100, 2),
+            'CAGR (%)': round(self.cagr * 100, 2),
+            'Sharpe Ratio': round(self.sharpe, 2),
+            'Max Drawdown (%)': round(self.max_drawdown * 100, 2),
+            'Win Rate (%)': round(self.hit_rate * 100, 2),
+            'Total Trades': int(self.nonzero),
+            'Sortino Ratio': round(self.sortino, 2),
+            'Calmar Ratio': round(self.calmar, 2),
+            'Exposure (%)': round(self.exposure * 100, 2),
+            'Current Drawdown (%)': round(self.drawdown * 100, 2),
+        }
+
+    # ========== Serialization ==========
+
+    def to_dict(self) -> Dict:
+        d = dict(self.__dict__)
+        for key in ('first_date', 'last_date'):
+            d[key] = None if d[key] is None else d[key].isoformat()
+        return d
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> 'StreamingMetrics':
+        state = cls(d['capital'], d['risk_free'], d['periods'])
+        state.__dict__.update(d)
+        for key in ('first_date', 'last_date'):
+            if d[key] is not None:
+                setattr(state, key, pd.Timestamp(d[key]))
+        return state
+
+
+# ========== Rolling (vectorized) ==========
+
+def _window_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Sum over the last `window` rows (fewer at the start), per column."""
+    csum = np.cumsum(values, axis=0)
+    out = csum.copy()
+    out[window:] -= csum[:-window]
+    return out
+
+
+def _rolling_max_drawdown(log_value: np.ndarray, valid: np.ndarray,
+                          window: int) -> np.ndarray:
+    """
+    Largest peak-to-trough fall inside each window, from log portfolio values.
+
+    Rows are cut into blocks of `window` rows, so every window is a suffix of
+    one block plus a prefix of the next. Running max / min / drawdown within
+    blocks (forwards and backwards) then give every window in O(1) each.
+    """
+    n, m = log_value.shape
+    pad_front = window
+    n_blocks = -(-(n + pad_front) // window)
+    size = n_blocks * window
+    peaks = np.full((size, m), -np.inf)     # invalid rows can't be a peak
+    troughs = np.full((size, m), np.inf)    # ... or a trough
+    peaks[pad_front:pad_front + n] = np.where(valid, log_value, -np.inf)
+    troughs[pad_front:pad_front + n] = np.where(valid, log_value, np.inf)
+    peaks = peaks.reshape(n_blocks, window, m)
+    troughs = troughs.reshape(n_blocks, window, m)
+
+    with np.errstate(invalid='ignore'):
+        # Forwards: drawdown of every block prefix
+        prefix_max = np.maximum.accumulate(peaks, axis=1)
+        prefix_min = np.minimum.accumulate(troughs, axis=1)
+        prefix_dd = np.minimum.accumulate(troughs - prefix_max, axis=1)
+
+        # Backwards: drawdown of every block suffix
+        suffix_max = np.maximum.accumulate(peaks[:, ::-1], axis=1)[:, ::-1]
+        suffix_min = np.minimum.accumulate(troughs[:, ::-1], axis=1)[:, ::-1]
+        later_min = np.concatenate([suffix_min[:, 1:], np.full((n_blocks, 1, m), np.inf)],
+                                   axis=1)
+        suffix_dd = np.minimum.accumulate((later_min - peaks)[:, ::-1], axis=1)[:, ::-1]
+
+    prefix_max, prefix_min, prefix_dd, suffix_max, suffix_dd = (
+        a.reshape(size, m) for a in (prefix_max, prefix_min, prefix_dd, suffix_max, suffix_dd))
+    end = np.arange(n) + pad_front
+    begin = end - window + 1
+    whole_block = (end % window == window - 1)[:, None]
+    with np.errstate(invalid='ignore'):
+        across = prefix_min[end] - suffix_max[begin]
+        split = np.fmin(np.fmin(suffix_dd[begin], prefix_dd[end]), across)
+    out = np.where(whole_block, prefix_dd[end], split)
+    out = np.where(np.isfinite(out), np.minimum(out, 0.0), 0.0)
+    return np.expm1(out)
+
+
+def rolling_metrics(returns, window: int = 252, positions=None,
+                    min_periods: Optional[int] = None, risk_free: float = 0.03,
+                    periods: int = 252):
+    """
+    Performance metrics over a moving window, for every bar at once.
+
+    Parameters:
+    -----------
+    returns : pd.Series, pd.DataFrame or np.ndarray
+        Strategy returns, one column per run (e.g. Strategy_Returns of a
+        Panel or a sweep). NaN = no return on that bar.
+    window : int
+        Bars per window (252 = one year of trading days)
+    positions : same shape as returns, optional
+        Position held during each bar, for Exposure (%)
+    min_periods : int
+        Returns needed in a window before it gets a value (default: window)
+    risk_free : float
+        Annual risk-free rate for Sharpe and Sortino
+    periods : int
+        Bars per year
+
+    Returns:
+    --------
+    pd.DataFrame or dict
+        For a Series: a DataFrame with one column per metric (ROLLING_COLUMNS).
+        For 2-D input: a dict of metric name -> values with the input's shape
+        (DataFrames if the input was a DataFrame).
+
+    Notes:
+    ------
+    The value on each bar equals calc_metrics() run on the window's own rows
+    (Sharpe, drawdown and hit rate), so rolling Sharpe costs the same whether
+    the window is 20 or 2,000 bars. Return (%) is the compounded return over
+    the window and Calmar is its annualized version over the window's max
+    drawdown.
+
+    Example:
+    --------
+    >>> roll = rolling_metrics(df['Strategy_Returns'], window=126,
+    ...                        positions=df['Signal'].shift())
+    >>> roll[['Sharpe Ratio', 'Max Drawdown (%)']].plot(subplots=True)
+    """
+    if window < 2:
+        raise ValueError("window must be at least 2 bars")
+    min_periods = window if min_periods is None else max(int(min_periods), 2)
+
+    r = np.asarray(returns, dtype=np.float64)
+    r = r[:, None] if r.ndim == 1 else r
+    valid = ~np.isnan(r)
+    x = np.where(valid, r, 0.0)
+    rf = risk_free / periods
+
+    count = _window_sum(valid.astype(np.float64), window)
+    enough = count >= min_periods
+    total = _window_sum(x, window)
+    total_sq = _window_sum(x * x, window)
+    excess = np.where(valid, x - rf, 0.0)
+    downside = _window_sum(np.minimum(excess, 0.0) ** 2, window)
+    wins = _window_sum((x > 0).astype(np.float64), window)
+    nonzero = _window_sum((x != 0).astype(np.float64), window)
+
+    log_value = np.cumsum(np.log1p(x), axis=0)
+    window_log = log_value.copy()
+    window_log[window:] -= log_value[:-window]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / count
+        var = np.maximum(total_sq - total * mean, 0.0) / (count - 1)
+        sharpe = np.sqrt(periods) * (mean - rf) / np.sqrt(var)
+        sortino = np.sqrt(periods) * (mean - rf) / np.sqrt(downside / count)
+        max_dd = _rolling_max_drawdown(log_value, valid, window)
+        annual = np.expm1(window_log * periods / count)
+        calmar = annual / np.abs(max_dd)
+        hit_rate = np.where(nonzero > 0, wins / nonzero, 0.0)
+
+    if positions is not None:
+        held = np.asarray(positions, dtype=np.float64).reshape(r.shape)
+        held = (np.nan_to_num(held) != 0).astype(np.float64)
+        bars = _window_sum(np.ones_like(held), window)
+        exposure = _window_sum(held, window) / bars
+    else:
+        exposure = np.full(r.shape, np.nan)
+
+    values = {
+        'Return (%)': np.expm1(window_log) * 100,
+        'Sharpe Ratio': sharpe,
+        'Sortino Ratio': sortino,
+        'Max Drawdown (%)': max_dd * 100,
+        'Calmar Ratio': calmar,
+        'Exposure (%)': exposure * 100,
+        'Hit Rate (%)': hit_rate * 100,
+    }
+    for name, v in values.items():
+        v[~enough] = np.nan
+        v[np.isinf(v)] = np.nan
+
+    if isinstance(returns, pd.Series):
+        return pd.DataFrame({k: v[:, 0] for k, v in values.items()},
+                            index=returns.index, columns=ROLLING_COLUMNS)
+    if isinstance(returns, pd.DataFrame):
+        return {k: pd.DataFrame(v, index=returns.index, columns=returns.columns)
+                for k, v in values.items()}
+    if np.ndim(returns) == 1:
+        return {k: v[:, 0] for k, v in values.items()}
+    return values
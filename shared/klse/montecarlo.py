@@ -0,0 +1,243 @@
+"""
+Monte Carlo Robustness Tests
+Resamples a backtest's strategy returns into thousands of alternative paths
+and measures how much CAGR, Sharpe and max drawdown could have varied.
+
+- 'block': circular block bootstrap. Draws blocks of consecutive days with
+  replacement, which keeps short-term patterns (volatility clusters, trends
+  inside a block) while mixing up the order of events.
+- 'trades': trade shuffle. Every trade (a run of days in the market) and
+  every flat stretch stays intact, but their order is shuffled, so the total
+  return is unchanged and only the path - and its drawdowns - differ.
+
+Paths are built as one index array per chunk and scored with batch_metrics(),
+so no Python loop runs per path or per day. Chunks can run in parallel.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .metrics import batch_metrics
+
+
+METHODS = ['block', 'trades']
+
+
+# ========== Path generation ==========
+
+def _block_rows(rng: np.random.Generator, n: int, n_paths: int,
+                block: int) -> np.ndarray:
+    """(n x n_paths) row numbers of circular block-bootstrap paths."""
+    n_blocks = -(-n // block)
+    starts = rng.integers(0, n, size=(n_paths, n_blocks))
+    rows = (starts[:, :, None] + np.arange(block)).reshape(n_paths, -1)[:, :n]
+    return (rows % n).T
+
+
+def _segments(in_market: np.ndarray):
+    """Start row and length of every run of equal in-market state."""
+    breaks = np.flatnonzero(in_market[1:] != in_market[:-1]) + 1
+    starts = np.concatenate([[0], breaks])
+    lengths = np.diff(np.concatenate([starts, [len(in_market)]]))
+    return starts, lengths
+
+
+def _shuffle_rows(rng: np.random.Generator, starts: np.ndarray,
+                  lengths: np.ndarray, n_paths: int) -> np.ndarray:
+    """(n x n_paths) row numbers with the segments in a random order per path."""
+    k = len(starts)
+    n = int(lengths.sum())
+    order = np.argsort(rng.random((n_paths, k)), axis=1)
+    seg_start = starts[order]
+    seg_len = lengths[order]
+    # Where each segment lands in the new path
+    offset = np.cumsum(seg_len, axis=1) - seg_len
+    shift = np.repeat((seg_start - offset).ravel(), seg_len.ravel())
+    rows = shift.reshape(n_paths, n) + np.arange(n)
+    return rows.T
+
+
+def _run_chunk(returns: np.ndarray, dates: pd.DatetimeIndex, capital: float,
+               method: str, block: int, segments, n_paths: int,
+               seed: np.random.SeedSequence, keep: int, periods: float = 252,
+               risk_free: float = 0.03):
+    rng = np.random.default_rng(seed)
+    n = len(returns)
+    if method == 'block':
+        rows = _block_rows(rng, n, n_paths, block)
+    else:
+        rows = _shuffle_rows(rng, *segments, n_paths)
+    paths = returns[rows]
+    # Day 0 is the starting capital, like the first row of backtest()
+    paths = np.vstack([np.full((1, n_paths), np.nan), paths])
+    metrics = batch_metrics(paths, capital=capital, dates=dates, periods=periods,
+                            risk_free=risk_free)
+    equity = capital * np.cumprod(1 + np.nan_to_num(paths[:, :keep]), axis=0)
+    return metrics, equity
+
+
+# ========== Results ==========
+
+class MonteCarloResult:
+    """
+    Output of monte_carlo().
+
+    Attributes:
+        paths: calc_metrics() columns for every simulated path
+        original: calc_metrics() of the actual backtest
+        equity: Portfolio value of the first `keep` paths (for plotting)
+    """
+
+    def __init__(self, paths: pd.DataFrame, original: pd.Series,
+                 equity: pd.DataFrame):
+        self.paths = paths
+        self.original = original
+        self.equity = equity
+
+    def confidence(self, level: float = 0.90,
+                   columns: Sequence[str] = ('CAGR (%)', 'Sharpe Ratio',
+                                             'Max Drawdown (%)')) -> pd.DataFrame:
+        """
+        Confidence interval of each metric across the simulated paths.
+
+        Returns one row per metric with the actual backtest value, the lower
+        bound, the median, the upper bound and the share of paths that did
+        worse than the actual result.
+        """
+        lo = (1 - level) / 2
+        columns = list(columns)
+        values = self.paths[columns]
+        table = pd.DataFrame({
+            'Original': self.original[columns],
+            f'{lo:.1%}': values.quantile(lo),
+            'Median': values.median(),
+            f'{1 - lo:.1%}': values.quantile(1 - lo),
+            'Worse Than Original (%)': (values.lt(self.original[columns]).mean() * 100).round(1),
+        })
+        table.index.name = 'Metric'
+        return table
+
+
+def monte_carlo(returns: pd.Series, n_paths: int = 10000, method: str = 'block',
+                block: int = 20, signal: Optional[pd.Series] = None,
+                capital: float = 100000, seed: Optional[int] = None,
+                n_jobs: int = 1, chunk_size: int = 1000,
+                keep: int = 100, periods: float = 252,
+                risk_free: float = 0.03) -> MonteCarloResult:
+    """
+    Simulate alternative histories of a strategy's returns.
+
+    Parameters:
+    -----------
+    returns : pd.Series
+        Strategy_Returns from backtest() (leading NaN is dropped)
+    n_paths : int
+        Number of simulated paths
+    method : str
+        'block' (circular block bootstrap) or 'trades' (shuffle the order of
+        trades and flat stretches)
+    block : int
+        Days per block for method='block' (20 = about one month)
+    signal : pd.Series, optional
+        Signal column from backtest(), used by method='trades' to find the
+        trades (default: days with a non-zero return count as in the market)
+    capital : float
+        Starting capital
+    seed : int, optional
+        Random seed; the same seed gives the same paths for any n_jobs
+    n_jobs : int
+        Worker processes (1 = run in this process, None = all CPUs)
+    chunk_size : int
+        Paths generated and scored together as one vectorized batch
+    keep : int
+        Equity curves kept for plotting
+    periods : float
+        Bars per year for Sharpe (252 for daily bars; see
+        intraday.periods_per_year() for minute and hourly bars)
+    risk_free : float
+        Annual risk-free rate
+
+    Returns:
+    --------
+    MonteCarloResult
+        Per-path metrics, the original metrics, sample equity curves and
+        .confidence()
+
+    Notes:
+    ------
+    Every path has the same number of days and dates as the backtest, so
+    CAGR is measured over the same period. A trade shuffle cannot change the
+    total return or CAGR - use it to see how deep drawdowns could have been;
+    the block bootstrap varies all metrics.
+
+    Example:
+    --------
+    >>> df = backtest(ma_crossover(add_indicators(df).dropna()))
+    >>> mc = monte_carlo(df['Strategy_Returns'], n_paths=10000, method='block', seed=42)
+    >>> mc.confidence(0.90)
+    >>> mc.paths['Max Drawdown (%)'].hist(bins=50)
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+    if block < 1:
+        raise ValueError("block must be at least 1 day")
+
+    returns = returns if isinstance(returns, pd.Series) else pd.Series(returns)
+    dates = _dates(returns)
+    returns = returns.dropna()
+    if len(returns) < 2:
+        raise ValueError("Need at least 2 returns")
+    values = returns.to_numpy(dtype=np.float64)
+
+    segments = None
+    if method == 'trades':
+        if signal is not None:
+            # The return on day t comes from the signal on day t-1
+            held = signal.shift(1).reindex(returns.index).fillna(0).to_numpy() != 0
+        else:
+            held = values != 0
+        segments = _segments(held)
+
+    original = batch_metrics(np.concatenate([[np.nan], values]), capital=capital,
+                             dates=dates, periods=periods, risk_free=risk_free).iloc[0]
+
+    sizes = [min(chunk_size, n_paths - i) for i in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    keeps = [max(min(keep - i, size), 0) for i, size in
+             zip(range(0, n_paths, chunk_size), sizes)]
+    args = [(values, dates, capital, method, block, segments, size, s, k, periods,
+             risk_free)
+            for size, s, k in zip(sizes, seeds, keeps)]
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs == 1 or len(args) == 1:
+        parts = [_run_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(args))) as pool:
+            futures = [pool.submit(_run_chunk, *a) for a in args]
+            parts = [f.result() for f in futures]
+
+    paths = pd.concat([p[0] for p in parts], ignore_index=True)
+    paths.index.name = 'Path'
+    equity = pd.DataFrame(np.hstack([p[1] for p in parts]), index=dates)
+    equity.columns.name = 'Path'
+    return MonteCarloResult(paths, original, equity)
+
+
+def _dates(returns: pd.Series) -> Optional[pd.DatetimeIndex]:
+    """
+    Dates of the starting-capital row plus every non-NaN return: the row
+    before the first return (backtest()'s first row), or one step earlier if
+    the series starts with a return. None without a DatetimeIndex.
+    """
+    index = returns.index
+    if not isinstance(index, pd.DatetimeIndex) or len(index) < 2:
+        return None
+    valid = returns.notna().to_numpy()
+    first = int(valid.argmax())
+    start = index[first - 1] if first > 0 else index[0] - (index[1] - index[0])
+    return index[valid].insert(0, start)
@@ -0,0 +1,355 @@
+"""
+Vectorized Multi-Ticker Backtest Engine
+Runs the KLSE backtesting pipeline (indicators -> strategy -> backtest -> metrics)
+over a whole universe at once, using 2-D NumPy arrays shaped (dates x tickers).
+
+The per-ticker notebook functions (add_indicators, ma_crossover, rsi_strategy,
+macd_strategy, backtest, calc_metrics) are reproduced column-wise, so every
+ticker gets the same numbers as the one-at-a-time loop in section 9.
+"""
+
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import indicators
+from .metrics import METRIC_COLUMNS, batch_metrics
+
+
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class Panel:
+    """
+    Aligned price/indicator panel for many tickers.
+
+    Every field is a float64 array shaped (len(index), len(tickers)).
+    Missing bars (before listing, after delisting) are NaN.
+    """
+
+    def __init__(self, index: pd.DatetimeIndex, tickers: List[str],
+                 fields: Optional[Dict[str, np.ndarray]] = None):
+        self.index = pd.DatetimeIndex(index)
+        self.tickers = list(tickers)
+        self.fields = {} if fields is None else dict(fields)
+
+    # ========== Construction ==========
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame]) -> 'Panel':
+        """
+        Build a panel from per-ticker OHLCV DataFrames (as returned by get_data).
+
+        Parameters:
+        -----------
+        frames : dict
+            Mapping of ticker -> DataFrame with Open/High/Low/Close/Volume columns
+
+        Returns:
+        --------
+        Panel
+            Panel aligned on the union of all trading dates
+        """
+        cleaned = {}
+        for ticker, df in frames.items():
+            if df is None or df.empty:
+                continue
+            if isinstance(df.columns, pd.MultiIndex):
+                # yf.download() returns (Price, Ticker) columns even for one ticker
+                df = df.droplevel(-1, axis=1)
+            cleaned[ticker] = df
+
+        if not cleaned:
+            return cls(pd.DatetimeIndex([]), [])
+
+        index = cleaned[next(iter(cleaned))].index
+        for df in cleaned.values():
+            index = index.union(df.index)
+
+        tickers = list(cleaned)
+        fields = {}
+        for field in PRICE_FIELDS:
+            if all(field in df.columns for df in cleaned.values()):
+                fields[field] = np.column_stack([
+                    cleaned[t][field].reindex(index).to_numpy(dtype=np.float64)
+                    for t in tickers
+                ])
+        return cls(index, tickers, fields)
+
+    @classmethod
+    def from_wide(cls, df: pd.DataFrame) -> 'Panel':
+        """
+        Build a panel from a wide frame with (field, ticker) column levels,
+        e.g. the result of yf.download(['1155.KL', '1295.KL'], ...).
+        """
+        tickers = list(dict.fromkeys(df.columns.get_level_values(1)))
+        fields = {}
+        for field in PRICE_FIELDS:
+            if field in df.columns.get_level_values(0):
+                fields[field] = (df[field].reindex(columns=tickers)
+                                 .to_numpy(dtype=np.float64))
+        return cls(df.index, tickers, fields)
+
+    # ========== Access ==========
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.fields[field]
+
+    def __setitem__(self, field: str, values: np.ndarray):
+        self.fields[field] = values
+
+    def __contains__(self, field: str) -> bool:
+        return field in self.fields
+
+    @property
+    def shape(self):
+        return len(self.index), len(self.tickers)
+
+    def frame(self, field: str) -> pd.DataFrame:
+        """Return one field as a dates x tickers DataFrame."""
+        return pd.DataFrame(self.fields[field], index=self.index,
+                            columns=self.tickers)
+
+    def ticker_frame(self, ticker: str, valid_only: bool = True) -> pd.DataFrame:
+        """
+        Return one ticker as a regular single-stock DataFrame.
+
+        With valid_only=True the rows are restricted to the ticker's valid
+        region, which is exactly what df.dropna() leaves in the notebook.
+        """
+        col = self.tickers.index(ticker)
+        df = pd.DataFrame({name: values[:, col]
+                           for name, values in self.fields.items()},
+                          index=self.index)
+        if valid_only and 'Valid' in self.fields:
+            df = df[self.fields['Valid'][:, col] > 0].drop(columns='Valid')
+        return df
+
+    def copy(self) -> 'Panel':
+        return Panel(self.index, self.tickers, self.fields)
+
+
+# ========== Indicators ==========
+
+def add_indicators(panel: Panel) -> Panel:
+    """
+    Panel version of the notebook's add_indicators().
+
+    Adds SMA_20, SMA_50, SMA_200, RSI and the MACD_12_26_9 / MACDh_12_26_9 /
+    MACDs_12_26_9 columns for every ticker, plus a 'Valid' mask marking the
+    rows that survive df.dropna().
+    """
+    panel = panel.copy()
+    close = panel['Close']
+
+    panel['SMA_20'] = indicators.sma(close, 20)
+    panel['SMA_50'] = indicators.sma(close, 50)
+    panel['SMA_200'] = indicators.sma(close, 200)
+    panel['RSI'] = indicators.rsi(close, 14)
+    for name, values in indicators.macd(close).items():
+        panel[name] = values
+
+    valid = np.ones(panel.shape, dtype=bool)
+    for values in panel.fields.values():
+        valid &= ~np.isnan(values)
+    panel['Valid'] = valid.astype(np.float64)
+    return panel
+
+
+# ========== Strategies ==========
+# Each strategy returns the Signal array, NaN outside the valid region.
+
+def _mask(panel: Panel, values: np.ndarray) -> np.ndarray:
+    return np.where(panel['Valid'] > 0, values, np.nan)
+
+
+def ma_crossover(panel: Panel) -> np.ndarray:
+    """Long while SMA-50 is above SMA-200."""
+    return _mask(panel, (panel['SMA_50'] > panel['SMA_200']).astype(np.float64))
+
+
+def rsi_strategy(panel: Panel) -> np.ndarray:
+    """Enter on RSI < 30 and hold (same forward-fill rule as rsi_strategy)."""
+    signal = _mask(panel, np.where(panel['RSI'] < 30, 1.0, np.nan))
+    signal = pd.DataFrame(signal).ffill().to_numpy()
+    return _mask(panel, np.nan_to_num(signal, nan=0.0))
+
+
+def macd_strategy(panel: Panel) -> np.ndarray:
+    """Long while MACD is above its signal line."""
+    return _mask(panel, (panel['MACD_12_26_9'] > panel['MACDs_12_26_9'])
+                 .astype(np.float64))
+
+
+STRATEGIES: Dict[str, Callable[[Panel], np.ndarray]] = {
+    'ma_crossover': ma_crossover,
+    'rsi_strategy': rsi_strategy,
+    'macd_strategy': macd_strategy,
+}
+
+
+# ========== Backtest ==========
+
+def _shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    out = np.full_like(values, np.nan)
+    out[periods:] = values[:-periods]
+    return out
+
+
+def _previous(values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """
+    Each column's value at its previous valid row (NaN before the first).
+
+    On the union calendar of Panel.from_frames() a ticker can lack dates
+    other tickers have. Returns and the held signal must span those gaps
+    like pct_change() / shift() do on the ticker's own dropna() frame, so
+    the previous valid row is carried forward instead of using _shift().
+    """
+    n = len(values)
+    rows = np.where(valid, np.arange(n)[:, None], -1)
+    last = np.maximum.accumulate(rows, axis=0)
+    prev = np.full_like(last, -1)
+    prev[1:] = last[:-1]
+    out = values[np.maximum(prev, 0), np.arange(values.shape[1])[None, :]]
+    out[prev < 0] = np.nan
+    return out
+
+
+def _cumprod(values: np.ndarray) -> np.ndarray:
+    """Cumulative product that skips NaN, like pandas' cumprod()."""
+    out = np.nancumprod(values, axis=0)
+    out[np.isnan(values)] = np.nan
+    return out
+
+
+def backtest(panel: Panel, signal: np.ndarray, capital: float = 100000,
+             commission: float = 0.001,
+             position: Optional[np.ndarray] = None) -> Panel:
+    """
+    Panel version of the notebook's backtest().
+
+    Parameters:
+    -----------
+    panel : Panel
+        Panel returned by add_indicators()
+    signal : np.ndarray
+        Signal array from one of the strategies (1 = long, 0 = flat)
+    capital : float
+        Starting capital per ticker
+    commission : float
+        Cost charged on every change of position
+    position : np.ndarray, optional
+        Position changes to charge commission on (default: signal.diff()),
+        e.g. from stops.apply_stop_loss()
+
+    Returns:
+    --------
+    Panel
+        Panel with Signal, Position, Returns, Strategy_Returns, Commission,
+        Cum_Market, Cum_Strategy, Portfolio and BuyHold fields
+    """
+    panel = panel.copy()
+    valid = panel['Valid'] > 0
+    close = _mask(panel, panel['Close'])
+
+    # Over each ticker's own valid rows, bridging dates it lacks
+    previous_signal = _previous(signal, valid)
+    if position is None:
+        position = signal - previous_signal
+    returns = close / _previous(close, valid) - 1
+    commission_cost = np.abs(position) * commission
+    strategy_returns = returns * previous_signal - commission_cost
+
+    cum_market = _cumprod(1 + returns)
+    cum_strategy = _cumprod(1 + strategy_returns)
+
+    panel['Signal'] = signal
+    panel['Position'] = position
+    panel['Returns'] = returns
+    panel['Strategy_Returns'] = strategy_returns
+    panel['Commission'] = commission_cost
+    panel['Cum_Market'] = cum_market
+    panel['Cum_Strategy'] = cum_strategy
+    panel['Portfolio'] = capital * cum_strategy
+    panel['BuyHold'] = capital * cum_market
+    return panel
+
+
+# ========== Metrics ==========
+
+def calc_metrics(panel: Panel, capital: float = 100000, periods: float = 252,
+                 risk_free: float = 0.03) -> pd.DataFrame:
+    """
+    Panel version of the notebook's calc_metrics().
+
+    periods (bars per year, see intraday.periods_per_year()) and risk_free
+    (annual rate) set the Sharpe ratio, as in metrics.batch_metrics().
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per ticker with the same keys as calc_metrics(). Tickers
+        without enough history for the indicators are left out.
+    """
+    valid = panel['Valid'] > 0
+    result = batch_metrics(panel['Strategy_Returns'], panel['Portfolio'], capital,
+                           panel.index, valid, periods, risk_free)
+    result.index = pd.Index(panel.tickers, name='Ticker')
+    return result[valid.any(axis=0)]
+
+
+def run_backtest(panel: Panel, strategy='ma_crossover', capital: float = 100000,
+                 commission: float = 0.001, mode: str = 'fast',
+                 costs=None, fill: str = 'close', periods: float = 252,
+                 risk_free: float = 0.03) -> pd.DataFrame:
+    """
+    Run indicators -> strategy -> backtest -> metrics for every ticker.
+
+    Parameters:
+    -----------
+    panel : Panel
+        Raw OHLCV panel (see Panel.from_frames / Panel.from_wide)
+    strategy : str or callable
+        Name in STRATEGIES or a function(panel) -> signal array
+    capital : float
+        Starting capital per ticker
+    commission : float
+        Cost charged on every change of position (fast mode)
+    mode : str
+        'fast' compounds returns minus commission (the notebook's backtest);
+        'ledger' simulates board-lot orders with Bursa costs
+        (see ledger.ledger_backtest)
+    costs : ledger.BursaCosts, optional
+        Cost model for mode='ledger' (default: BursaCosts())
+    fill : str
+        Fill price for mode='ledger': 'close' or 'next_open'
+    periods : float
+        Bars per year for Sharpe (252 for daily bars; see
+        intraday.periods_per_year() for minute and hourly bars)
+    risk_free : float
+        Annual risk-free rate
+
+    Returns:
+    --------
+    pd.DataFrame
+        calc_metrics() results, one row per ticker
+
+    Example:
+    --------
+    >>> frames = {t: get_data(t, '2021-01-01', '2023-12-31') for t in stocks}
+    >>> results = run_backtest(Panel.from_frames(frames), 'ma_crossover')
+    >>> realistic = run_backtest(Panel.from_frames(frames), 'ma_crossover',
+    ...                          capital=20000, mode='ledger')
+    """
+    if mode not in ('fast', 'ledger'):
+        raise ValueError("mode must be 'fast' or 'ledger'")
+    if isinstance(strategy, str):
+        strategy = STRATEGIES[strategy]
+    panel = add_indicators(panel)
+    if mode == 'ledger':
+        from .ledger import ledger_backtest
+        return ledger_backtest(panel, strategy(panel), capital, costs, fill,
+                               periods, risk_free).metrics()
+    result = backtest(panel, strategy(panel), capital, commission)
+    return calc_metrics(result, capital, periods, risk_free)
@@ -0,0 +1,296 @@
+"""
+Multi-Asset Portfolio Simulator
+One account trading many tickers with shared capital, instead of separate
+single-stock backtests whose metrics are put side by side.
+
+Position sizing rules: equal weight or volatility targeting, optionally
+limited to a maximum number of positions. Positions are opened and closed
+when the strategy signals change, and all weights are reset to their targets
+on a rebalancing schedule. Between trades, holdings drift with prices.
+
+Only the days on which something is traded go through a Python loop (with
+all tickers updated together); the daily equity curve is then valued for
+every day and ticker in one vectorized step.
+"""
+
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .panel import Panel, calc_metrics
+
+
+SIZING_RULES = ['equal', 'volatility']
+
+# Weights below this are rounding leftovers, not positions
+_DUST = 1e-9
+
+_PERIODS = {'W': 'W', 'M': 'M', 'Q': 'Q', 'Y': 'Y'}
+
+
+def _rebalance_rows(index: pd.DatetimeIndex, rebalance, start: int = 0) -> np.ndarray:
+    """Boolean mask of scheduled rebalancing days (every N days counts from start)."""
+    n = len(index)
+    rows = np.zeros(n, dtype=bool)
+    if rebalance is None:
+        return rows
+    if isinstance(rebalance, (int, np.integer)):
+        rows[start::int(rebalance)] = True
+        return rows
+    if rebalance == 'D':
+        rows[start:] = True
+        return rows
+    if rebalance not in _PERIODS:
+        raise ValueError("rebalance must be None, an int, 'D', 'W', 'M', 'Q' or 'Y'")
+    period = index.to_period(_PERIODS[rebalance]).asi8
+    rows[0] = True
+    rows[1:] = period[1:] != period[:-1]
+    return rows
+
+
+def _trailing_volatility(close: np.ndarray, lookback: int, periods: float = 252) -> np.ndarray:
+    """Annualized standard deviation of bar returns over `lookback` bars."""
+    returns = pd.DataFrame(close).pct_change(fill_method=None)
+    return returns.rolling(lookback, min_periods=lookback).std().to_numpy() * np.sqrt(periods)
+
+
+def _trailing_return(close: np.ndarray, lookback: int) -> np.ndarray:
+    past = np.full_like(close, np.nan)
+    past[lookback:] = close[:-lookback]
+    return close / past - 1
+
+
+class PortfolioResult:
+    """
+    Output of simulate_portfolio().
+
+    Attributes:
+        equity: Portfolio value per day
+        returns: Daily portfolio returns (after costs)
+        weights: Weight of each ticker right after every trading day
+        exposure: Fraction of the portfolio invested, per day
+        positions: Number of tickers held, per day
+        turnover: Traded value as a fraction of the portfolio, per day
+        costs: Commission paid as a fraction of the portfolio, per day
+        periods: Bars per year for the Sharpe ratio and turnover in metrics()
+        risk_free: Annual risk-free rate for metrics()
+    """
+
+    def __init__(self, equity: pd.Series, returns: pd.Series, weights: pd.DataFrame,
+                 exposure: pd.Series, positions: pd.Series, turnover: pd.Series,
+                 costs: pd.Series, capital: float, periods: float = 252,
+                 risk_free: float = 0.03):
+        self.equity = equity
+        self.returns = returns
+        self.weights = weights
+        self.exposure = exposure
+        self.positions = positions
+        self.turnover = turnover
+        self.costs = costs
+        self.capital = capital
+        self.periods = periods
+        self.risk_free = risk_free
+
+    def metrics(self) -> pd.Series:
+        """calc_metrics() of the portfolio plus exposure and turnover."""
+        result = Panel(self.equity.index, ['Portfolio'], {
+            'Portfolio': self.equity.to_numpy()[:, None],
+            'Strategy_Returns': self.returns.to_numpy()[:, None],
+            'Valid': np.ones((len(self.equity), 1)),
+        })
+        metrics = calc_metrics(result, self.capital, self.periods, self.risk_free).iloc[0]
+        years = max(len(self.equity) / self.periods, 1 / self.periods)
+        metrics['Avg Exposure (%)'] = round(self.exposure.mean() * 100, 2)
+        metrics['Avg Positions'] = round(self.positions.mean(), 2)
+        metrics['Turnover (% / yr)'] = round(self.turnover.sum() / years * 100, 2)
+        metrics['Costs (%)'] = round(self.costs.sum() * 100, 2)
+        return metrics
+
+
+def simulate_portfolio(panel: Panel, signal: np.ndarray, capital: float = 100000,
+                       sizing: str = 'equal', max_positions: Optional[int] = None,
+                       target_vol: float = 0.15, vol_lookback: int = 20,
+                       rebalance: Union[str, int, None] = 'M',
+                       commission: float = 0.001,
+                       score: Optional[np.ndarray] = None,
+                       score_lookback: int = 126, periods: float = 252,
+                       risk_free: float = 0.03) -> PortfolioResult:
+    """
+    Simulate one portfolio trading every ticker in the panel.
+
+    Parameters:
+    -----------
+    panel : Panel
+        Panel with Close prices (e.g. from add_indicators())
+    signal : np.ndarray
+        Strategy signal (1 = want to hold, 0 = flat; NaN = no signal yet)
+    capital : float
+        Starting capital shared by all tickers
+    sizing : str
+        'equal': each position gets 1 / max_positions of the portfolio (or
+        1 / number of signals when max_positions is None).
+        'volatility': each position gets target_vol / its own volatility,
+        divided by the number of slots, so quiet stocks get bigger positions.
+    max_positions : int, optional
+        Hold at most this many tickers. Free slots are filled with the
+        highest `score` among new signals; held tickers are kept until their
+        signal turns off.
+    target_vol : float
+        Annualized volatility each position aims for (sizing='volatility')
+    vol_lookback : int
+        Bars of returns used to estimate volatility
+    rebalance : str, int or None
+        Reset every weight to its target: 'D', 'W', 'M', 'Q', 'Y', every N
+        days (int, counted from the first day with a signal), or None (only
+        trade when signals change)
+    commission : float
+        Cost as a fraction of traded value
+    score : np.ndarray, optional
+        Ranking for max_positions, higher is better (default: return over
+        the last score_lookback days)
+    score_lookback : int
+        Days used by the default momentum score
+    periods : float
+        Bars per year, for annualizing volatility and for metrics() (252 for
+        daily bars; see intraday.periods_per_year())
+    risk_free : float
+        Annual risk-free rate for metrics()
+
+    Returns:
+    --------
+    PortfolioResult
+        Equity curve, weights, exposure, turnover and .metrics()
+
+    Notes:
+    ------
+    Weights never add up to more than 1 (no leverage); anything not invested
+    is held as cash. Trades happen at the Close of the signal day. On a day
+    without a Close a ticker is neither bought nor sold: a held position is
+    carried (valued at its last price) until the next day with a price.
+
+    Example:
+    --------
+    >>> ind = add_indicators(Panel.from_frames(frames))
+    >>> result = simulate_portfolio(ind, ma_crossover(ind), max_positions=10,
+    ...                             sizing='volatility', rebalance='M')
+    >>> result.metrics()
+    >>> result.equity.plot()
+    """
+    if sizing not in SIZING_RULES:
+        raise ValueError(f"sizing must be one of {SIZING_RULES}")
+
+    close = panel['Close']
+    n, m = close.shape
+    prices = pd.DataFrame(close).ffill().to_numpy()
+    tradable = ~np.isnan(close)
+    has_signal = ~np.isnan(signal)
+    # No price (suspended, or a missing date): keep the last tradable day's
+    # decision, so a held position is carried through instead of sold
+    desired = pd.DataFrame(np.where(tradable, pd.DataFrame(signal).ffill(), np.nan))
+    desired = np.nan_to_num(desired.ffill().to_numpy()) > 0
+
+    if not has_signal.any():
+        raise ValueError("The signal has no values")
+    start = int(has_signal.any(axis=1).argmax())
+
+    # ---- Targets per day ----
+    if sizing == 'volatility':
+        vol = _trailing_volatility(close, vol_lookback, periods)
+        raw_target = np.where(vol > 0, target_vol / vol, np.nan)
+    else:
+        raw_target = np.ones((n, m))
+    if score is None:
+        score = _trailing_return(prices, score_lookback)
+    score = np.where(np.isnan(score), -np.inf, score)
+
+    scheduled = _rebalance_rows(panel.index, rebalance, start)
+    changed = np.zeros(n, dtype=bool)
+    changed[1:] = (desired[1:] != desired[:-1]).any(axis=1)
+    trade_rows = np.flatnonzero((scheduled | changed) & (np.arange(n) >= start))
+    if len(trade_rows) == 0 or trade_rows[0] != start:
+        trade_rows = np.concatenate([[start], trade_rows])
+
+    # ---- Trading days: sequential, all tickers at once ----
+    weights = np.zeros((len(trade_rows), m))
+    turnover = np.zeros(len(trade_rows))
+    growth_at_trade = np.ones(len(trade_rows))
+    current = np.zeros(m)
+    prev_row = start
+
+    for k, row in enumerate(trade_rows):
+        # Weights drift with prices since the previous trading day
+        rel = np.where(current > 0, prices[row] / prices[prev_row], 0.0)
+        held_value = current * rel
+        growth = held_value.sum() + (1 - current.sum())
+        drifted = held_value / growth
+        growth_at_trade[k] = growth
+
+        want = desired[row]
+        held = (drifted > 0) & want
+        entries = want & ~held & tradable[row]
+        slots = max_positions if max_positions else max(int(want.sum()), 1)
+        if max_positions:
+            free = max(max_positions - int(held.sum()), 0)
+            if entries.sum() > free:
+                ranked = np.flatnonzero(entries)[np.argsort(-score[row, entries],
+                                                            kind='stable')]
+                entries = np.zeros(m, dtype=bool)
+                entries[ranked[:free]] = True
+
+        target = np.where(held | entries, np.nan_to_num(raw_target[row]) / slots, 0.0)
+
+        if scheduled[row] or row == start:
+            new = target
+        else:
+            # Between rebalances: keep held weights, fund entries from cash
+            new = np.where(held, drifted, 0.0)
+            cash = 1 - new.sum()
+            cash = cash if cash > _DUST else 0.0
+            wanted = target[entries].sum()
+            scale = min(1.0, cash / wanted) if wanted > 0 else 0.0
+            new[entries] = target[entries] * scale
+
+        new[new < _DUST] = 0.0
+        total = new.sum()
+        if total > 1:
+            new = new / total
+        turnover[k] = np.abs(new - drifted).sum()
+        weights[k] = new
+        current = new
+        prev_row = row
+
+    # ---- Daily valuation, vectorized ----
+    cost = commission * turnover
+    # Value right after each trading day, relative to the starting capital
+    after = np.cumprod(growth_at_trade * (1 - cost))
+
+    rows = np.arange(start, n)
+    seg = np.searchsorted(trade_rows, rows, side='right') - 1
+    base_rows = trade_rows[seg]
+    w = weights[seg]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rel = np.where(w > 0, prices[rows] / prices[base_rows], 0.0)
+    held_value = w * rel
+    growth = held_value.sum(axis=1) + (1 - w.sum(axis=1))
+
+    is_trade = rows == base_rows
+    value = np.where(is_trade, after[seg], after[seg] * growth)
+
+    index = panel.index[start:]
+    equity = pd.Series(capital * value, index=index, name='Portfolio')
+    returns = equity.pct_change(fill_method=None).rename('Strategy_Returns')
+    daily_weights = np.where(is_trade[:, None], w, held_value / growth[:, None])
+    exposure = pd.Series(daily_weights.sum(axis=1), index=index, name='Exposure')
+    positions = pd.Series((daily_weights > 0).sum(axis=1), index=index, name='Positions')
+
+    traded = np.zeros(len(index))
+    traded[trade_rows - start] = turnover
+    paid = np.zeros(len(index))
+    paid[trade_rows - start] = cost
+    weight_frame = pd.DataFrame(weights, index=panel.index[trade_rows],
+                                columns=panel.tickers)
+    return PortfolioResult(equity, returns, weight_frame, exposure, positions,
+                           pd.Series(traded, index=index, name='Turnover'),
+                           pd.Series(paid, index=index, name='Costs'), capital,
+                           periods, risk_free)
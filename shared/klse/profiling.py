@@ -0,0 +1,287 @@
+"""
+Per-Stage Profiling
+Opt-in instrumentation for backtest runs: shows whether a slow universe scan
+spends its time downloading, computing indicators, generating signals,
+backtesting or computing metrics.
+
+Every call of an instrumented stage records its wall time, CPU time, the
+rows it processed and the memory it allocated (peak traced by tracemalloc
+above what was in use when it started), together with the ticker it ran
+for. summary() aggregates the records per stage or per stage and ticker,
+and to_json() exports them.
+
+Nothing is measured unless a Profiler is used, and restore() puts the
+original functions back.
+
+The running stages and the current ticker are kept per thread, so stages
+run from a thread pool nest and attribute correctly. CPU time and
+tracemalloc's peak are measured for the whole process, though: stages
+running in parallel threads may be credited with each other's CPU time and
+allocations.
+"""
+
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+
+# Notebook functions instrumented by Profiler.instrument() by default
+PIPELINE_STAGES = ['get_data', 'add_indicators', 'ma_crossover', 'rsi_strategy',
+                   'macd_strategy', 'backtest', 'add_stop_loss', 'calc_metrics']
+
+
+def _rows(args, kwargs, result) -> int:
+    """Rows processed: the first DataFrame/Series argument, else the result."""
+    for value in list(args) + list(kwargs.values()):
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return len(value)
+    if isinstance(result, (pd.DataFrame, pd.Series, np.ndarray)):
+        return len(result)
+    return 0
+
+
+class _Frame:
+    """One running stage: start readings and the highest traced memory seen."""
+
+    def __init__(self, memory: bool):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        self.base = tracemalloc.get_traced_memory()[0] if memory else 0
+        self.peak = 0
+
+
+class Profiler:
+    """
+    Records time, rows and memory per pipeline stage and ticker.
+
+    Args:
+        memory: Trace allocations with tracemalloc (slows allocation-heavy
+            code down; time is still measured with memory=False)
+
+    Attributes:
+        records: One dict per stage call (Stage, Ticker, Wall (s), CPU (s),
+            Rows, Allocated (bytes))
+
+    Example:
+        >>> profiler = Profiler()
+        >>> profiler.instrument(globals())          # wraps get_data, add_indicators, ...
+        >>> for ticker in stocks:
+        ...     df = backtest(ma_crossover(add_indicators(get_data(ticker, start, end)).dropna()))
+        ...     calc_metrics(df)
+        >>> profiler.restore()
+        >>> profiler.summary()                      # time per stage
+        >>> profiler.summary(by=['Stage', 'Ticker'])
+        >>> profiler.to_json('profile.json')
+    """
+
+    def __init__(self, memory: bool = True):
+        self.memory = memory
+        self.records: List[Dict] = []
+        self._local = threading.local()
+        self._patched: List[tuple] = []
+        self._lock = threading.Lock()
+        self._running = 0
+        self._started_tracing = False
+
+    @property
+    def _stack(self) -> List[_Frame]:
+        """Stages running in this thread, outermost first."""
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @property
+    def _current_ticker(self) -> Optional[str]:
+        return getattr(self._local, 'ticker', None)
+
+    @_current_ticker.setter
+    def _current_ticker(self, ticker: Optional[str]):
+        self._local.ticker = ticker
+
+    # ========== Recording ==========
+
+    def _enter(self) -> _Frame:
+        if self.memory:
+            with self._lock:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self._started_tracing = True
+                self._running += 1
+            self._carry_peak()
+        frame = _Frame(self.memory)
+        self._stack.append(frame)
+        return frame
+
+    def _carry_peak(self):
+        """Credit the peak so far to every running stage, then start a new peak."""
+        _, peak = tracemalloc.get_traced_memory()
+        for frame in self._stack:
+            frame.peak = max(frame.peak, peak - frame.base)
+        tracemalloc.reset_peak()
+
+    def _exit(self, frame: _Frame, stage: str, ticker: Optional[str], rows: int):
+        wall = time.perf_counter() - frame.wall
+        cpu = time.process_time() - frame.cpu
+        if self.memory:
+            self._carry_peak()
+        self._stack.pop()
+        with self._lock:
+            if self.memory:
+                self._running -= 1
+                if self._started_tracing and not self._running:
+                    tracemalloc.stop()
+                    self._started_tracing = False
+            self.records.append({
+                'Stage': stage,
+                'Ticker': ticker if ticker is not None else self._current_ticker,
+                'Wall (s)': wall,
+                'CPU (s)': cpu,
+                'Rows': int(rows),
+                'Allocated (bytes)': int(frame.peak),
+            })
+
+    @contextmanager
+    def stage(self, name: str, ticker: Optional[str] = None, rows: int = 0):
+        """
+        Measure a block of code as one stage.
+
+        >>> with profiler.stage('download', ticker='1155.KL'):
+        ...     df = yf.download('1155.KL')
+        """
+        frame = self._enter()
+        try:
+            yield
+        finally:
+            self._exit(frame, name, ticker, rows)
+
+    @contextmanager
+    def ticker(self, ticker: str):
+        """Attribute every stage inside the block (in this thread) to one ticker."""
+        previous = self._current_ticker
+        self._current_ticker = ticker
+        try:
+            yield
+        finally:
+            self._current_ticker = previous
+
+    def wrap(self, func: Callable, stage: Optional[str] = None) -> Callable:
+        """
+        Instrumented version of func.
+
+        A call whose first argument is a ticker string (like get_data)
+        becomes the current ticker of its thread, so the stages that follow
+        it are attributed to that ticker until the next one.
+        """
+        name = stage or getattr(func, '__name__', repr(func))
+
+        @functools.wraps(func)
+        def profiled(*args, **kwargs):
+            if args and isinstance(args[0], str):
+                self._current_ticker = args[0]
+            frame = self._enter()
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                self._exit(frame, name, None, _rows(args, kwargs, result))
+
+        profiled.__profiled__ = func
+        return profiled
+
+    def instrument(self, namespace: Dict, names: Iterable[str] = PIPELINE_STAGES) -> List[str]:
+        """
+        Replace functions in a namespace (e.g. a notebook's globals()) with
+        instrumented versions. Names that are missing are skipped.
+
+        Returns:
+        --------
+        list of str
+            The names that were instrumented
+        """
+        done = []
+        for name in names:
+            func = namespace.get(name)
+            if not callable(func) or hasattr(func, '__profiled__'):
+                continue
+            self._patched.append((namespace, name, func))
+            namespace[name] = self.wrap(func, name)
+            done.append(name)
+        return done
+
+    def restore(self):
+        """Put back every function replaced by instrument()."""
+        for namespace, name, func in reversed(self._patched):
+            namespace[name] = func
+        self._patched = []
+
+    def reset(self):
+        """Forget all records."""
+        with self._lock:
+            self.records = []
+
+    # ========== Reports ==========
+
+    def frame(self) -> pd.DataFrame:
+        """Every recorded stage call as a DataFrame."""
+        return pd.DataFrame(self.records, columns=['Stage', 'Ticker', 'Wall (s)', 'CPU (s)',
+                                                   'Rows', 'Allocated (bytes)'])
+
+    def summary(self, by: Union[str, List[str]] = 'Stage') -> pd.DataFrame:
+        """
+        Totals per stage (or per stage and ticker with by=['Stage', 'Ticker']).
+
+        Returns:
+        --------
+        pd.DataFrame
+            Calls, total and mean wall time, CPU time, rows, rows/s, peak
+            allocated MB and each group's share of the total wall time,
+            slowest first. Time of nested stages is included in the stage
+            that called them.
+        """
+        records = self.frame()
+        by = [by] if isinstance(by, str) else list(by)
+        if records.empty:
+            return pd.DataFrame(columns=['Calls', 'Wall (s)', 'Mean Wall (s)', 'CPU (s)',
+                                         'Rows', 'Rows/s', 'Peak Allocated (MB)',
+                                         'Share of Wall (%)'])
+        records['Ticker'] = records['Ticker'].fillna('-')
+        grouped = records.groupby(by, sort=False)
+        table = pd.DataFrame({
+            'Calls': grouped.size(),
+            'Wall (s)': grouped['Wall (s)'].sum(),
+            'Mean Wall (s)': grouped['Wall (s)'].mean(),
+            'CPU (s)': grouped['CPU (s)'].sum(),
+            'Rows': grouped['Rows'].sum(),
+            'Peak Allocated (MB)': grouped['Allocated (bytes)'].max() / 1e6,
+        })
+        with np.errstate(divide='ignore', invalid='ignore'):
+            table['Rows/s'] = np.where(table['Wall (s)'] > 0,
+                                       table['Rows'] / table['Wall (s)'], np.nan)
+        table['Share of Wall (%)'] = (100 * table['Wall (s)'] / table['Wall (s)'].sum()).round(1)
+        table = table[['Calls', 'Wall (s)', 'Mean Wall (s)', 'CPU (s)', 'Rows', 'Rows/s',
+                       'Peak Allocated (MB)', 'Share of Wall (%)']]
+        return table.sort_values('Wall (s)', ascending=False)
+
+    def to_json(self, path: Optional[str] = None, by: Union[str, List[str]] = 'Stage') -> str:
+        """
+        Export the summary and every record as JSON (written to path if
+        given). Returns the JSON text.
+        """
+        summary = self.summary(by).reset_index()
+        data = {
+            'summary': json.loads(summary.to_json(orient='records')),
+            'records': json.loads(self.frame().to_json(orient='records')),
+        }
+        text = json.dumps(data, indent=2)
+        if path is not None:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        return text
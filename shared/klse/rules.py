@@ -0,0 +1,470 @@
+"""
+Declarative Strategy Rules
+Write a strategy as an expression instead of a function that copies the
+DataFrame and fills Signal with .loc masks:
+
+    golden_cross = sma(50) > sma(200)
+    rsi_bounce = Strategy(entry=rsi(14) < 30, exit=rsi(14) > 70)
+    breakout = cross_above(close, bb_upper(20, 2)) & (volume > sma(20, volume))
+
+Expressions are only a description. compile_rules() turns any number of them
+into one plan: every distinct computation (sma(50) of Close, the MACD of
+12/26/9, a comparison...) appears once, however many rules use it. Running the
+plan on a Panel evaluates each step once, column-wise over all tickers, with
+the NumPy kernels from indicators.py.
+"""
+
+import operator
+from typing import Callable, Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from . import indicators
+from .metrics import batch_metrics
+from .panel import Panel, _previous
+
+
+# ========== Expressions ==========
+
+class Expr:
+    """
+    Node of a rule expression.
+
+    Every node has a `key` that identifies the computation (operation and
+    inputs), so equal sub-expressions written in different rules compile to
+    one step. Comparisons and &, |, ~ give 1.0 / 0.0 arrays, NaN where an
+    input is still warming up.
+    """
+
+    def __init__(self, key: Tuple, inputs: Tuple['Expr', ...] = ()):
+        self.key = key
+        self.inputs = inputs
+
+    def compute(self, panel: Panel, *values: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def __call__(self, panel: Panel) -> np.ndarray:
+        """Signal array for a Panel, so an expression works as a strategy."""
+        return compile_rules({'signal': self}).run(panel)['signal']
+
+    def __repr__(self) -> str:
+        return _describe(self.key)
+
+    # Arithmetic
+    def __add__(self, other): return BinOp('+', self, other)
+    def __radd__(self, other): return BinOp('+', other, self)
+    def __sub__(self, other): return BinOp('-', self, other)
+    def __rsub__(self, other): return BinOp('-', other, self)
+    def __mul__(self, other): return BinOp('*', self, other)
+    def __rmul__(self, other): return BinOp('*', other, self)
+    def __truediv__(self, other): return BinOp('/', self, other)
+    def __rtruediv__(self, other): return BinOp('/', other, self)
+    def __neg__(self): return BinOp('-', 0, self)
+
+    # Conditions
+    def __lt__(self, other): return BinOp('<', self, other)
+    def __le__(self, other): return BinOp('<=', self, other)
+    def __gt__(self, other): return BinOp('>', self, other)
+    def __ge__(self, other): return BinOp('>=', self, other)
+    def __and__(self, other): return BinOp('&', self, other)
+    def __rand__(self, other): return BinOp('&', other, self)
+    def __or__(self, other): return BinOp('|', self, other)
+    def __ror__(self, other): return BinOp('|', other, self)
+    def __invert__(self): return Not(self)
+
+    def shift(self, periods: int = 1) -> 'Expr':
+        """Value `periods` bars ago."""
+        return Shift(self, periods)
+
+
+class Const(Expr):
+    def __init__(self, value: float):
+        super().__init__(('const', float(value)))
+        self.value = float(value)
+
+    def compute(self, panel, *values):
+        return np.full(panel.shape, self.value)
+
+
+class Field(Expr):
+    """A Panel field such as Close or Volume."""
+
+    def __init__(self, name: str):
+        super().__init__(('field', name))
+        self.name = name
+
+    def compute(self, panel, *values):
+        if self.name not in panel:
+            raise KeyError(f"Panel has no '{self.name}' field")
+        return panel[self.name]
+
+
+def _as_expr(value) -> Expr:
+    return value if isinstance(value, Expr) else Const(value)
+
+
+_ARITHMETIC = {'+': operator.add, '-': operator.sub, '*': operator.mul,
+               '/': operator.truediv}
+_COMPARE = {'<': operator.lt, '<=': operator.le, '>': operator.gt,
+            '>=': operator.ge}
+_LOGIC = {'&': np.logical_and, '|': np.logical_or}
+
+
+class BinOp(Expr):
+    def __init__(self, op: str, left, right):
+        left, right = _as_expr(left), _as_expr(right)
+        super().__init__((op, left.key, right.key), (left, right))
+        self.op = op
+
+    def compute(self, panel, left, right):
+        missing = np.isnan(left) | np.isnan(right)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if self.op in _ARITHMETIC:
+                return _ARITHMETIC[self.op](left, right)
+            if self.op in _COMPARE:
+                out = _COMPARE[self.op](left, right)
+            else:
+                out = _LOGIC[self.op](left > 0, right > 0)
+        return np.where(missing, np.nan, out.astype(np.float64))
+
+
+class Not(Expr):
+    def __init__(self, inner: Expr):
+        super().__init__(('not', inner.key), (inner,))
+
+    def compute(self, panel, inner):
+        return np.where(np.isnan(inner), np.nan, (inner <= 0).astype(np.float64))
+
+
+class Shift(Expr):
+    def __init__(self, inner: Expr, periods: int):
+        super().__init__(('shift', inner.key, int(periods)), (inner,))
+        self.periods = int(periods)
+
+    def compute(self, panel, inner):
+        out = np.full_like(inner, np.nan)
+        if self.periods >= 0:
+            out[self.periods:] = inner[:len(inner) - self.periods]
+        else:
+            out[:self.periods] = inner[-self.periods:]
+        return out
+
+
+class Indicator(Expr):
+    """
+    An indicators.py function applied to input expressions.
+
+    Indicators returning several columns (MACD, Bollinger Bands) are one
+    node; Pick nodes select a column, so the line and the signal of the same
+    MACD share one computation.
+    """
+
+    def __init__(self, name: str, func: Callable, inputs: Tuple[Expr, ...], **params):
+        key = (name, tuple(params.items()), tuple(e.key for e in inputs))
+        super().__init__(key, inputs)
+        self.func = func
+        self.params = params
+
+    def compute(self, panel, *values):
+        return self.func(*values, **self.params)
+
+
+class Pick(Expr):
+    def __init__(self, inner: Indicator, prefix: str):
+        super().__init__(('pick', inner.key, prefix), (inner,))
+        self.prefix = prefix
+
+    def compute(self, panel, columns):
+        return next(v for k, v in columns.items() if k.startswith(self.prefix + '_'))
+
+
+# ========== Building blocks ==========
+
+open_ = Field('Open')
+high = Field('High')
+low = Field('Low')
+close = Field('Close')
+volume = Field('Volume')
+
+
+def sma(length: int = 10, source: Expr = close) -> Expr:
+    return Indicator('sma', indicators.sma, (source,), length=int(length))
+
+
+def ema(length: int = 10, source: Expr = close) -> Expr:
+    return Indicator('ema', indicators.ema, (source,), length=int(length))
+
+
+def rsi(length: int = 14, source: Expr = close) -> Expr:
+    return Indicator('rsi', indicators.rsi, (source,), length=int(length))
+
+
+def _macd(fast: int, slow: int, signal: int, source: Expr) -> Indicator:
+    return Indicator('macd', indicators.macd, (source,), fast=int(fast),
+                     slow=int(slow), signal=int(signal))
+
+
+def macd(fast: int = 12, slow: int = 26, signal: int = 9, source: Expr = close) -> Expr:
+    """MACD line (MACD_12_26_9)."""
+    return Pick(_macd(fast, slow, signal, source), 'MACD')
+
+
+def macd_signal(fast: int = 12, slow: int = 26, signal: int = 9,
+                source: Expr = close) -> Expr:
+    """MACD signal line (MACDs_12_26_9)."""
+    return Pick(_macd(fast, slow, signal, source), 'MACDs')
+
+
+def macd_hist(fast: int = 12, slow: int = 26, signal: int = 9,
+              source: Expr = close) -> Expr:
+    """MACD histogram (MACDh_12_26_9)."""
+    return Pick(_macd(fast, slow, signal, source), 'MACDh')
+
+
+def _bbands(length: int, std: float, source: Expr) -> Indicator:
+    return Indicator('bbands', indicators.bbands, (source,), length=int(length),
+                     std=float(std))
+
+
+def bb_lower(length: int = 20, std: float = 2.0, source: Expr = close) -> Expr:
+    return Pick(_bbands(length, std, source), 'BBL')
+
+
+def bb_middle(length: int = 20, std: float = 2.0, source: Expr = close) -> Expr:
+    return Pick(_bbands(length, std, source), 'BBM')
+
+
+def bb_upper(length: int = 20, std: float = 2.0, source: Expr = close) -> Expr:
+    return Pick(_bbands(length, std, source), 'BBU')
+
+
+def atr(length: int = 14) -> Expr:
+    return Indicator('atr', indicators.atr, (high, low, close), length=int(length))
+
+
+def obv() -> Expr:
+    return Indicator('obv', indicators.obv, (close, volume))
+
+
+def cross_above(a, b) -> Expr:
+    """True on the bar where a moves from at or below b to above b."""
+    a, b = _as_expr(a), _as_expr(b)
+    return (a > b) & (a.shift(1) <= b.shift(1))
+
+
+def cross_below(a, b) -> Expr:
+    """True on the bar where a moves from at or above b to below b."""
+    a, b = _as_expr(a), _as_expr(b)
+    return (a < b) & (a.shift(1) >= b.shift(1))
+
+
+# ========== Strategies ==========
+
+class Strategy:
+    """
+    Entry / exit rule pair.
+
+    With only `entry`, the strategy is long whenever the condition holds
+    (like ma_crossover). With an `exit`, it goes long when `entry` fires and
+    stays long until `exit` fires (entry wins if both fire on one bar).
+
+    Args:
+        entry: Condition to be (or go) long
+        exit: Condition to go flat, optional
+
+    Example:
+        >>> Strategy(entry=rsi(14) < 30, exit=rsi(14) > 70)
+        >>> Strategy(entry=cross_above(close, bb_upper()), exit=close < bb_middle())
+    """
+
+    def __init__(self, entry: Expr, exit: Expr = None):
+        self.entry = entry
+        self.exit = exit
+
+    @property
+    def conditions(self) -> List[Expr]:
+        return [self.entry] if self.exit is None else [self.entry, self.exit]
+
+    def signal(self, entry: np.ndarray, exit: np.ndarray = None) -> np.ndarray:
+        if exit is None:
+            return entry
+        started = ~(np.isnan(entry) | np.isnan(exit))
+        started = np.maximum.accumulate(started, axis=0)
+        events = np.full(entry.shape, np.nan)
+        events[exit > 0] = 0.0
+        events[entry > 0] = 1.0
+        held = pd.DataFrame(events).ffill().fillna(0.0).to_numpy()
+        return np.where(started, held, np.nan)
+
+    def __call__(self, panel: Panel) -> np.ndarray:
+        return compile_rules({'signal': self}).run(panel)['signal']
+
+    def __repr__(self) -> str:
+        if self.exit is None:
+            return f"Strategy(entry={self.entry!r})"
+        return f"Strategy(entry={self.entry!r}, exit={self.exit!r})"
+
+
+Rule = Union[Expr, Strategy]
+
+
+# ========== Compilation ==========
+
+class Plan:
+    """
+    Compiled rules: unique steps in dependency order plus, for each rule,
+    the steps holding its conditions.
+
+    Attributes:
+        steps: One Expr per distinct computation, inputs before users
+        rules: Rule name -> Strategy
+    """
+
+    def __init__(self, steps: List[Expr], rules: Dict[str, Strategy]):
+        self.steps = steps
+        self.rules = rules
+
+    def __repr__(self) -> str:
+        lines = [f"Plan: {len(self.rules)} rules, {len(self.steps)} steps"]
+        lines += [f"  {i:>3}. {step!r}" for i, step in enumerate(self.steps)]
+        return '\n'.join(lines)
+
+    def run(self, panel: Panel) -> Dict[str, np.ndarray]:
+        """
+        Evaluate every step once and return rule name -> Signal array
+        (dates x tickers; 1 = long, 0 = flat, NaN while warming up).
+        """
+        values = {}
+        for step in self.steps:
+            inputs = [values[e.key] for e in step.inputs]
+            values[step.key] = step.compute(panel, *inputs)
+        return {name: rule.signal(*[values[c.key] for c in rule.conditions])
+                for name, rule in self.rules.items()}
+
+
+def compile_rules(rules: Dict[str, Rule]) -> Plan:
+    """
+    Compile named rules into a Plan with shared, deduplicated steps.
+
+    Parameters:
+    -----------
+    rules : dict
+        Name -> expression (long while true) or Strategy(entry, exit)
+
+    Returns:
+    --------
+    Plan
+        .steps lists each distinct computation once; .run(panel) gives the
+        signals
+
+    Example:
+    --------
+    >>> plan = compile_rules({
+    ...     'golden_cross': sma(50) > sma(200),
+    ...     'trend_pullback': (sma(50) > sma(200)) & (rsi(14) < 40),
+    ...     'macd': macd() > macd_signal(),
+    ... })
+    >>> len(plan.steps)   # sma(50), sma(200) and the MACD are computed once
+    >>> signals = plan.run(add_indicators(panel))
+    """
+    strategies = {name: rule if isinstance(rule, Strategy) else Strategy(rule)
+                  for name, rule in rules.items()}
+    steps, seen = [], set()
+
+    def visit(expr: Expr):
+        # Iterative post-order walk, so deep expressions can't hit the recursion limit
+        stack = [(expr, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node.key in seen:
+                continue
+            if expanded:
+                seen.add(node.key)
+                steps.append(node)
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.inputs))
+
+    for strategy in strategies.values():
+        for condition in strategy.conditions:
+            if not isinstance(condition, Expr):
+                raise TypeError(f"Rule conditions must be expressions, got {condition!r}")
+            visit(condition)
+    return Plan(steps, strategies)
+
+
+def run_rules(panel: Panel, rules: Dict[str, Rule], capital: float = 100000,
+              commission: float = 0.001, periods: float = 252,
+              risk_free: float = 0.03) -> pd.DataFrame:
+    """
+    Backtest many rules over every ticker in a panel.
+
+    Parameters:
+    -----------
+    panel : Panel
+        Panel from add_indicators() (its Valid mask sets the evaluation rows,
+        as in run_backtest())
+    rules : dict
+        Name -> expression or Strategy
+    capital : float
+        Starting capital per ticker and rule
+    commission : float
+        Cost charged on every change of position
+    periods : float
+        Bars per year for Sharpe (see intraday.periods_per_year())
+    risk_free : float
+        Annual risk-free rate
+
+    Returns:
+    --------
+    pd.DataFrame
+        calc_metrics() columns, indexed by (Rule, Ticker)
+
+    Example:
+    --------
+    >>> ind = add_indicators(Panel.from_frames(frames))
+    >>> results = run_rules(ind, {'golden_cross': sma(50) > sma(200),
+    ...                           'rsi_30_70': Strategy(rsi() < 30, rsi() > 70)})
+    >>> results.groupby(level='Rule')['Sharpe Ratio'].mean()
+    """
+    signals = compile_rules(rules).run(panel)
+    valid = panel['Valid'] > 0
+    has_rows = valid.any(axis=0)
+    # backtest() without its per-rule copies: market returns are shared
+    close = np.where(valid, panel['Close'], np.nan)
+    returns = close / _previous(close, valid) - 1
+    tables = []
+    for name, signal in signals.items():
+        signal = np.where(valid, signal, np.nan)
+        previous_signal = _previous(signal, valid)
+        position = signal - previous_signal
+        strategy_returns = returns * previous_signal - np.abs(position) * commission
+        table = batch_metrics(strategy_returns, capital=capital, dates=panel.index,
+                              valid=valid, periods=periods, risk_free=risk_free)
+        table.index = pd.MultiIndex.from_product([[name], panel.tickers],
+                                                 names=['Rule', 'Ticker'])
+        tables.append(table[has_rows])
+    return pd.concat(tables)
+
+
+def _describe(key) -> str:
+    """Readable form of an expression key, e.g. (sma(50) > sma(200))."""
+    kind = key[0]
+    if kind == 'const':
+        return f"{key[1]:g}"
+    if kind == 'field':
+        return key[1].lower()
+    if kind in _ARITHMETIC or kind in _COMPARE or kind in _LOGIC:
+        return f"({_describe(key[1])} {kind} {_describe(key[2])})"
+    if kind == 'not':
+        return f"~{_describe(key[1])}"
+    if kind == 'shift':
+        return f"{_describe(key[1])}.shift({key[2]})"
+    if kind == 'pick':
+        return f"{_describe(key[1])}.{key[2]}"
+    params = ', '.join(str(v) for _, v in key[1])
+    sources = [s for s in key[2] if s != ('field', 'Close')]
+    args = ', '.join([params] + [_describe(s) for s in sources] if params else
+                     [_describe(s) for s in sources])
+    return f"{kind}({args})"
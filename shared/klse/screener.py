@@ -0,0 +1,683 @@
+"""
+Indexed Stock Screening
+A columnar fundamentals table and a screening engine for it.
+
+The notebook's screen_stocks() narrows the DataFrame one filter at a time,
+copying it for every step (market cap, PE notna, PE <= max, PE > 0, ...).
+Here the table is held as one NumPy array per column, and a screen is
+evaluated without building any intermediate frame:
+
+- numeric columns have a sorted index (built once, on first use), so the
+  number of stocks inside a range is known from two binary searches
+- text columns (Sector, Industry) are stored as integer codes, grouped by
+  code in an index; `Sector in [...]` becomes a small bitmap of allowed
+  codes, looked up for every row in one gather
+- a selective predicate (few matching stocks) is answered from its index
+  and only those rows are checked against the other criteria; otherwise
+  every criterion is ANDed into one reused boolean mask, in place
+
+Missing values (NaN) never pass a numeric criterion, so there is no separate
+notna() step. Only the rows that pass are turned into a DataFrame, at the end.
+
+Screens can also be written as a query string, e.g.
+"PE < 15 and `Dividend Yield (%)` >= 3 and Close > SMA_200": comparisons of
+a column with a constant go through the indexes, anything else (column vs
+column, or, not, arithmetic) is evaluated as one array expression. A
+comparison with a missing value is unknown rather than False, so negating it
+does not let the stock through either: "not (PE < 10)" and "PE != 0" both
+leave out stocks without a PE, as in SQL.
+"""
+
+import ast
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+# Stocks matching a predicate, as a fraction of the table, below which the
+# predicate's index drives the screen instead of a full-table mask
+_SELECTIVE = 0.1
+
+Criterion = Tuple
+Predicate = Callable[['FundamentalsTable'], np.ndarray]
+
+
+class _Range:
+    """lo < / <= value < / <= hi on one numeric column (None = unbounded),
+    minus the values in `exclude` (from != criteria)."""
+
+    def __init__(self, column: str, lo=None, hi=None, lo_open=False, hi_open=False,
+                 exclude: Sequence[float] = ()):
+        self.column = column
+        self.lo, self.hi = lo, hi
+        self.lo_open, self.hi_open = lo_open, hi_open
+        self.exclude = list(exclude)
+
+    def narrow(self, other: '_Range'):
+        """Intersect with another range on the same column."""
+        if other.lo is not None and (self.lo is None or other.lo > self.lo
+                                     or (other.lo == self.lo and other.lo_open)):
+            self.lo, self.lo_open = other.lo, other.lo_open
+        if other.hi is not None and (self.hi is None or other.hi < self.hi
+                                     or (other.hi == self.hi and other.hi_open)):
+            self.hi, self.hi_open = other.hi, other.hi_open
+        self.exclude += other.exclude
+
+
+class _Members:
+    """Text column value in (or not in) a set of values."""
+
+    def __init__(self, column: str, values: Iterable[str], negate: bool = False):
+        self.column = column
+        self.values = [str(v) for v in values]
+        self.negate = negate
+
+
+class _Codes:
+    """Every set criterion on one text column: which codes may pass."""
+
+    def __init__(self, column: str, allowed: np.ndarray):
+        self.column = column
+        self.allowed = allowed
+
+
+def _as_tuples(criteria) -> List[Criterion]:
+    """
+    Criteria as (column, op, value) tuples.
+
+    Accepts a dict {column: (min, max) | [values] | value} (bounds
+    inclusive, None = open) or a list of (column, op, value) tuples.
+    """
+    if criteria is None:
+        return []
+    if not isinstance(criteria, dict):
+        return list(criteria)
+    items = []
+    for column, value in criteria.items():
+        if isinstance(value, tuple):
+            items.append((column, 'between', value))
+        elif isinstance(value, (list, set, frozenset)):
+            items.append((column, 'in', value))
+        else:
+            items.append((column, '==', value))
+    return items
+
+
+def _parse(criteria) -> List[Union[_Range, _Members]]:
+    """Normalise criteria into one _Range per numeric column plus _Members."""
+    ranges: Dict[str, _Range] = {}
+    members: List[_Members] = []
+    for column, op, value in _as_tuples(criteria):
+        if op in ('in', 'not in') or (op in ('==', '!=') and isinstance(value, str)):
+            values = [value] if isinstance(value, str) else value
+            members.append(_Members(column, values, negate=op in ('not in', '!=')))
+            continue
+        if op == 'between':
+            lo, hi = value
+            rng = _Range(column, lo, hi)
+        elif op in ('>', '>='):
+            rng = _Range(column, lo=value, lo_open=op == '>')
+        elif op in ('<', '<='):
+            rng = _Range(column, hi=value, hi_open=op == '<')
+        elif op == '==':
+            rng = _Range(column, value, value)
+        elif op == '!=':
+            rng = _Range(column, exclude=[value])
+        else:
+            raise ValueError(f"Unknown operator {op!r} for column {column!r}")
+        if column in ranges:
+            ranges[column].narrow(rng)
+        else:
+            ranges[column] = rng
+    return list(ranges.values()) + members
+
+
+# ========== Query strings ==========
+
+# Short names usable in queries, for columns whose names are not identifiers
+ALIASES = {
+    'PE': 'PE Ratio',
+    'ForwardPE': 'Forward PE',
+    'MarketCap': 'Market Cap (B)',
+    'DY': 'Dividend Yield (%)',
+    'DividendYield': 'Dividend Yield (%)',
+    'Price': 'Current Price',
+    'High52W': '52W High',
+    'Low52W': '52W Low',
+    'MACD': 'MACD_12_26_9',
+    'MACDh': 'MACDh_12_26_9',
+    'MACDs': 'MACDs_12_26_9',
+    'BBL': 'BBL_20_2.0',
+    'BBM': 'BBM_20_2.0',
+    'BBU': 'BBU_20_2.0',
+    'BBB': 'BBB_20_2.0',
+    'BBP': 'BBP_20_2.0',
+}
+
+_AST_COMPARE = {ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=',
+                ast.Eq: '==', ast.NotEq: '!=', ast.In: 'in', ast.NotIn: 'not in'}
+_MIRROR = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '==': '==', '!=': '!='}
+_AST_ARITHMETIC = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply,
+                   ast.Div: np.divide}
+_ARRAY_COMPARE = {'<': np.less, '<=': np.less_equal, '>': np.greater,
+                  '>=': np.greater_equal, '==': np.equal, '!=': np.not_equal}
+
+
+def _conjuncts(node: ast.AST) -> List[ast.AST]:
+    """Split `a and b and c` (or a & b & c) into its parts."""
+    if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.And):
+        return [part for value in node.values for part in _conjuncts(value)]
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitAnd):
+        return _conjuncts(node.left) + _conjuncts(node.right)
+    return [node]
+
+
+def _known(values: np.ndarray) -> np.ndarray:
+    """False where a value is missing (NaN); text values are never missing."""
+    values = np.asarray(values)
+    return ~np.isnan(values) if values.dtype.kind == 'f' else np.True_
+
+
+class _Query:
+    """A parsed query string, bound to the columns of one table."""
+
+    def __init__(self, expression: str, table: 'FundamentalsTable'):
+        self.expression = expression
+        self.table = table
+        self.names: Dict[str, str] = {}
+
+        # `Any column name` -> placeholder identifier
+        def quote(match):
+            key = f'_col{len(self.names)}'
+            self.names[key] = match.group(1)
+            return key
+
+        source = re.sub(r'`([^`]+)`', quote, expression)
+        try:
+            tree = ast.parse(source.strip(), mode='eval').body
+        except SyntaxError as err:
+            raise ValueError(f"Cannot parse query {expression!r}: {err.msg}") from None
+
+        self.criteria: List[Criterion] = []
+        self.rest: List[ast.AST] = []
+        for part in _conjuncts(tree):
+            found = self._as_criteria(part)
+            if found is None:
+                self.rest.append(part)
+            else:
+                self.criteria.extend(found)
+
+    def column(self, node: ast.AST) -> Optional[str]:
+        """Column a Name node refers to, or None if it is not a Name."""
+        if not isinstance(node, ast.Name):
+            return None
+        name = self.names.get(node.id, node.id)
+        name = ALIASES.get(name, name) if name not in self.table else name
+        if name not in self.table and name != 'Ticker':
+            raise KeyError(f"Unknown column in query: {name!r}")
+        return name
+
+    @staticmethod
+    def constant(node: ast.AST):
+        """Value of a literal (number, string or list of them), else None."""
+        try:
+            value = ast.literal_eval(node)
+        except (ValueError, TypeError, SyntaxError):
+            return None
+        return value if isinstance(value, (int, float, str, list, tuple, set)) else None
+
+    def _as_criteria(self, node: ast.AST) -> Optional[List[Criterion]]:
+        """(column, op, value) tuples for `column op constant` comparisons."""
+        if not isinstance(node, ast.Compare):
+            return None
+        operands = [node.left] + node.comparators
+        ops = [_AST_COMPARE.get(type(op)) for op in node.ops]
+        if None in ops:
+            return None
+        criteria = []
+        for left, op, right in zip(operands, ops, operands[1:]):
+            column, value = self.column(left), self.constant(right)
+            if column is None:
+                column, value = self.column(right), self.constant(left)
+                if op in ('in', 'not in') or column is None:
+                    return None
+                op = _MIRROR[op]
+            if value is None or column == 'Ticker':
+                return None
+            numeric = column in self.table.numeric
+            if op in ('in', 'not in'):
+                valid = not numeric and isinstance(value, (list, tuple, set))
+            elif numeric:
+                valid = isinstance(value, (int, float))
+            else:
+                valid = isinstance(value, str) and op in ('==', '!=')
+            if not valid:
+                return None
+            criteria.append((column, op, value))
+        return criteria
+
+    def evaluate(self, node: ast.AST) -> np.ndarray:
+        """Array value of an expression over every row of the table."""
+        if (isinstance(node, (ast.BoolOp, ast.Compare))
+                or isinstance(node, ast.BinOp) and isinstance(node.op, (ast.BitAnd, ast.BitOr))
+                or isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.Invert))):
+            return self.truth(node)[0]
+        if isinstance(node, ast.BinOp) and type(node.op) in _AST_ARITHMETIC:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return _AST_ARITHMETIC[type(node.op)](self.evaluate(node.left),
+                                                      self.evaluate(node.right))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return -self.evaluate(node.operand)
+        if isinstance(node, ast.Name):
+            return self.table[self.column(node)]
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)):
+            return np.asarray(node.value)
+        raise ValueError(f"Unsupported expression in query {self.expression!r}: "
+                         f"{ast.unparse(node)}")
+
+    def truth(self, node: ast.AST) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rows where a condition is true, and rows where it is false.
+
+        A comparison with a missing value is neither, and and / or / not
+        combine the two masks as SQL's three-valued logic does, so "not
+        (PE < 10)" leaves out the stocks without a PE like "PE >= 10" does.
+        """
+        if isinstance(node, ast.BoolOp) or (
+                isinstance(node, ast.BinOp) and isinstance(node.op, (ast.BitAnd, ast.BitOr))):
+            values = node.values if isinstance(node, ast.BoolOp) else [node.left, node.right]
+            trues, falses = zip(*[self.truth(value) for value in values])
+            if isinstance(node.op, (ast.And, ast.BitAnd)):
+                return np.logical_and.reduce(trues), np.logical_or.reduce(falses)
+            return np.logical_or.reduce(trues), np.logical_and.reduce(falses)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.Invert)):
+            true, false = self.truth(node.operand)
+            return false, true
+        if isinstance(node, ast.Compare):
+            operands = [node.left] + node.comparators
+            true = np.ones(self.table.n, dtype=bool)
+            false = np.zeros(self.table.n, dtype=bool)
+            for left, op, right in zip(operands, node.ops, operands[1:]):
+                op = _AST_COMPARE.get(type(op))
+                a = self.evaluate(left)
+                if op in ('in', 'not in'):
+                    result = np.isin(a, list(self.constant(right) or []))
+                    result = result if op == 'in' else ~result
+                    known = _known(a)
+                elif op is not None:
+                    b = self.evaluate(right)
+                    with np.errstate(invalid='ignore'):
+                        result = _ARRAY_COMPARE[op](a, b)
+                    known = _known(a) & _known(b)
+                else:
+                    raise ValueError(f"Unsupported comparison in {self.expression!r}")
+                true &= result & known
+                false |= ~result & known
+            return true, false
+        value = np.broadcast_to(self.evaluate(node), self.table.n)
+        known = _known(value)
+        true = value.astype(bool) & known
+        return true, ~true & known
+
+    def predicates(self) -> List[Predicate]:
+        """The parts that are not plain column-vs-constant criteria."""
+        return [lambda table, node=node: self.truth(node)[0] for node in self.rest]
+
+
+class FundamentalsTable:
+    """
+    Columnar, indexed fundamentals for a stock universe.
+
+    Args:
+        df: Fundamentals DataFrame with one row per stock (e.g. the screener's
+            stocks_df or FundamentalsCache.get_many())
+        ticker_column: Column holding the ticker
+
+    Attributes:
+        tickers: Ticker of every row (array)
+        numeric: Names of the numeric columns
+        text: Names of the text columns
+
+    Example:
+        >>> table = FundamentalsTable(stocks_df)
+        >>> table.screen([('PE Ratio', '>', 0), ('PE Ratio', '<=', 15),
+        ...               ('Dividend Yield (%)', '>=', 3)],
+        ...              rank_by='Dividend Yield (%)', top=10)
+        >>> table.screen({'Market Cap (B)': (10, None), 'Sector': ['Financial Services']})
+    """
+
+    def __init__(self, df: pd.DataFrame, ticker_column: str = 'Ticker'):
+        self._df = df
+        self.n = len(df)
+        self.tickers = (df[ticker_column].to_numpy(dtype=object) if ticker_column in df
+                        else df.index.to_numpy(dtype=object))
+        self._values: Dict[str, np.ndarray] = {}
+        self._codes: Dict[str, Tuple[np.ndarray, Dict[str, int]]] = {}
+        for column in df.columns:
+            if column == ticker_column:
+                continue
+            series = df[column]
+            if series.dtype == object:
+                # All-None or mixed None/number columns from a list of dicts
+                numbers = pd.to_numeric(series, errors='coerce')
+                if numbers.notna().sum() == series.notna().sum():
+                    series = numbers
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+                values.flags.writeable = False
+                self._values[column] = values
+            else:
+                labels = series.astype(object).where(series.notna(), 'N/A').astype(str)
+                categories, codes = np.unique(labels.to_numpy(dtype=object),
+                                              return_inverse=True)
+                self._codes[column] = (codes.astype(np.int32),
+                                       {c: k for k, c in enumerate(categories)})
+        self.numeric = list(self._values)
+        self.text = list(self._codes)
+
+        self._sorted: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._rows: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        # Scratch buffers reused by every screen
+        self._mask = np.empty(self.n, dtype=bool)
+        self._scratch = np.empty(self.n, dtype=bool)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        """Values of a column (read-only array; text columns as strings)."""
+        if column in self._values:
+            return self._values[column]
+        if column in self._codes:
+            codes, lookup = self._codes[column]
+            return np.array(list(lookup), dtype=object)[codes]
+        if column == 'Ticker':
+            return self.tickers
+        raise KeyError(f"Unknown column: {column}")
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._values or column in self._codes
+
+    # ========== Indexes ==========
+
+    def _index(self, column: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Row numbers sorted by value (NaN rows left out) and the sorted values."""
+        if column not in self._sorted:
+            if column not in self._values:
+                raise KeyError(f"No numeric column {column!r}")
+            values = self._values[column]
+            order = np.argsort(values, kind='stable')
+            order = order[:np.count_nonzero(~np.isnan(values))]
+            self._sorted[column] = (order, values[order])
+        return self._sorted[column]
+
+    def _bounds(self, rng: _Range) -> Tuple[int, int]:
+        """Slice [start, stop) of the sorted index inside a range."""
+        _, values = self._index(rng.column)
+        start = 0 if rng.lo is None else int(np.searchsorted(
+            values, rng.lo, side='right' if rng.lo_open else 'left'))
+        stop = len(values) if rng.hi is None else int(np.searchsorted(
+            values, rng.hi, side='left' if rng.hi_open else 'right'))
+        return start, max(start, stop)
+
+    def _group_rows(self, column: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Row numbers sorted by code, and where each code's rows start."""
+        if column not in self._rows:
+            codes, lookup = self._codes[column]
+            order = np.argsort(codes, kind='stable').astype(np.intp)
+            starts = np.searchsorted(codes[order], np.arange(len(lookup) + 1))
+            self._rows[column] = (order, starts)
+        return self._rows[column]
+
+    def _allowed(self, column: str, members: List[_Members]) -> '_Codes':
+        """All set criteria on one text column as one table of allowed codes."""
+        if column not in self._codes:
+            raise KeyError(f"No text column {column!r}")
+        lookup = self._codes[column][1]
+        allowed = np.ones(len(lookup), dtype=bool)
+        for member in members:
+            listed = np.zeros(len(lookup), dtype=bool)
+            listed[[lookup[v] for v in member.values if v in lookup]] = True
+            allowed &= ~listed if member.negate else listed
+        return _Codes(column, allowed)
+
+    # ========== Evaluation ==========
+
+    def _count(self, term) -> int:
+        """Number of stocks a predicate lets through."""
+        if isinstance(term, _Range):
+            start, stop = self._bounds(term)
+            values = self._index(term.column)[1][start:stop]
+            for value in set(term.exclude):
+                stop -= int(np.searchsorted(values, value, side='right')
+                            - np.searchsorted(values, value, side='left'))
+            return stop - start
+        _, starts = self._group_rows(term.column)
+        return int(np.diff(starts)[term.allowed].sum())
+
+    def _candidates(self, term) -> np.ndarray:
+        """Row numbers passing one predicate, straight from its index."""
+        if isinstance(term, _Range):
+            start, stop = self._bounds(term)
+            order, values = self._index(term.column)
+            rows = order[start:stop]
+            if term.exclude:
+                rows = rows[~np.isin(values[start:stop], term.exclude)]
+            return np.sort(rows)
+        order, starts = self._group_rows(term.column)
+        rows = [order[starts[c]:starts[c + 1]] for c in np.flatnonzero(term.allowed)]
+        return np.sort(np.concatenate(rows)) if rows else np.empty(0, dtype=np.intp)
+
+    def _test(self, term, rows: np.ndarray) -> np.ndarray:
+        """Boolean result of one predicate for some rows."""
+        if isinstance(term, _Codes):
+            return term.allowed[self._codes[term.column][0][rows]]
+        values = self._values[term.column][rows]
+        result = ~np.isnan(values)
+        if term.lo is not None:
+            result &= values > term.lo if term.lo_open else values >= term.lo
+        if term.hi is not None:
+            result &= values < term.hi if term.hi_open else values <= term.hi
+        for value in term.exclude:
+            result &= values != value
+        return result
+
+    def _apply(self, term, mask: np.ndarray):
+        """AND one predicate into a full-table mask, in place."""
+        scratch = self._scratch
+        if isinstance(term, _Codes):
+            np.take(term.allowed, self._codes[term.column][0], out=scratch)
+            mask &= scratch
+            return
+        values = self._values[term.column]
+        if term.lo is None and term.hi is None:
+            np.isnan(values, out=scratch)
+            np.logical_not(scratch, out=scratch)
+            mask &= scratch
+        # Comparisons with NaN are False, so missing values drop out here
+        if term.lo is not None:
+            (np.greater if term.lo_open else np.greater_equal)(values, term.lo, out=scratch)
+            mask &= scratch
+        if term.hi is not None:
+            (np.less if term.hi_open else np.less_equal)(values, term.hi, out=scratch)
+            mask &= scratch
+        for value in term.exclude:
+            np.not_equal(values, value, out=scratch)
+            mask &= scratch
+
+    def select(self, criteria=None, where: Optional[Union[Predicate, Sequence[Predicate]]] = None,
+               rank_by: Optional[Union[str, Sequence[str], Predicate]] = None,
+               ascending: Union[bool, Sequence[bool]] = False,
+               top: Optional[int] = None) -> np.ndarray:
+        """
+        Row numbers of the stocks passing a screen, ranked if asked.
+
+        Parameters:
+        -----------
+        criteria : dict or list of (column, op, value)
+            {column: (min, max)} inclusive ranges (None = no bound), {column:
+            [values]} for text columns, or tuples with op one of <, <=, >,
+            >=, ==, !=, between, in, not in. All criteria must hold, and
+            a missing value passes none of them (not even !=).
+        where : callable or list of callables, optional
+            User predicates: function(table) -> boolean array over all rows,
+            e.g. lambda t: t['Current Price'] < 0.9 * t['52W High']
+        rank_by : str, list of str or callable, optional
+            Column(s) to sort the result by, or function(table) -> score
+            array; missing values go last
+        ascending : bool or list of bool
+            Sort direction (default: highest first)
+        top : int, optional
+            Keep only the first `top` stocks after ranking
+
+        Returns:
+        --------
+        np.ndarray
+            Row numbers (in table order if not ranked)
+        """
+        terms, members = [], {}
+        for term in _parse(criteria):
+            if term.column not in self:
+                raise KeyError(f"Unknown column: {term.column}")
+            if isinstance(term, _Members):
+                members.setdefault(term.column, []).append(term)
+            else:
+                terms.append(term)
+        terms += [self._allowed(column, group) for column, group in members.items()]
+
+        rows = None
+        if terms and self.n:
+            counts = [self._count(term) for term in terms]
+            best = int(np.argmin(counts))
+            if counts[best] <= _SELECTIVE * self.n:
+                # Few matches: start from that predicate's index
+                rows = self._candidates(terms[best])
+                for k, term in enumerate(terms):
+                    if k != best and len(rows):
+                        rows = rows[self._test(term, rows)]
+        if rows is None:
+            mask = self._mask
+            mask.fill(True)
+            for term in terms:
+                self._apply(term, mask)
+            if where is not None:
+                for predicate in (where if isinstance(where, (list, tuple)) else [where]):
+                    mask &= np.asarray(predicate(self), dtype=bool)
+            rows = np.flatnonzero(mask)
+        elif where is not None:
+            for predicate in (where if isinstance(where, (list, tuple)) else [where]):
+                rows = rows[np.asarray(predicate(self), dtype=bool)[rows]]
+
+        if rank_by is not None:
+            rows = self._rank(rows, rank_by, ascending)
+        return rows if top is None else rows[:top]
+
+    def _rank(self, rows: np.ndarray, rank_by, ascending) -> np.ndarray:
+        if callable(rank_by):
+            keys = [np.asarray(rank_by(self), dtype=np.float64)]
+        else:
+            columns = [rank_by] if isinstance(rank_by, str) else list(rank_by)
+            keys = [self._values[c] if c in self._values else self[c] for c in columns]
+        directions = ([ascending] * len(keys) if isinstance(ascending, bool)
+                      else list(ascending))
+
+        # np.lexsort sorts by the last key first
+        sort_keys = []
+        for values, up in zip(reversed(keys), reversed(directions)):
+            values = values[rows]
+            if values.dtype == object:
+                values = np.unique(values, return_inverse=True)[1].astype(np.float64)
+            missing = np.isnan(values)
+            values = np.where(missing, np.inf, values if up else -values)
+            sort_keys.extend([values, missing])
+        return rows[np.lexsort(sort_keys)]
+
+    def screen(self, criteria=None, where=None, rank_by=None, ascending=False,
+               top: Optional[int] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Stocks passing a screen as a DataFrame (see select() for the parameters).
+
+        Only the selected rows (and columns, if given) are copied.
+        """
+        rows = self.select(criteria, where, rank_by, ascending, top)
+        result = self._df.take(rows)
+        return result if columns is None else result[columns]
+
+    def query(self, expression: str, rank_by: Optional[Union[str, Sequence[str], Predicate]] = None,
+              ascending: Union[bool, Sequence[bool]] = False, top: Optional[int] = None,
+              columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Stocks matching a query string.
+
+        Parameters:
+        -----------
+        expression : str
+            Conditions joined with and / or / not (or &, |, ~), e.g.
+            "PE < 15 and DY >= 3 and Sector in ['Technology']". Column
+            names that are not identifiers go in backticks (`Market Cap (B)`)
+            or use a short name from ALIASES (PE, DY, MarketCap, MACD, BBL...).
+            Arithmetic and column-vs-column comparisons are allowed:
+            "Close > SMA_200 and Close < 0.8 * High52W"
+        rank_by, ascending, top, columns
+            As in screen(); rank_by may use the short names too
+
+        Returns:
+        --------
+        pd.DataFrame
+            Matching stocks
+
+        Example:
+        --------
+        >>> table.query("PE > 0 and PE < 15 and DY > 3", rank_by='DY', top=10)
+        """
+        parsed = _Query(expression, self)
+        if isinstance(rank_by, str):
+            rank_by = ALIASES.get(rank_by, rank_by) if rank_by not in self else rank_by
+        elif rank_by is not None and not callable(rank_by):
+            rank_by = [ALIASES.get(c, c) if c not in self else c for c in rank_by]
+        return self.screen(parsed.criteria, parsed.predicates() or None,
+                           rank_by, ascending, top, columns)
+
+    def frame(self) -> pd.DataFrame:
+        """The whole table as a DataFrame."""
+        return self._df
+
+
+def screen_stocks(df: Union[pd.DataFrame, FundamentalsTable], min_market_cap=None, max_pe=None,
+                  min_dividend_yield=None, sectors=None, criteria=None, where=None,
+                  rank_by=None, ascending=False, top=None) -> pd.DataFrame:
+    """
+    Same screen as screen_stocks() in the screener notebook, evaluated by
+    FundamentalsTable: one pass, no intermediate frames.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame or FundamentalsTable
+        Stock fundamentals (pass a FundamentalsTable to reuse its indexes
+        across screens)
+    min_market_cap, max_pe, min_dividend_yield, sectors
+        As in the notebook (max_pe also drops negative PE)
+    criteria, where, rank_by, ascending, top
+        Extra criteria, user predicates and ranking - see
+        FundamentalsTable.select()
+
+    Returns:
+    --------
+    pd.DataFrame
+        Matching stocks (same rows as the notebook version, in the same order
+        unless rank_by is given)
+    """
+    table = df if isinstance(df, FundamentalsTable) else FundamentalsTable(df)
+    terms = _as_tuples(criteria)
+    if min_market_cap is not None:
+        terms.append(('Market Cap (B)', '>=', min_market_cap))
+    if max_pe is not None:
+        terms += [('PE Ratio', '<=', max_pe), ('PE Ratio', '>', 0)]
+    if min_dividend_yield is not None:
+        terms.append(('Dividend Yield (%)', '>=', min_dividend_yield))
+    if sectors is not None:
+        terms.append(('Sector', 'in', sectors))
+    return table.screen(terms, where, rank_by, ascending, top)
+
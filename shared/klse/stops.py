@@ -0,0 +1,207 @@
+"""
+Stop-Loss / Take-Profit Exits
+Fast replacement for the notebook's add_stop_loss(), working on plain NumPy arrays.
+
+Instead of stepping through every bar with df.iloc / df.loc, the exits are found
+trade by trade: for each entry, the bars it covers are checked against the stop
+and target levels in one vectorized comparison. Works on one ticker (1-D arrays)
+or a whole (dates x tickers) matrix.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import indicators
+from . import panel as _panel
+from .panel import Panel
+
+
+def _exits_1d(close: np.ndarray, signal: np.ndarray, position: np.ndarray,
+              atr: Optional[np.ndarray], stop_pct: Optional[float],
+              trailing: bool, take_profit: Optional[float],
+              atr_mult: Optional[float]) -> list:
+    """Bars where a stop or target closes the trade, one ticker."""
+    n = len(close)
+    is_long = signal == 1
+    is_entry = position == 1
+    # Same precedence as the notebook loop: entry, then stop check, then exit
+    is_check = ~is_entry & is_long
+    is_exit = ~is_entry & ~is_long & (position == -1)
+
+    entries = np.flatnonzero(is_entry)
+    strategy_exits = np.flatnonzero(is_exit)
+    hits = []
+
+    for k, entry in enumerate(entries):
+        end = entries[k + 1] if k + 1 < len(entries) else n
+        nxt = np.searchsorted(strategy_exits, entry, side='right')
+        if nxt < len(strategy_exits):
+            end = min(end, strategy_exits[nxt])
+        if end <= entry + 1:
+            continue
+
+        bars = slice(entry + 1, end)
+        price = close[bars]
+        entry_price = close[entry]
+        # fmax: dates a ticker lacks on a panel's calendar are NaN
+        ref = (np.fmax.accumulate(close[entry:end])[1:] if trailing
+               else entry_price)
+
+        level = np.full(len(price), -np.inf)
+        if stop_pct is not None:
+            level = np.fmax(level, ref * (1 - stop_pct))
+        if atr_mult is not None:
+            level = np.fmax(level, ref - atr_mult * atr[entry])
+
+        hit = price < level
+        if take_profit is not None:
+            hit |= price > entry_price * (1 + take_profit)
+        hit &= is_check[bars]
+
+        if hit.any():
+            hits.append(entry + 1 + int(hit.argmax()))
+    return hits
+
+
+def stop_loss_exits(close: np.ndarray, signal: np.ndarray,
+                    position: np.ndarray, stop_pct: Optional[float] = 0.05,
+                    trailing: bool = False, take_profit: Optional[float] = None,
+                    atr: Optional[np.ndarray] = None,
+                    atr_mult: Optional[float] = None,
+                    stay_out: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Apply stop-loss / take-profit exits to Signal and Position arrays.
+
+    Parameters:
+    -----------
+    close : np.ndarray
+        Close prices, 1-D (one ticker) or 2-D (dates x tickers)
+    signal : np.ndarray
+        Strategy Signal (1 = long, 0 = flat), same shape as close
+    position : np.ndarray
+        Strategy Position (Signal.diff(): 1 = entry, -1 = exit)
+    stop_pct : float or None
+        Exit when Close falls this fraction below the entry price (5% default)
+    trailing : bool
+        Measure stop_pct / atr_mult from the highest Close since entry
+        instead of the entry price
+    take_profit : float or None
+        Exit when Close rises this fraction above the entry price
+    atr : np.ndarray, optional
+        ATR values, same shape as close (needed for atr_mult)
+    atr_mult : float or None
+        Exit when Close falls atr_mult x ATR (at entry) below the reference
+    stay_out : bool
+        False (default) reproduces add_stop_loss(): only the exit bar is
+        flattened. True stays flat until the strategy's next entry.
+
+    Returns:
+    --------
+    tuple of np.ndarray
+        New (signal, position) arrays; the inputs are not modified
+    """
+    if atr_mult is not None and atr is None:
+        raise ValueError("atr_mult needs the atr array")
+
+    close = np.asarray(close, dtype=np.float64)
+    signal = np.array(signal, dtype=np.float64)
+    position = np.array(position, dtype=np.float64)
+    one_d = close.ndim == 1
+    if one_d:
+        close, signal, position = close[:, None], signal[:, None], position[:, None]
+        atr = None if atr is None else np.asarray(atr, dtype=np.float64)[:, None]
+
+    for col in range(close.shape[1]):
+        col_atr = None if atr is None else atr[:, col]
+        hits = _exits_1d(close[:, col], signal[:, col], position[:, col],
+                         col_atr, stop_pct, trailing, take_profit, atr_mult)
+        for bar in hits:
+            if stay_out:
+                rest = signal[bar:, col]
+                run = np.flatnonzero((rest != 1) & ~np.isnan(rest))
+                end = bar + run[0] if len(run) else len(signal)
+                signal[bar:end, col] = 0
+                position[bar + 1:end, col] = 0
+                if end < len(signal) and position[end, col] == -1:
+                    position[end, col] = 0
+            else:
+                signal[bar, col] = 0
+            position[bar, col] = -1
+
+    if one_d:
+        return signal[:, 0], position[:, 0]
+    return signal, position
+
+
+def add_stop_loss(df: pd.DataFrame, stop_pct: Optional[float] = 0.05,
+                  trailing: bool = False, take_profit: Optional[float] = None,
+                  atr_mult: Optional[float] = None, atr_length: int = 14,
+                  stay_out: bool = False) -> pd.DataFrame:
+    """
+    Drop-in replacement for the notebook's add_stop_loss().
+
+    With the default arguments the result is identical to the notebook
+    version. See stop_loss_exits() for the extra options. For ATR stops the
+    'ATR' column is used if present, otherwise ATR(atr_length) is computed
+    from High/Low/Close.
+
+    Example:
+    --------
+    >>> df = add_stop_loss(ma_crossover(df))                  # 5% fixed stop
+    >>> df = add_stop_loss(df, stop_pct=0.08, trailing=True)  # 8% trailing stop
+    >>> df = add_stop_loss(df, stop_pct=None, atr_mult=3, take_profit=0.2)
+    """
+    df = df.copy()
+    atr = None
+    if atr_mult is not None:
+        if 'ATR' in df.columns:
+            atr = df['ATR'].to_numpy(dtype=np.float64)
+        else:
+            atr = indicators.atr(*(df[c].to_numpy(dtype=np.float64)
+                                   for c in ['High', 'Low', 'Close']), atr_length)
+
+    signal, position = stop_loss_exits(
+        df['Close'].to_numpy(dtype=np.float64),
+        df['Signal'].to_numpy(dtype=np.float64),
+        df['Position'].to_numpy(dtype=np.float64),
+        stop_pct=stop_pct, trailing=trailing, take_profit=take_profit,
+        atr=atr, atr_mult=atr_mult, stay_out=stay_out,
+    )
+    df['Signal'] = signal.astype(df['Signal'].dtype)
+    df['Position'] = position.astype(df['Position'].dtype)
+    return df
+
+
+def apply_stop_loss(panel: Panel, signal: np.ndarray,
+                    **kwargs) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Batched stop-loss for the panel engine.
+
+    Parameters:
+    -----------
+    panel : Panel
+        Panel returned by panel.add_indicators()
+    signal : np.ndarray
+        Signal array from one of the panel strategies
+    **kwargs
+        Options for stop_loss_exits() (stop_pct, trailing, take_profit,
+        atr_mult, stay_out). ATR(14) is computed when atr_mult is given.
+
+    Returns:
+    --------
+    tuple of np.ndarray
+        (signal, position) to pass on to panel.backtest(..., position=position)
+
+    Example:
+    --------
+    >>> ind = add_indicators(panel)
+    >>> signal, position = apply_stop_loss(ind, ma_crossover(ind), stop_pct=0.05)
+    >>> result = backtest(ind, signal, position=position)
+    """
+    position = signal - _panel._previous(signal, panel['Valid'] > 0)
+    atr = None
+    if kwargs.get('atr_mult') is not None:
+        atr = indicators.atr(panel['High'], panel['Low'], panel['Close'], 14)
+    return stop_loss_exits(panel['Close'], signal, position, atr=atr, **kwargs)
@@ -0,0 +1,431 @@
+"""
+Columnar Price Store
+One partitioned Parquet store for the daily prices of every ticker, in place
+of the screener's data/{ticker}_prices.csv files.
+
+save_stock_data() writes one CSV per ticker and load_stock_data() parses it
+again with parse_dates=True. With hundreds of tickers and years of history,
+text parsing and date inference dominate the load time. PriceStore keeps
+the same data as typed columns (float32 prices, int64 volume that is null
+where the source had none, float64 Dividends / Stock Splits, datetime64
+dates), one partition per ticker with one row group per year:
+
+    data/prices/ticker=1155.KL/part-0.parquet     (row groups: 2015, 2016, ...)
+
+A read only opens the partitions of the requested tickers and only decodes
+the row groups whose date statistics overlap the requested range, and
+load_panel() reads many tickers straight into a Panel. migrate_csv()
+converts existing CSV files, and benchmark_load() compares the load time
+with the CSV path.
+
+Usage (from the shared/ directory):
+    python -m klse.store migrate ../projects/klse-stock-screener/data
+    python -m klse.store benchmark --tickers 200 --days 2500
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .cache import ACTION_COLUMNS, OHLCV_COLUMNS, PriceCache
+from .panel import Panel
+
+
+SCHEMA = pa.schema([
+    ('Date', pa.timestamp('ns')),
+    ('Open', pa.float32()),
+    ('High', pa.float32()),
+    ('Low', pa.float32()),
+    ('Close', pa.float32()),
+    ('Volume', pa.int64()),
+    ('Dividends', pa.float64()),
+    ('Stock Splits', pa.float64()),
+])
+
+# Columns returned by read(), scan() and frames() unless others are asked for
+STORE_COLUMNS = OHLCV_COLUMNS + ACTION_COLUMNS
+
+
+def _bound(value) -> Optional[pd.Timestamp]:
+    return None if value is None else pd.Timestamp(value)
+
+
+class PriceStore:
+    """
+    Partitioned Parquet store of daily OHLCV data for many tickers.
+
+    Each ticker is a partition (ticker=<ticker>/part-0.parquet) and each
+    year a row group inside it, so any Parquet reader with hive partitioning
+    (pyarrow.dataset, DuckDB, Polars) can open the whole store too.
+
+    Args:
+        root: Directory holding the ticker partitions
+
+    Example:
+        >>> store = PriceStore('data/prices')
+        >>> store.write('1155.KL', df)                                  # merges with what is stored
+        >>> store.read('1155.KL', start='2023-01-01', end='2024-01-01') # decodes the 2023 row group only
+        >>> panel = store.load_panel(KLSE_STOCKS, start='2021-01-01')   # dates x tickers arrays
+    """
+
+    def __init__(self, root: str = 'data/prices'):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    # ========== Layout ==========
+
+    def path(self, ticker: str) -> Path:
+        """Parquet file holding one ticker."""
+        return self.root / f'ticker={ticker}' / 'part-0.parquet'
+
+    def tickers(self) -> List[str]:
+        """Tickers currently stored."""
+        return sorted(p.parent.name.split('=', 1)[1]
+                      for p in self.root.glob('ticker=*/part-0.parquet'))
+
+    def years(self, ticker: str) -> List[int]:
+        """Years stored for a ticker (one row group each)."""
+        path = self.path(ticker)
+        if not path.exists():
+            return []
+        metadata = pq.ParquetFile(path).metadata
+        return [metadata.row_group(g).column(0).statistics.min.year
+                for g in range(metadata.num_row_groups)]
+
+    # ========== Writing ==========
+
+    @staticmethod
+    def _typed(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        OHLCV and action columns in the store's types, with a sorted Date
+        column. Missing Dividends / Stock Splits are 0 (no action), as in
+        PriceCache; missing Volume stays missing (null), not 0.
+        """
+        df = PriceCache._clean(df)
+        typed = pd.DataFrame({'Date': df.index.to_numpy(dtype='datetime64[ns]')})
+        for column in STORE_COLUMNS:
+            values = (pd.to_numeric(df[column], errors='coerce') if column in df.columns
+                      else pd.Series(np.nan, index=df.index))
+            if column == 'Volume':
+                typed[column] = values.round().astype('Int64').array
+            elif column in ACTION_COLUMNS:
+                typed[column] = values.fillna(0.0).to_numpy(np.float64)
+            else:
+                typed[column] = values.to_numpy(np.float32)
+        return typed
+
+    def write(self, ticker: str, df: pd.DataFrame, replace: bool = False):
+        """
+        Store a ticker's bars.
+
+        Bars on dates that are already stored are overwritten, other stored
+        bars are kept.
+
+        Parameters:
+        -----------
+        ticker : str
+            Stock ticker (e.g., '1155.KL')
+        df : pd.DataFrame
+            OHLCV data with a date index (as returned by get_stock_data)
+        replace : bool
+            Drop everything stored for the ticker first
+        """
+        typed = self._typed(df)
+        path = self.path(ticker)
+        if path.exists() and not replace:
+            # Int64 keeps null volumes null (to_pandas() would make them float NaN)
+            stored = self._with_actions(pq.read_table(path)).to_pandas(
+                types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+            typed = pd.concat([stored, typed], ignore_index=True)
+            typed = (typed.drop_duplicates('Date', keep='last')
+                     .sort_values('Date', ignore_index=True))
+        if typed.empty:
+            self.delete(ticker)
+            return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        years = typed['Date'].dt.year.to_numpy()
+        # Snappy without dictionaries decodes ~3x faster than zstd for price columns
+        with pq.ParquetWriter(tmp, SCHEMA, compression='snappy', use_dictionary=False) as writer:
+            # One row group per year: its Date statistics let reads skip it
+            for year in np.unique(years):
+                writer.write_table(pa.Table.from_pandas(typed[years == year], schema=SCHEMA,
+                                                        preserve_index=False))
+        os.replace(tmp, path)
+
+    def delete(self, ticker: str):
+        """Remove everything stored for a ticker."""
+        shutil.rmtree(self.path(ticker).parent, ignore_errors=True)
+
+    # ========== Reading ==========
+
+    @staticmethod
+    def _with_actions(table: pa.Table, columns: Iterable[str] = ACTION_COLUMNS) -> pa.Table:
+        """Add the action columns missing from files written before they were stored."""
+        for column in columns:
+            if column in ACTION_COLUMNS and column not in table.column_names:
+                table = table.append_column(column, pa.array(np.zeros(table.num_rows)))
+        return table
+
+    def _table(self, ticker: str, start: Optional[pd.Timestamp], end: Optional[pd.Timestamp],
+               columns: List[str]) -> Optional[pa.Table]:
+        """Bars in [start, end), decoding only the row groups that overlap it."""
+        path = self.path(ticker)
+        if not path.exists():
+            return None
+        parquet = pq.ParquetFile(path)
+        groups = []
+        for g in range(parquet.metadata.num_row_groups):
+            stats = parquet.metadata.row_group(g).column(0).statistics
+            if ((start is None or stats.max >= start)
+                    and (end is None or stats.min < end)):
+                groups.append(g)
+        if not groups:
+            return None
+        stored = parquet.schema_arrow.names
+        table = parquet.read_row_groups(groups, columns=['Date'] + [c for c in columns
+                                                                    if c in stored])
+        table = self._with_actions(table, columns).select(['Date'] + columns)
+        if start is not None or end is not None:
+            dates = table.column('Date').to_numpy()
+            keep = np.ones(len(dates), dtype=bool)
+            if start is not None:
+                keep &= dates >= start.to_datetime64()
+            if end is not None:
+                keep &= dates < end.to_datetime64()
+            table = table.filter(keep)
+        return table if table.num_rows else None
+
+    def read(self, ticker: str, start=None, end=None,
+             columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        One ticker's bars for [start, end), like load_stock_data().
+
+        Returns:
+        --------
+        pd.DataFrame or None
+            OHLCV, Dividends and Stock Splits indexed by Date (float32
+            prices; int64 volume, or float64 with NaN where volume is
+            missing), or None if nothing is stored in the range
+        """
+        table = self._table(ticker, _bound(start), _bound(end),
+                            list(columns) if columns else list(STORE_COLUMNS))
+        return None if table is None else table.to_pandas().set_index('Date')
+
+    def scan(self, tickers: Optional[Iterable[str]] = None, start=None, end=None,
+             columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Bars of many tickers in one long table.
+
+        Parameters:
+        -----------
+        tickers : iterable of str, optional
+            Tickers to read (default: every stored ticker)
+        start, end : str or datetime, optional
+            Date range, end exclusive like yf.download
+        columns : list of str, optional
+            Columns to read (default: OHLCV, Dividends and Stock Splits)
+
+        Returns:
+        --------
+        pd.DataFrame
+            Ticker, Date and the requested columns, sorted by ticker and date
+        """
+        start, end = _bound(start), _bound(end)
+        tickers = list(dict.fromkeys(tickers)) if tickers is not None else self.tickers()
+        columns = list(columns) if columns is not None else list(STORE_COLUMNS)
+        tables = []
+        for ticker in tickers:
+            table = self._table(ticker, start, end, columns)
+            if table is not None:
+                tables.append(table.add_column(0, 'Ticker',
+                                               pa.array([ticker] * table.num_rows, pa.string())))
+        if not tables:
+            return pd.DataFrame(columns=['Ticker', 'Date'] + columns)
+        return pa.concat_tables(tables).to_pandas()
+
+    def frames(self, tickers: Optional[Iterable[str]] = None, start=None,
+               end=None) -> Dict[str, pd.DataFrame]:
+        """Ticker -> DataFrame as from read(), for many tickers (those with no bars are left out)."""
+        start, end = _bound(start), _bound(end)
+        frames = {}
+        for ticker in (list(dict.fromkeys(tickers)) if tickers is not None else self.tickers()):
+            table = self._table(ticker, start, end, list(STORE_COLUMNS))
+            if table is not None:
+                frames[ticker] = table.to_pandas().set_index('Date')
+        return frames
+
+    def load_panel(self, tickers: Optional[Iterable[str]] = None, start=None, end=None) -> Panel:
+        """
+        Many tickers as one Panel (dates x tickers float64 arrays), read
+        straight from the stored columns without per-ticker DataFrames.
+
+        Example:
+        --------
+        >>> panel = store.load_panel(['1155.KL', '1295.KL'], start='2021-01-01')
+        >>> result = run_backtest(panel, 'ma_crossover')
+        """
+        start, end = _bound(start), _bound(end)
+        tickers = list(dict.fromkeys(tickers)) if tickers is not None else self.tickers()
+        read = {}
+        for ticker in tickers:
+            table = self._table(ticker, start, end, list(OHLCV_COLUMNS))
+            if table is not None:
+                read[ticker] = table
+        if not read:
+            return Panel(pd.DatetimeIndex([]), [])
+
+        dates = {t: table.column('Date').to_numpy() for t, table in read.items()}
+        index = np.unique(np.concatenate(list(dates.values())))
+        fields = {field: np.full((len(index), len(read)), np.nan) for field in OHLCV_COLUMNS}
+        for k, (ticker, table) in enumerate(read.items()):
+            rows = np.searchsorted(index, dates[ticker])
+            for field in OHLCV_COLUMNS:
+                fields[field][rows, k] = table.column(field).to_numpy()
+        return Panel(pd.DatetimeIndex(index, name='Date'), list(read), fields)
+
+
+# ========== CSV migration ==========
+
+def csv_ticker(path: Path) -> str:
+    """Ticker of a save_stock_data() CSV file: 1155_KL_prices.csv -> '1155.KL'."""
+    name = path.name[:-len('_prices.csv')]
+    base, _, exchange = name.rpartition('_')
+    return f'{base}.{exchange}' if base else name
+
+
+def migrate_csv(data_dir: str = 'data', store: Optional[PriceStore] = None,
+                remove: bool = False, verbose: bool = True) -> List[str]:
+    """
+    Move the {ticker}_prices.csv files written by save_stock_data() into a
+    PriceStore, Dividends and Stock Splits included.
+
+    Parameters:
+    -----------
+    data_dir : str
+        Directory holding the CSV files
+    store : PriceStore, optional
+        Destination (default: PriceStore(f'{data_dir}/prices'))
+    remove : bool
+        Delete each CSV file once it is stored
+
+    Returns:
+    --------
+    list of str
+        The migrated tickers
+    """
+    store = store or PriceStore(os.path.join(data_dir, 'prices'))
+    migrated = []
+    for path in sorted(Path(data_dir).glob('*_prices.csv')):
+        ticker = csv_ticker(path)
+        store.write(ticker, pd.read_csv(path, index_col=0, parse_dates=True))
+        migrated.append(ticker)
+        if remove:
+            path.unlink()
+        if verbose:
+            print(f"✅ {path.name} -> {ticker}")
+    return migrated
+
+
+# ========== Benchmark ==========
+
+def benchmark_load(n_tickers: int = 200, n_days: int = 2500, repeat: int = 3,
+                   work_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    Time loading n_tickers stocks of n_days bars from per-ticker CSV files
+    (the notebook's load_stock_data) and from a PriceStore.
+
+    Returns:
+    --------
+    pd.DataFrame
+        Seconds (best of repeat) and speedup over the CSV path for: every
+        ticker, every ticker's last year, and one ticker; plus the size on disk
+    """
+    from .indicators import _synthetic_ohlcv
+
+    frames = {f'{1000 + k}.KL': _synthetic_ohlcv(n_days, k) for k in range(n_tickers)}
+    tickers = list(frames)
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        csv_dir = Path(tmp, 'csv')
+        csv_dir.mkdir()
+        for ticker, df in frames.items():
+            df.rename_axis('Date').to_csv(csv_dir / f"{ticker.replace('.', '_')}_prices.csv")
+        store = PriceStore(os.path.join(tmp, 'prices'))
+        migrate_csv(str(csv_dir), store, verbose=False)
+
+        last = next(iter(frames.values())).index[-1]
+        year_ago = last - pd.DateOffset(years=1)
+
+        def read_csv(ticker):
+            return pd.read_csv(csv_dir / f"{ticker.replace('.', '_')}_prices.csv",
+                               index_col=0, parse_dates=True)
+
+        cases = {
+            'All tickers': (lambda: [read_csv(t) for t in tickers],
+                            lambda: store.load_panel(tickers)),
+            'All tickers, last year': (lambda: [read_csv(t).loc[year_ago:] for t in tickers],
+                                       lambda: store.load_panel(tickers, start=year_ago)),
+            'One ticker': (lambda: read_csv(tickers[0]),
+                           lambda: store.read(tickers[0])),
+        }
+
+        def best(run):
+            times = []
+            for _ in range(repeat):
+                began = time.perf_counter()
+                run()
+                times.append(time.perf_counter() - began)
+            return min(times)
+
+        rows = []
+        for case, (csv_run, store_run) in cases.items():
+            csv_time, store_time = best(csv_run), best(store_run)
+            rows.append({'Case': case, 'CSV (s)': csv_time, 'PriceStore (s)': store_time,
+                         'Speedup': csv_time / store_time})
+
+        def size(path):
+            return sum(p.stat().st_size for p in Path(path).rglob('*') if p.is_file()) / 1e6
+
+        rows.append({'Case': 'Size on disk (MB)', 'CSV (s)': size(csv_dir),
+                     'PriceStore (s)': size(store.root),
+                     'Speedup': size(csv_dir) / size(store.root)})
+    return pd.DataFrame(rows).set_index('Case')
+
+
+# ========== Command line ==========
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Columnar KLSE price store')
+    commands = parser.add_subparsers(dest='command', required=True)
+    migrate = commands.add_parser('migrate', help='Move {ticker}_prices.csv files into a store')
+    migrate.add_argument('data_dir', nargs='?', default='data')
+    migrate.add_argument('--store', help='Store directory (default: <data_dir>/prices)')
+    migrate.add_argument('--remove', action='store_true', help='Delete the CSV files afterwards')
+    bench = commands.add_parser('benchmark', help='Load time: CSV files vs PriceStore')
+    bench.add_argument('--tickers', type=int, default=200)
+    bench.add_argument('--days', type=int, default=2500)
+    bench.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.command == 'migrate':
+        store = PriceStore(args.store) if args.store else None
+        migrated = migrate_csv(args.data_dir, store, remove=args.remove)
+        print(f"[OK] {len(migrated)} tickers migrated")
+    else:
+        print(benchmark_load(args.tickers, args.days, args.repeat).round(3).to_string())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
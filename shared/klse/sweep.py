@@ -0,0 +1,334 @@
+"""
+Parameter-Sweep Grid Runner
+Backtests every combination in a parameter grid for ma_crossover, rsi_strategy
+or macd_strategy on one ticker.
+
+The price series is sent to each worker once, and indicators are computed once
+per distinct length (SMAs come from a single running sum), so combinations only
+pay for their own signal and backtest. Combinations are evaluated in batches as
+columns of a Panel. Large grids are split across a process pool, one share of
+the batches per worker; smaller ones run in this process, where they finish
+before a pool would have started and received the prices.
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import indicators
+from . import panel as _panel
+from .panel import METRIC_COLUMNS, Panel
+
+
+PARAM_NAMES = {
+    'ma_crossover': ['fast', 'slow'],
+    'rsi_strategy': ['length', 'lower', 'upper'],
+    'macd_strategy': ['fast', 'slow', 'signal'],
+}
+
+DEFAULT_PARAMS = {
+    'ma_crossover': {'fast': 50, 'slow': 200},
+    'rsi_strategy': {'length': 14, 'lower': 30, 'upper': 70},
+    'macd_strategy': {'fast': 12, 'slow': 26, 'signal': 9},
+}
+
+
+# Combinations (times walk-forward windows) from which n_jobs=None uses every
+# CPU. A grid of ~11,000 MA combinations on 10 years of daily bars takes about
+# as long in a pool as in this process, so below this the pool only adds work.
+_PARALLEL_MIN = 50000
+
+
+def _default_jobs(n_jobs: Optional[int], work: int) -> int:
+    """n_jobs, or all CPUs for at least _PARALLEL_MIN combinations, else 1."""
+    if n_jobs:
+        return n_jobs
+    return (os.cpu_count() or 1) if work >= _PARALLEL_MIN else 1
+
+
+# ========== Worker state ==========
+# Set once per process by _init_worker() and shared by every combination.
+
+_CLOSE = None
+_START = 0
+_CACHE = {}
+
+
+def _init_worker(close: np.ndarray, start: int):
+    global _CLOSE, _START, _CACHE
+    _CLOSE = close
+    _START = start
+    _CACHE = {'cumsum': np.concatenate([[0.0], np.cumsum(close)])}
+
+
+def _sma(length: int) -> np.ndarray:
+    key = ('sma', length)
+    if key not in _CACHE:
+        csum = _CACHE['cumsum']
+        out = np.full(len(_CLOSE), np.nan)
+        out[length - 1:] = (csum[length:] - csum[:-length]) / length
+        _CACHE[key] = out
+    return _CACHE[key]
+
+
+def _ema(length: int) -> np.ndarray:
+    key = ('ema', length)
+    if key not in _CACHE:
+        _CACHE[key] = indicators.ema(_CLOSE[:, None], length)[:, 0]
+    return _CACHE[key]
+
+
+def _rsi(length: int) -> np.ndarray:
+    key = ('rsi', length)
+    if key not in _CACHE:
+        _CACHE[key] = indicators.rsi(_CLOSE[:, None], length)[:, 0]
+    return _CACHE[key]
+
+
+# ========== Signals (one column per combination) ==========
+
+def _ma_signals(combos: List[dict]) -> np.ndarray:
+    return np.column_stack([
+        (_sma(c['fast']) > _sma(c['slow'])).astype(np.float64) for c in combos
+    ])
+
+
+def _rsi_signals(combos: List[dict]) -> np.ndarray:
+    # Enter below `lower`, stay long until RSI climbs above `upper`
+    events = np.full((len(_CLOSE), len(combos)), np.nan)
+    for j, c in enumerate(combos):
+        rsi = _rsi(c['length'])
+        events[rsi > c['upper'], j] = 0.0
+        events[rsi < c['lower'], j] = 1.0
+    events[:_START] = np.nan
+    return pd.DataFrame(events).ffill().fillna(0.0).to_numpy()
+
+
+def _macd_signals(combos: List[dict]) -> np.ndarray:
+    macd = np.column_stack([_ema(c['fast']) - _ema(c['slow']) for c in combos])
+    signal = np.empty_like(macd)
+    lengths = np.array([c['signal'] for c in combos])
+    for length in np.unique(lengths):
+        cols = np.flatnonzero(lengths == length)
+        signal[:, cols] = indicators.ema(macd[:, cols], int(length))
+    return (macd > signal).astype(np.float64)
+
+
+_SIGNALS = {
+    'ma_crossover': _ma_signals,
+    'rsi_strategy': _rsi_signals,
+    'macd_strategy': _macd_signals,
+}
+
+
+def _warmup(strategy: str, params: dict) -> int:
+    """Rows before the strategy's own indicators become valid."""
+    if strategy == 'ma_crossover':
+        return params['slow'] - 1
+    if strategy == 'rsi_strategy':
+        return params['length']
+    return params['slow'] + params['signal'] - 2
+
+
+def _backtest_rows(strategy: str, combos: List[dict], index: pd.DatetimeIndex,
+                   capital: float, commission: float, lo: int, hi: int) -> Panel:
+    """Backtest combinations over rows [lo, hi) using full-history indicators."""
+    k = len(combos)
+    batch = Panel(index[lo:hi], list(range(k)), {
+        'Close': np.repeat(_CLOSE[lo:hi, None], k, axis=1),
+        'Valid': np.ones((hi - lo, k)),
+    })
+    signal = _SIGNALS[strategy](combos)[lo:hi]
+    return _panel.backtest(batch, signal, capital, commission)
+
+
+def _run_chunk(strategy: str, combos: List[dict], index: pd.DatetimeIndex,
+               capital: float, commission: float, lo: Optional[int] = None,
+               hi: Optional[int] = None, periods: float = 252,
+               risk_free: float = 0.03) -> pd.DataFrame:
+    lo = _START if lo is None else max(lo, _START)
+    hi = len(_CLOSE) if hi is None else hi
+    result = _backtest_rows(strategy, combos, index, capital, commission, lo, hi)
+    metrics = _panel.calc_metrics(result, capital, periods, risk_free)
+
+    params = pd.DataFrame(combos, index=metrics.index)
+    return pd.concat([params, metrics], axis=1)
+
+
+def _run_chunks(strategy: str, chunks: List[List[dict]], index: pd.DatetimeIndex,
+                capital: float, commission: float, periods: float,
+                risk_free: float) -> pd.DataFrame:
+    """One worker's share of the batches, returned as one frame."""
+    return pd.concat([_run_chunk(strategy, chunk, index, capital, commission,
+                                 periods=periods, risk_free=risk_free)
+                      for chunk in chunks], ignore_index=True)
+
+
+# ========== Public API ==========
+
+def expand_grid(strategy: str, grid: Dict[str, Iterable]) -> List[dict]:
+    """
+    Expand a parameter grid into a list of valid combinations.
+
+    Parameters missing from the grid use the notebook defaults. For MA and MACD
+    crossovers, combinations with fast >= slow are dropped; for RSI, combinations
+    with lower >= upper are dropped.
+    """
+    names = PARAM_NAMES[strategy]
+    unknown = set(grid) - set(names)
+    if unknown:
+        raise ValueError(f"Unknown parameters for {strategy}: {sorted(unknown)}")
+
+    values = [list(grid.get(name, [DEFAULT_PARAMS[strategy][name]]))
+              for name in names]
+    combos = []
+    for combo in itertools.product(*values):
+        params = {name: int(v) if float(v).is_integer() else v
+                  for name, v in zip(names, combo)}
+        if strategy == 'rsi_strategy':
+            if params['lower'] >= params['upper']:
+                continue
+        elif params['fast'] >= params['slow']:
+            continue
+        combos.append(params)
+    return combos
+
+
+def _prepare(df: pd.DataFrame, strategy: str, grid: Dict[str, Iterable]):
+    """Clean price data, expand the grid and find the common warm-up row."""
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.droplevel(-1, axis=1)
+    df = df.dropna(subset=['Close'])
+    combos = expand_grid(strategy, grid)
+    if not combos:
+        return df, combos, 0
+
+    # Common evaluation window: notebook warm-up, or longer if the grid needs it
+    base = _panel.add_indicators(Panel.from_frames({'_': df}))['Valid'][:, 0]
+    base_start = int(base.argmax()) if base.any() else len(df)
+    start = max([base_start] + [_warmup(strategy, c) for c in combos])
+    if start >= len(df) - 1:
+        raise ValueError(f"Not enough history: {len(df)} rows, warm-up needs {start + 2}")
+    return df, combos, start
+
+
+def sweep(df: pd.DataFrame, strategy: str, grid: Dict[str, Iterable],
+          capital: float = 100000, commission: float = 0.001,
+          sort_by: str = 'Sharpe Ratio', ascending: bool = False,
+          n_jobs: Optional[int] = None, chunk_size: int = 500,
+          cache=None, periods: float = 252, risk_free: float = 0.03) -> pd.DataFrame:
+    """
+    Backtest every parameter combination in a grid.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Price data for one ticker (from get_data), with a Close column
+    strategy : str
+        'ma_crossover', 'rsi_strategy' or 'macd_strategy'
+    grid : dict
+        Parameter name -> values, e.g. {'fast': range(5, 101), 'slow': range(50, 301)}
+        ma_crossover: fast, slow | rsi_strategy: length, lower, upper |
+        macd_strategy: fast, slow, signal
+    capital : float
+        Starting capital
+    commission : float
+        Cost charged on every change of position
+    sort_by : str
+        Any calc_metrics() column to sort the results by
+    ascending : bool
+        Sort order (default: best Sharpe first)
+    n_jobs : int
+        Worker processes (1 = run in this process; default: all CPUs for
+        grids of 50,000 combinations or more, else 1)
+    chunk_size : int
+        Combinations evaluated together as one vectorized batch
+    cache : artifacts.ArtifactCache, optional
+        Reuse results of combinations already run on the same prices,
+        evaluation window and costs; only the others are backtested. The
+        window starts after the longest warm-up in the grid, so adding a
+        combination with a longer warm-up (e.g. a larger slow) moves it and
+        every point is run again
+    periods : float
+        Bars per year for Sharpe (252 for daily bars; see
+        intraday.periods_per_year() for minute and hourly bars)
+    risk_free : float
+        Annual risk-free rate
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per combination: the parameters followed by calc_metrics() columns
+
+    Notes:
+    ------
+    Every combination is measured over the same rows: the notebook's
+    add_indicators() + dropna() window, shortened further if a combination
+    in the grid needs a longer warm-up (e.g. slow=300). With a single
+    combination of notebook defaults, MA and MACD results equal the
+    notebook's ma_crossover()/macd_strategy() backtests. The RSI rule exits
+    when RSI rises above `upper`, so the upper threshold can be optimized too.
+
+    Example:
+    --------
+    >>> df = get_data('1155.KL', '2015-01-01', '2023-12-31')
+    >>> results = sweep(df, 'ma_crossover',
+    ...                 {'fast': range(5, 101, 5), 'slow': range(50, 301, 10)})
+    >>> results.head()
+    """
+    if sort_by not in METRIC_COLUMNS:
+        raise ValueError(f"sort_by must be one of {METRIC_COLUMNS}")
+
+    df, combos, start = _prepare(df, strategy, grid)
+    if not combos:
+        return pd.DataFrame(columns=PARAM_NAMES[strategy] + METRIC_COLUMNS)
+
+    close = df['Close'].to_numpy(dtype=np.float64)
+    todo = combos
+    if cache is not None:
+        from .artifacts import fingerprint
+        # Keyed on the common window start: every row is measured from it
+        data = fingerprint(df['Close'], start, capital, commission, periods, risk_free)
+        keys = [fingerprint('sweep', strategy, data, combo) for combo in combos]
+        stored = [cache.get(key) for key in keys]
+        todo = [c for c, row in zip(combos, stored) if row is None]
+
+    parts = []
+    if todo:
+        chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+        n_jobs = _default_jobs(n_jobs, len(todo))
+
+        if n_jobs == 1 or len(chunks) == 1:
+            _init_worker(close, start)
+            parts = [_run_chunks(strategy, chunks, df.index, capital, commission,
+                                 periods, risk_free)]
+        else:
+            # One task per worker: each builds its indicator cache once and
+            # sends its results back once
+            workers = min(n_jobs, len(chunks))
+            bounds = np.linspace(0, len(chunks), workers + 1).astype(int)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(close, start)) as pool:
+                futures = [pool.submit(_run_chunks, strategy, chunks[a:b], df.index,
+                                       capital, commission, periods, risk_free)
+                           for a, b in zip(bounds[:-1], bounds[1:])]
+                parts = [f.result() for f in futures]
+
+    if cache is not None:
+        computed = iter(pd.concat(parts, ignore_index=True).to_dict('records')
+                        if parts else [])
+        rows = []
+        for key, row in zip(keys, stored):
+            if row is None:
+                row = next(computed)
+                cache.put(key, row)
+            rows.append(row)
+        parts = [pd.DataFrame(rows, columns=PARAM_NAMES[strategy] + METRIC_COLUMNS)]
+
+    results = pd.concat(parts, ignore_index=True)
+    return (results.sort_values(sort_by, ascending=ascending, kind='stable')
+            .reset_index(drop=True))
@@ -0,0 +1,230 @@
+"""
+Walk-Forward Optimization
+Rolls an in-sample / out-of-sample window through a ticker's history: the
+parameter grid is optimized on each in-sample window, the winner is traded
+on the out-of-sample window that follows, and the out-of-sample results are
+stitched into one equity curve.
+
+Indicators are computed once over the full history and sliced per window
+(they only look backwards, so no future data leaks in), instead of running
+get_data + add_indicators again for every window. Windows run in parallel
+when the whole run is large enough to pay for a process pool (see sweep), each
+worker keeping its own indicator cache.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import panel as _panel
+from .panel import METRIC_COLUMNS, Panel
+from .sweep import _backtest_rows, _default_jobs, _init_worker, _prepare, _run_chunk
+
+
+def make_windows(n_rows: int, start: int, train: int, test: int,
+                 anchored: bool = False) -> List[Tuple[int, int, int]]:
+    """
+    Row ranges (lo, mid, hi): in-sample [lo, mid), out-of-sample [mid, hi).
+
+    Out-of-sample windows follow each other without gaps, starting after the
+    first `train` rows from `start`. With anchored=True every in-sample
+    window starts at `start` (expanding window) instead of rolling.
+    """
+    if train < 2 or test < 1:
+        raise ValueError("train must be >= 2 and test >= 1 rows")
+    windows = []
+    mid = start + train
+    while mid < n_rows - 1:
+        hi = min(mid + test, n_rows)
+        lo = start if anchored else mid - train
+        windows.append((lo, mid, hi))
+        mid = hi
+    return windows
+
+
+def _run_window(strategy: str, combos: List[dict], index: pd.DatetimeIndex,
+                capital: float, commission: float, sort_by: str, ascending: bool,
+                chunk_size: int, periods: float, risk_free: float,
+                window: Tuple[int, int, int]) -> dict:
+    """Optimize on the in-sample rows, then trade the winner out of sample."""
+    lo, mid, hi = window
+    chunks = [combos[i:i + chunk_size] for i in range(0, len(combos), chunk_size)]
+    in_sample = pd.concat([_run_chunk(strategy, chunk, index, capital,
+                                      commission, lo, mid, periods, risk_free)
+                           for chunk in chunks], ignore_index=True)
+    order = in_sample[sort_by].sort_values(ascending=ascending, kind='stable')
+    best = combos[order.index[0]]
+
+    # Start one row early so the first out-of-sample bar has a return
+    result = _backtest_rows(strategy, [best], index, capital, commission,
+                            mid - 1, hi)
+    return {
+        'window': window,
+        'params': best,
+        'in_sample': in_sample.loc[order.index[0], METRIC_COLUMNS],
+        'signal': result['Signal'][:, 0],
+        'returns': result['Strategy_Returns'][1:, 0],
+    }
+
+
+class WalkForwardResult:
+    """
+    Output of walk_forward().
+
+    Attributes:
+        windows: One row per window: in-sample and out-of-sample dates, the
+            chosen parameters, the in-sample score and out-of-sample metrics
+        returns: Stitched out-of-sample strategy returns
+        equity: Stitched out-of-sample portfolio value
+        periods: Bars per year for the Sharpe ratio in metrics()
+        risk_free: Annual risk-free rate for metrics()
+    """
+
+    def __init__(self, windows: pd.DataFrame, returns: pd.Series,
+                 equity: pd.Series, capital: float, periods: float = 252,
+                 risk_free: float = 0.03):
+        self.windows = windows
+        self.returns = returns
+        self.equity = equity
+        self.capital = capital
+        self.periods = periods
+        self.risk_free = risk_free
+
+    def metrics(self) -> pd.Series:
+        """calc_metrics() of the stitched out-of-sample equity curve."""
+        result = Panel(self.equity.index, ['Walk-Forward'], {
+            'Portfolio': self.equity.to_numpy()[:, None],
+            'Strategy_Returns': self.returns.to_numpy()[:, None],
+            'Valid': np.ones((len(self.equity), 1)),
+        })
+        return _panel.calc_metrics(result, self.capital, self.periods,
+                                   self.risk_free).iloc[0]
+
+
+def walk_forward(df: pd.DataFrame, strategy: str, grid: Dict[str, Iterable],
+                 train: int = 504, test: int = 126, anchored: bool = False,
+                 capital: float = 100000, commission: float = 0.001,
+                 sort_by: str = 'Sharpe Ratio', ascending: bool = False,
+                 n_jobs: Optional[int] = None, chunk_size: int = 500,
+                 periods: float = 252, risk_free: float = 0.03) -> WalkForwardResult:
+    """
+    Walk-forward optimization of one strategy on one ticker.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Price data for one ticker (from get_data), with a Close column
+    strategy : str
+        'ma_crossover', 'rsi_strategy' or 'macd_strategy'
+    grid : dict
+        Parameter grid, as for sweep()
+    train : int
+        In-sample rows per window (504 = about 2 years of trading days)
+    test : int
+        Out-of-sample rows per window (126 = about 6 months)
+    anchored : bool
+        Grow the in-sample window from the start instead of rolling it
+    capital : float
+        Starting capital
+    commission : float
+        Cost charged on every change of position, including a change of
+        position caused by switching parameters between windows
+    sort_by : str
+        calc_metrics() column used to pick the in-sample winner
+    ascending : bool
+        Pick the smallest value instead of the largest
+    n_jobs : int
+        Worker processes (1 = run in this process; default: all CPUs when
+        combinations x windows is 50,000 or more, else 1)
+    chunk_size : int
+        Combinations evaluated together as one vectorized batch
+    periods : float
+        Bars per year for Sharpe (252 for daily bars; see
+        intraday.periods_per_year() for minute and hourly bars)
+    risk_free : float
+        Annual risk-free rate
+
+    Returns:
+    --------
+    WalkForwardResult
+        Per-window table, stitched returns / equity, and .metrics()
+
+    Example:
+    --------
+    >>> df = get_data('1155.KL', '2012-01-01', '2023-12-31')
+    >>> wf = walk_forward(df, 'ma_crossover',
+    ...                   {'fast': range(10, 101, 10), 'slow': range(50, 301, 25)},
+    ...                   train=504, test=126)
+    >>> wf.windows[['OOS Start', 'fast', 'slow', 'IS Sharpe Ratio', 'OOS Sharpe Ratio']]
+    >>> wf.metrics()
+    """
+    if sort_by not in METRIC_COLUMNS:
+        raise ValueError(f"sort_by must be one of {METRIC_COLUMNS}")
+
+    df, combos, start = _prepare(df, strategy, grid)
+    if not combos:
+        raise ValueError("The grid has no valid parameter combinations")
+    windows = make_windows(len(df), start, train, test, anchored)
+    if not windows:
+        raise ValueError(f"Not enough history for one window: {len(df)} rows, "
+                         f"need {start + train + 2}")
+
+    close = df['Close'].to_numpy(dtype=np.float64)
+    args = (strategy, combos, df.index, capital, commission, sort_by, ascending,
+            chunk_size, periods, risk_free)
+    n_jobs = _default_jobs(n_jobs, len(combos) * len(windows))
+
+    if n_jobs == 1 or len(windows) == 1:
+        _init_worker(close, start)
+        parts = [_run_window(*args, w) for w in windows]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(windows)),
+                                 initializer=_init_worker,
+                                 initargs=(close, start)) as pool:
+            futures = [pool.submit(_run_window, *args, w) for w in windows]
+            parts = [f.result() for f in futures]
+
+    return _stitch(df.index, parts, capital, commission, periods, risk_free)
+
+
+def _stitch(index: pd.DatetimeIndex, parts: List[dict], capital: float,
+            commission: float, periods: float = 252,
+            risk_free: float = 0.03) -> WalkForwardResult:
+    returns, rows = [], []
+    previous_signal = None
+    for part in parts:
+        lo, mid, hi = part['window']
+        window_returns = part['returns'].copy()
+        if previous_signal is not None:
+            # New parameters may want a different position on the last
+            # in-sample bar; charge the switch on the first out-of-sample bar
+            switch = abs(part['signal'][0] - previous_signal)
+            window_returns[0] -= commission * np.nan_to_num(switch)
+        previous_signal = part['signal'][-1]
+        returns.append(window_returns)
+
+        oos = Panel(index[mid - 1:hi], ['_'], {
+            'Portfolio': capital * np.concatenate(
+                [[1.0], np.cumprod(1 + window_returns)])[:, None],
+            'Strategy_Returns': np.concatenate([[np.nan], window_returns])[:, None],
+            'Valid': np.ones((hi - mid + 1, 1)),
+        })
+        oos_metrics = _panel.calc_metrics(oos, capital, periods, risk_free).iloc[0]
+        rows.append({
+            'IS Start': index[lo], 'IS End': index[mid - 1],
+            'OOS Start': index[mid], 'OOS End': index[hi - 1],
+            **part['params'],
+            **{f'IS {k}': v for k, v in part['in_sample'].items()},
+            **{f'OOS {k}': v for k, v in oos_metrics.items()},
+        })
+
+    first = parts[0]['window'][1]
+    last = parts[-1]['window'][2]
+    returns = pd.Series(np.concatenate(returns), index=index[first:last],
+                        name='Strategy_Returns')
+    equity = (capital * (1 + returns).cumprod()).rename('Portfolio')
+    windows = pd.DataFrame(rows)
+    windows.index.name = 'Window'
+    return WalkForwardResult(windows, returns, equity, capital, periods, risk_free)
@@ -0,0 +1,35 @@
+"""Shared fixtures: deterministic synthetic prices, nothing is downloaded."""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from klse.indicators import _synthetic_ohlcv  # noqa: E402
+
+
+@pytest.fixture
+def ohlcv():
+    """One ticker: 600 business days of seeded random-walk OHLCV."""
+    return _synthetic_ohlcv(600, seed=1)
+
+
+@pytest.fixture
+def frames():
+    """Four tickers with different lengths and a few missing dates."""
+    frames = {f'T{k}.KL': _synthetic_ohlcv(500 + 50 * k, seed=k) for k in range(4)}
+    frames['T1.KL'] = frames['T1.KL'].iloc[120:]
+    frames['T2.KL'] = frames['T2.KL'].drop(frames['T2.KL'].index[[300, 301, 410]])
+    return frames
+
+
+def assert_frame_close(left: pd.DataFrame, right: pd.DataFrame, rtol=1e-7, atol=1e-9):
+    """Same columns, same NaN positions, values equal within tolerance."""
+    assert list(left.columns) == list(right.columns)
+    a, b = left.to_numpy(dtype=float), right.to_numpy(dtype=float)
+    np.testing.assert_array_equal(np.isnan(a), np.isnan(b))
+    np.testing.assert_allclose(a, b, rtol=rtol, atol=atol, equal_nan=True)
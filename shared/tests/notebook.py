@@ -0,0 +1,114 @@
+"""
+The backtesting notebook's functions, as reference for the fast engines.
+
+Copied from projects/klse-backtesting/COMPLETE_NOTEBOOK_BUILDER.py. Only
+add_indicators() differs: pandas_ta is not a test dependency, so the
+columns come from indicators._pandas_reference() (the same calculations
+written with pandas rolling / ewm).
+"""
+
+import numpy as np
+import pandas as pd
+
+from klse.indicators import _pandas_reference
+
+NOTEBOOK_COLUMNS = ['SMA_20', 'SMA_50', 'SMA_200', 'RSI',
+                    'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9']
+
+
+def add_indicators(df):
+    indicators = _pandas_reference(df)
+    return pd.concat([df, indicators[NOTEBOOK_COLUMNS]], axis=1)
+
+
+def ma_crossover(df):
+    df = df.copy()
+    df['Signal'] = 0
+    df.loc[df['SMA_50'] > df['SMA_200'], 'Signal'] = 1
+    df['Position'] = df['Signal'].diff()
+    return df
+
+
+def rsi_strategy(df):
+    df = df.copy()
+    df['Signal'] = 0
+    df.loc[df['RSI'] < 30, 'Signal'] = 1
+    df.loc[df['RSI'] > 70, 'Signal'] = 0
+    df['Signal'] = df['Signal'].replace(0, np.nan).ffill().fillna(0)
+    df['Position'] = df['Signal'].diff()
+    return df
+
+
+def macd_strategy(df):
+    df = df.copy()
+    df['Signal'] = 0
+    if 'MACD_12_26_9' in df.columns and 'MACDs_12_26_9' in df.columns:
+        df.loc[df['MACD_12_26_9'] > df['MACDs_12_26_9'], 'Signal'] = 1
+        df['Position'] = df['Signal'].diff()
+    return df
+
+
+STRATEGIES = {
+    'ma_crossover': ma_crossover,
+    'rsi_strategy': rsi_strategy,
+    'macd_strategy': macd_strategy,
+}
+
+
+def backtest(df, capital=100000, commission=0.001):
+    df = df.copy()
+    df['Returns'] = df['Close'].pct_change()
+    df['Strategy_Returns'] = df['Returns'] * df['Signal'].shift(1)
+    df['Commission'] = abs(df['Position']) * commission
+    df['Strategy_Returns'] -= df['Commission']
+    df['Cum_Market'] = (1 + df['Returns']).cumprod()
+    df['Cum_Strategy'] = (1 + df['Strategy_Returns']).cumprod()
+    df['Portfolio'] = capital * df['Cum_Strategy']
+    df['BuyHold'] = capital * df['Cum_Market']
+    return df
+
+
+def calc_metrics(df, capital=100000):
+    returns = df['Strategy_Returns'].dropna()
+    total_ret = ((df['Portfolio'].iloc[-1] / capital) - 1) * 100
+    days = (df.index[-1] - df.index[0]).days
+    years = days / 365.25
+    cagr = ((df['Portfolio'].iloc[-1] / capital) ** (1 / years) - 1) * 100
+    excess = returns - (0.03 / 252)
+    sharpe = np.sqrt(252) * excess.mean() / returns.std()
+    cummax = df['Portfolio'].cummax()
+    dd = (df['Portfolio'] - cummax) / cummax
+    max_dd = dd.min() * 100
+    wins = (returns > 0).sum()
+    total = len(returns[returns != 0])
+    win_rate = (wins / total * 100) if total > 0 else 0
+    return {
+        'Total Return (%)': round(total_ret, 2),
+        'CAGR (%)': round(cagr, 2),
+        'Sharpe Ratio': round(sharpe, 2),
+        'Max Drawdown (%)': round(max_dd, 2),
+        'Win Rate (%)': round(win_rate, 2),
+        'Total Trades': int(total),
+    }
+
+
+def add_stop_loss(df, stop_pct=0.05):
+    df = df.copy()
+    entry_price = None
+    for i in range(len(df)):
+        if df['Position'].iloc[i] == 1:
+            entry_price = df['Close'].iloc[i]
+        elif entry_price is not None and df['Signal'].iloc[i] == 1:
+            if df['Close'].iloc[i] < entry_price * (1 - stop_pct):
+                df.loc[df.index[i], 'Signal'] = 0
+                df.loc[df.index[i], 'Position'] = -1
+                entry_price = None
+        elif df['Position'].iloc[i] == -1:
+            entry_price = None
+    return df
+
+
+def run(df, strategy, capital=100000, commission=0.001):
+    """add_indicators -> dropna -> strategy -> backtest, as in the notebook."""
+    df = add_indicators(df).dropna()
+    return backtest(STRATEGIES[strategy](df), capital, commission)
@@ -0,0 +1,99 @@
+"""Artifact cache: fingerprints, eviction, disk copies and invalidation."""
+
+import threading
+
+import numpy as np
+import pytest
+
+from klse import artifacts
+from klse.artifacts import ArtifactCache, fingerprint
+
+
+def test_fingerprint_follows_content(ohlcv):
+    assert fingerprint(ohlcv, {'fast': 50}) == fingerprint(ohlcv.copy(), {'fast': 50})
+    assert fingerprint(ohlcv, {'fast': 50}) != fingerprint(ohlcv, {'fast': 51})
+    changed = ohlcv.copy()
+    changed.iloc[-1, changed.columns.get_loc('Close')] += 0.01
+    assert fingerprint(changed) != fingerprint(ohlcv)
+    assert fingerprint(ohlcv.iloc[:-1]) != fingerprint(ohlcv)
+    assert fingerprint(np.arange(3)) != fingerprint(np.arange(3.0))
+
+
+def test_fingerprint_includes_source(monkeypatch):
+    before = fingerprint('x')
+    monkeypatch.setattr(artifacts, '_source_digest', lambda: b'other version')
+    assert fingerprint('x') != before
+
+
+def _make(scale):
+    def scaled(x):
+        return x * scale
+    return scaled
+
+
+def test_function_closure_and_globals():
+    assert fingerprint(_make(2)) == fingerprint(_make(2))
+    assert fingerprint(_make(2)) != fingerprint(_make(3))
+
+    # A helper's code is part of its caller's key
+    namespace = {}
+    exec("def helper(x):\n    return x + 1\ndef outer(x):\n    return helper(x)", namespace)
+    key = fingerprint(namespace['outer'])
+    exec("def helper(x):\n    return x + 2", namespace)
+    assert fingerprint(namespace['outer']) != key
+
+
+def test_lru_eviction():
+    cache = ArtifactCache(max_items=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1          # 'b' is now least recently used
+    cache.put('c', 3)
+    assert 'b' not in cache and 'a' in cache and 'c' in cache
+    assert len(cache) == 2
+
+
+def test_disk_round_trip(tmp_path, ohlcv):
+    cache = ArtifactCache(cache_dir=tmp_path)
+    key = fingerprint(ohlcv)
+    cache.put(key, ohlcv)
+    restarted = ArtifactCache(cache_dir=tmp_path)
+    assert key in restarted
+    assert restarted.get(key).equals(ohlcv)
+    assert restarted.stats()['disk_hits'] == 1
+    assert restarted.get(key) is not None and restarted.hits == 1
+    restarted.clear(disk=True)
+    assert key not in restarted
+
+
+def test_hits_misses_and_changed_data(ohlcv):
+    def close_mean(df):
+        return df['Close'].mean()
+
+    cache = ArtifactCache()
+    cached = cache.wrap(close_mean)
+    assert cached(ohlcv) == cached(ohlcv.copy())
+    assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
+
+    extended = ohlcv.copy()
+    extended.iloc[-1, extended.columns.get_loc('Close')] *= 2
+    assert cached(extended) != cached(ohlcv)
+    assert (cache.hits, cache.misses, len(cache)) == (2, 2, 2)
+    assert cache.stats()['hit_rate (%)'] == 50.0
+
+
+def test_unpicklable_argument_is_not_cached():
+    with pytest.raises(TypeError):
+        fingerprint(threading.Lock())
+
+    cache = ArtifactCache()
+    cached = cache.wrap(lambda lock, x: x + 1)
+    assert cached(threading.Lock(), 1) == 2
+    assert len(cache) == 0 and cache.misses == 0
+
+    # A function whose default cannot be pickled is still cached
+    def held(x, lock=threading.Lock()):
+        return x
+    cached = cache.wrap(held)
+    assert cached(1) == cached(1) == 1
+    assert cache.hits == 1
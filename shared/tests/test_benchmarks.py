@@ -0,0 +1,63 @@
+"""Benchmark suite: stage runs, the regression report and the stored baseline."""
+
+import pandas as pd
+import pytest
+
+import notebook
+from klse import benchmarks
+from klse.benchmarks import (NOTEBOOK_STAGES, STAGES, compare, environment, load_baseline,
+                             regressions, run_benchmarks, save_baseline)
+
+
+def _run(seconds, peak, stage='backtest', tickers=10):
+    return {'Tickers': tickers, 'Days': 2500, 'Stage': stage, 'Seconds': seconds,
+            'CPU Seconds': seconds, 'Peak (MB)': peak, 'Rows/s': 25000 / seconds}
+
+
+def test_every_stage_runs():
+    results = run_benchmarks([(2, 600)], repeat=1, notebook=vars(notebook))
+    assert list(results['Stage']) == STAGES + NOTEBOOK_STAGES
+    assert (results['Seconds'] > 0).all() and (results['Peak (MB)'] >= 0).all()
+    assert list(run_benchmarks([(2, 300)], ['backtest'], repeat=1)['Stage']) == ['backtest']
+    with pytest.raises(ValueError):
+        run_benchmarks([(2, 300)], ['notebook_backtest'], repeat=1)
+    with pytest.raises(ValueError):
+        run_benchmarks([(2, 300)], repeat=1, notebook={'backtest': notebook.backtest})
+
+
+def test_compare_statuses():
+    baseline = pd.DataFrame([_run(1.0, 10, 'add_indicators'), _run(1.0, 10, 'strategy'),
+                             _run(1.0, 10, 'backtest'), _run(1.0, 10, 'calc_metrics'),
+                             _run(0.001, 10, 'add_stop_loss')])
+    current = pd.DataFrame([_run(1.5, 10, 'add_indicators'), _run(1.0, 12, 'strategy'),
+                            _run(0.5, 10, 'backtest'), _run(1.1, 10.5, 'calc_metrics'),
+                            _run(0.003, 10, 'add_stop_loss'), _run(1.0, 10, 'backtest', 100)])
+    report = compare(current, baseline)
+    assert list(report['Status']) == ['slower', 'more memory', 'faster', 'ok', 'ok', 'new']
+    assert report['Time Change (%)'].iloc[0] == 50.0
+    assert report['Memory Change (%)'].iloc[1] == 20.0
+    assert list(regressions(report)['Stage']) == ['add_indicators', 'strategy']
+    # 0.001 s -> 0.003 s is 200% slower but below min_seconds
+    assert compare(current, baseline, min_seconds=0.001)['Status'].iloc[4] == 'slower'
+
+
+def test_baseline_round_trip(tmp_path):
+    path = tmp_path / 'bench' / 'baseline.json'
+    assert load_baseline(path) is None
+    results = pd.DataFrame([_run(1.0, 10), _run(2.0, 20, 'strategy')])
+    save_baseline(results, path)
+    baseline = load_baseline(path)
+    pd.testing.assert_frame_equal(baseline, results)
+    assert baseline.attrs['environment'] == environment()
+    assert baseline.attrs['created']
+    assert (compare(results, baseline)['Status'] == 'ok').all()
+
+
+def test_command_line(tmp_path, capsys):
+    path = tmp_path / 'baseline.json'
+    args = ['--tickers', '2', '--days', '300', '--repeat', '1', '--stages', 'backtest',
+            '--baseline', str(path)]
+    assert benchmarks.main(args) == 0
+    assert 'No baseline' in capsys.readouterr().out
+    assert benchmarks.main(args + ['--save-baseline']) == 0
+    assert list(load_baseline(path)['Stage']) == ['backtest']
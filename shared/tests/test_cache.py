@@ -0,0 +1,95 @@
+"""PriceCache: incremental refresh and corporate actions."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from klse.cache import PriceCache
+from klse.indicators import _synthetic_ohlcv
+
+
+class AdjustingFetcher:
+    """Yahoo-like fetcher: prices adjusted for every dividend announced so far."""
+
+    def __init__(self):
+        self.raw = _synthetic_ohlcv(300, seed=3)
+        self.dividends = {}
+        self.calls = []
+
+    def __call__(self, ticker, start, end):
+        self.calls.append((start, end))
+        df = self.raw.copy()
+        df['Dividends'] = 0.0
+        df['Stock Splits'] = 0.0
+        factor = pd.Series(1.0, index=df.index)
+        for date, amount in self.dividends.items():
+            df.loc[date, 'Dividends'] = amount
+            before = df.index < date
+            factor[before] *= 1 - amount / df['Close'].shift().loc[date]
+        for column in ['Open', 'High', 'Low', 'Close']:
+            df[column] *= factor
+        return df.loc[(df.index >= start) & (df.index < end)]
+
+
+def test_appends_only_missing_days(tmp_path):
+    fetcher = AdjustingFetcher()
+    cache = PriceCache(tmp_path, fetcher=fetcher)
+    dates = fetcher.raw.index
+    cache.get('X.KL', dates[0], dates[100])
+    df = cache.get('X.KL', dates[0], dates[200])
+    assert fetcher.calls[-1] == (dates[100].strftime('%Y-%m-%d'),
+                                 dates[200].strftime('%Y-%m-%d'))
+    pd.testing.assert_frame_equal(df, cache._clean(fetcher('X.KL', dates[0], dates[200])),
+                                  check_freq=False)
+
+
+def test_new_dividend_refetches_history(tmp_path):
+    fetcher = AdjustingFetcher()
+    cache = PriceCache(tmp_path, fetcher=fetcher)
+    dates = fetcher.raw.index
+    cache.get('X.KL', dates[0], dates[100])
+
+    fetcher.dividends[dates[150]] = 0.2
+    df = cache.get('X.KL', dates[0], dates[200])
+    expected = cache._clean(fetcher('X.KL', dates[0], dates[200]))
+    pd.testing.assert_frame_equal(df, expected, check_freq=False)
+    # No jump where the old cache ends: the whole history is on one basis
+    returns = df['Close'].pct_change()
+    np.testing.assert_allclose(returns.iloc[100], fetcher.raw['Close'].pct_change().iloc[100])
+
+    # The same dividend seen again is not a new action
+    calls = len(fetcher.calls)
+    cache.get('X.KL', dates[0], dates[250])
+    assert len(fetcher.calls) == calls + 1
+
+
+def test_empty_answer_is_not_cached(tmp_path, capsys):
+    """An empty frame (Yahoo's answer to a rate limit) must not mark the range as cached."""
+    fetcher = AdjustingFetcher()
+    calls = []
+
+    def flaky(ticker, start, end):
+        calls.append(start)
+        return pd.DataFrame() if len(calls) == 1 else fetcher(ticker, start, end)
+
+    cache = PriceCache(tmp_path, fetcher=flaky)
+    dates = fetcher.raw.index
+    assert cache.get('X.KL', dates[0], dates[100]) is None
+    assert cache.coverage('X.KL') is None
+    assert 'No data' in capsys.readouterr().out
+    assert len(cache.get('X.KL', dates[0], dates[100])) == 100
+    assert len(calls) == 2
+
+    with pytest.raises(LookupError):
+        PriceCache(tmp_path / 'other', fetcher=lambda *args: pd.DataFrame()).get(
+            'X.KL', dates[0], dates[100], raise_errors=True)
+
+
+def test_empty_range_next_to_stored_bars_is_cached(tmp_path):
+    fetcher = AdjustingFetcher()
+    cache = PriceCache(tmp_path, fetcher=fetcher)
+    dates = fetcher.raw.index
+    # Before the first bar: nothing traded, which is not a failure
+    cache.get('X.KL', dates[0], dates[100])
+    cache.get('X.KL', dates[0] - pd.Timedelta(days=30), dates[100])
+    assert cache.coverage('X.KL')[0] == dates[0] - pd.Timedelta(days=30)
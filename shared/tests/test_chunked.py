@@ -0,0 +1,31 @@
+"""Chunked backtest vs the whole history in memory."""
+
+import numpy as np
+import pytest
+
+from conftest import assert_frame_close
+from klse import panel as pn
+from klse.chunked import chunked_backtest, chunked_run
+
+
+@pytest.mark.parametrize('strategy', list(pn.STRATEGIES))
+@pytest.mark.parametrize('chunk_rows', [1, 512, 100000])
+def test_equity_matches_in_memory(ohlcv, strategy, chunk_rows):
+    result = chunked_backtest(ohlcv, strategy, chunk_rows=chunk_rows, keep_equity=True)
+    ind = pn.add_indicators(pn.Panel.from_frames({'T': ohlcv}))
+    expected = pn.backtest(ind, pn.STRATEGIES[strategy](ind))['Portfolio'][:, 0]
+    np.testing.assert_array_equal(result.equity.to_numpy(), expected)
+
+
+def test_chunks_as_iterable(ohlcv):
+    pieces = [ohlcv.iloc[k:k + 97] for k in range(0, len(ohlcv), 97)]
+    whole = chunked_backtest(ohlcv, keep_equity=True)
+    split = chunked_backtest(iter(pieces), keep_equity=True)
+    np.testing.assert_array_equal(split.equity.to_numpy(), whole.equity.to_numpy())
+
+
+def test_metrics_match_run_backtest(frames):
+    frames = {t: frames[t] for t in ['T0.KL', 'T3.KL']}
+    got = chunked_run(frames, 'macd_strategy', chunk_rows=512)
+    expected = pn.run_backtest(pn.Panel.from_frames(frames), 'macd_strategy')
+    assert_frame_close(got[expected.columns], expected, atol=0.011)
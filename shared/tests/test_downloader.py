@@ -0,0 +1,95 @@
+"""Retries shared by the price downloader and the fundamentals service."""
+
+import sys
+import types
+
+import pandas as pd
+import pytest
+
+from klse.downloader import BulkDownloader, FrameSource, YahooSource
+from klse.fundamentals import FundamentalsCache
+from klse.indicators import _synthetic_ohlcv
+
+
+class Flaky:
+    """Fails the first `failures` calls per ticker, then answers `call(ticker)`."""
+
+    def __init__(self, call, failures):
+        self.call = call
+        self.failures = failures
+        self.calls = {}
+
+    def __call__(self, ticker, *args):
+        self.calls[ticker] = self.calls.get(ticker, 0) + 1
+        if self.calls[ticker] <= self.failures:
+            raise ConnectionError(f"attempt {self.calls[ticker]}")
+        return self.call(ticker, *args)
+
+
+@pytest.fixture
+def prices():
+    df = _synthetic_ohlcv(50)
+    return FrameSource({'A.KL': df, 'B.KL': df})
+
+
+def test_downloader_retries(prices):
+    source = Flaky(prices, failures=2)
+    downloader = BulkDownloader(source, rate_limit=0, retries=2, backoff=0)
+    frames, errors = downloader.download(['A.KL', 'B.KL'], '2000-01-01', '2100-01-01')
+    assert list(frames) == ['A.KL', 'B.KL'] and errors.empty
+    assert source.calls == {'A.KL': 3, 'B.KL': 3}
+
+    downloader.retries = 1
+    source.calls.clear()
+    frames, errors = downloader.download(['A.KL'], '2000-01-01', '2100-01-01')
+    assert not frames
+    assert errors.to_dict('records') == [
+        {'Ticker': 'A.KL', 'Error': 'ConnectionError: attempt 2', 'Attempts': 2}]
+
+
+def test_fundamentals_retry_like_downloader(tmp_path):
+    fetcher = Flaky(lambda t: {'longName': t, 'trailingPE': 12.0}, failures=1)
+    cache = FundamentalsCache(tmp_path, fetcher=fetcher, rate_limit=0, retries=1, backoff=0)
+    assert cache.refresh(['A.KL', 'B.KL']) == {}
+    assert fetcher.calls == {'A.KL': 2, 'B.KL': 2}
+
+    cache.retries = 0
+    fetcher.calls.clear()
+    assert cache.refresh(['C.KL']) == {'C.KL': 'ConnectionError: attempt 1'}
+    assert cache.get_many(['A.KL'])['PE Ratio'].tolist() == [12.0]
+
+
+def test_empty_answer_is_retried(prices):
+    source = Flaky(lambda t, *args: pd.DataFrame() if source.calls[t] == 1 else prices(t, *args),
+                   failures=0)
+    downloader = BulkDownloader(source, rate_limit=0, retries=1, backoff=0)
+    frames, errors = downloader.download(['A.KL'], '2000-01-01', '2100-01-01')
+    assert list(frames) == ['A.KL'] and source.calls == {'A.KL': 2}
+
+    downloader.source = lambda t, s, e: pd.DataFrame()
+    frames, errors = downloader.download(['A.KL'], '2000-01-01', '2100-01-01')
+    assert errors['Error'].tolist() == ['LookupError: no data']
+    assert errors['Attempts'].tolist() == [2]
+
+
+def test_yahoo_fetcher_uses_ticker_history(monkeypatch):
+    """yf.download() shares state between threads; each thread uses its own Ticker."""
+    calls = []
+
+    class Ticker:
+        def __init__(self, ticker):
+            self.ticker = ticker
+
+        def history(self, **kwargs):
+            calls.append((self.ticker, kwargs))
+            return _synthetic_ohlcv(5)
+
+    def download(*args, **kwargs):
+        raise AssertionError("yf.download is not thread-safe")
+
+    monkeypatch.setitem(sys.modules, 'yfinance',
+                        types.SimpleNamespace(Ticker=Ticker, download=download))
+    df = YahooSource()('1155.KL', '2024-01-01', '2024-02-01')
+    assert len(df) == 5
+    assert calls == [('1155.KL', {'start': '2024-01-01', 'end': '2024-02-01',
+                                  'auto_adjust': True, 'actions': True})]
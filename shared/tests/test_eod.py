@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+
+from klse import incremental
+from klse.cache import PriceCache
+from klse.eod import ResultStore, run_eod
+from klse.fundamentals import FundamentalsCache
+from klse.indicators import _synthetic_ohlcv
+
+
+TICKERS = ['1000.KL', '1001.KL', '1002.KL']
+
+
+def fake_prices(ticker, start, end):
+    if ticker == 'DOWN.KL':
+        return pd.DataFrame()           # delisted
+    index = pd.bdate_range(start, end, inclusive='left')
+    df = _synthetic_ohlcv(len(index), seed=int(ticker[:4]))
+    df.index = index
+    return df
+
+
+def fake_info(ticker):
+    return {'longName': ticker, 'sector': 'Financial Services', 'marketCap': 20e9,
+            'trailingPE': 10.0, 'dividendYield': 0.05}
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    # DOWN.KL is retried like any failed download; skip the backoff waits
+    monkeypatch.setattr('klse.downloader.time.sleep', lambda seconds: None)
+    prices = PriceCache(tmp_path / 'prices', fetcher=fake_prices)
+    fundamentals = FundamentalsCache(tmp_path / 'fundamentals', fetcher=fake_info,
+                                     rate_limit=0, retries=0)
+    store = ResultStore(tmp_path / 'results.sqlite')
+    return dict(prices=prices, fundamentals=fundamentals, store=store,
+                history='1y', verbose=False)
+
+
+def test_run_is_stored(setup):
+    run_id = run_eod(TICKERS, **setup)
+    store = setup['store']
+    assert len(store.snapshot(run_id)) == 3
+    assert set(store.latest('value')['Ticker']) == set(TICKERS)
+
+
+def test_failing_ticker_is_recorded_and_run_still_stored(setup, monkeypatch):
+    original = incremental.refresh_indicators
+
+    def refresh(cache, ticker):
+        if ticker == '1001.KL':
+            raise ZeroDivisionError('float division by zero')
+        return original(cache, ticker)
+
+    monkeypatch.setattr(incremental, 'refresh_indicators', refresh)
+    run_id = run_eod(TICKERS, **setup)
+    runs = setup['store'].runs()
+    assert runs['run_id'].tolist() == [run_id]
+    assert 'ZeroDivisionError' in runs['errors'].iloc[0]
+    assert set(setup['store'].snapshot(run_id)['Ticker']) == {'1000.KL', '1002.KL'}
+
+
+def test_bad_screen_does_not_stop_the_run(setup):
+    screens = {'bad': {'query': 'NoSuchColumn > 1'}, 'all': {'query': 'PE > 0'}}
+    run_id = run_eod(TICKERS, screens=screens, **setup)
+    assert 'screen:bad' in setup['store'].runs()['errors'].iloc[0]
+    assert len(setup['store'].latest('all', run_id)) == 3
+
+
+def test_failed_downloads_do_not_refresh_other_cached_tickers(setup):
+    run_eod(TICKERS, **setup)
+    run_id = run_eod(['DOWN.KL'], **setup)
+    assert setup['store'].snapshot(run_id).empty
+    assert incremental.refresh_all(setup['prices'], []).empty
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from klse.incremental import INDICATOR_COLUMNS, IndicatorState
+from klse.indicators import add_technical_indicators
+
+from conftest import assert_frame_close
+
+
+def incremental(df):
+    return IndicatorState().update_frame(df)
+
+
+def batch(df):
+    return add_technical_indicators(df)[INDICATOR_COLUMNS]
+
+
+def test_matches_batch(ohlcv):
+    assert_frame_close(incremental(ohlcv), batch(ohlcv))
+
+
+def test_flat_start_gives_nan_rsi(ohlcv):
+    df = ohlcv.copy()
+    df.iloc[:20, :4] = 5.0          # new listing / suspended counter: no price change
+    result = incremental(df)
+    assert result['RSI'].iloc[:20].isna().all()
+    assert_frame_close(result, batch(df))
+
+
+def test_nan_close_is_skipped(ohlcv):
+    df = ohlcv.copy()
+    df.iloc[[250, 400], :4] = np.nan
+    result = incremental(df)
+    assert result['EMA_20'].iloc[-1] == result['EMA_20'].iloc[-1]     # not stuck at NaN
+    assert result['MACD_12_26_9'].iloc[401:].notna().all()
+    assert_frame_close(result, batch(df))
+
+
+def test_resume_from_saved_state(ohlcv, tmp_path):
+    state = IndicatorState.from_history(ohlcv.iloc[:400])
+    state.save(tmp_path / 'state.json')
+    resumed = IndicatorState.load(tmp_path / 'state.json')
+    rows = resumed.update_frame(ohlcv.iloc[400:])
+    assert_frame_close(rows, batch(ohlcv).iloc[400:])
@@ -0,0 +1,47 @@
+"""NumPy indicator kernels vs the pandas reference (pandas_ta's formulas)."""
+
+import numpy as np
+
+from conftest import assert_frame_close
+from klse import indicators
+
+COLUMNS = ['SMA_20', 'SMA_50', 'SMA_200', 'EMA_20', 'RSI',
+           'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9',
+           'BBL_20_2.0', 'BBM_20_2.0', 'BBU_20_2.0', 'BBB_20_2.0', 'BBP_20_2.0',
+           'ATR', 'Volume_SMA']
+
+
+def test_technical_indicators_match_pandas(ohlcv):
+    got = indicators.add_technical_indicators(ohlcv)
+    expected = indicators._pandas_reference(ohlcv)
+    assert_frame_close(got[COLUMNS], expected[COLUMNS])
+
+
+def test_notebook_indicators_match_pandas(ohlcv):
+    got = indicators.add_indicators(ohlcv)
+    expected = indicators._pandas_reference(ohlcv)
+    columns = [c for c in got.columns if c not in ohlcv.columns]
+    assert columns == ['SMA_20', 'SMA_50', 'SMA_200', 'RSI',
+                       'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9']
+    assert_frame_close(got[columns], expected[columns])
+
+
+def test_matrix_same_as_one_column_at_a_time(frames):
+    """A (dates x tickers) call equals one call per ticker, missing dates included."""
+    close = np.column_stack([df['Close'].reindex(frames['T3.KL'].index).to_numpy()
+                             for df in frames.values()])
+    together = indicators.macd(close)
+    for col in range(close.shape[1]):
+        alone = indicators.macd(close[:, col])
+        for name, values in alone.items():
+            np.testing.assert_allclose(together[name][:, col], values, equal_nan=True)
+
+
+def test_gaps_computed_as_if_dropped(frames):
+    """NaN rows are skipped, like running the kernel on df.dropna()."""
+    df = frames['T2.KL'].reindex(frames['T3.KL'].index)
+    got = indicators.rsi(df['Close'].to_numpy(), 14)
+    rows = df['Close'].notna().to_numpy()
+    expected = indicators.rsi(df['Close'].dropna().to_numpy(), 14)
+    np.testing.assert_allclose(got[rows], expected)
+    assert np.isnan(got[~rows]).all()
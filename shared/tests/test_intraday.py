@@ -0,0 +1,99 @@
+"""Intraday bars: session-aware resampling, the month-partitioned store and streaming."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from klse.intraday import (BarStore, _signal_for, bars_per_day, periods_per_year,
+                           resample_bars, stream_backtest)
+from klse.metrics import batch_metrics
+from klse.rules import sma
+
+import notebook
+
+
+def _minute_bars(days, seed=0, lunch=False):
+    """One bar per Bursa trading minute (plus one lunch-break bar per day if lunch)."""
+    rng = np.random.default_rng(seed)
+    stamps = []
+    for day in days:
+        for start, end in [('09:00', '12:29'), ('14:30', '16:59')]:
+            stamps.append(pd.date_range(f'{day:%Y-%m-%d} {start}', f'{day:%Y-%m-%d} {end}',
+                                        freq='1min'))
+        if lunch:
+            stamps.append(pd.DatetimeIndex([day + pd.Timedelta('12:45:00')]))
+    index = stamps[0].append(stamps[1:]).sort_values().rename('Datetime')
+    close = 5 * np.exp(np.cumsum(rng.normal(0, 0.001, len(index))))
+    opens = close * (1 + rng.normal(0, 0.0005, len(index)))
+    return pd.DataFrame({'Open': opens,
+                         'High': np.maximum(opens, close) * 1.001,
+                         'Low': np.minimum(opens, close) * 0.999,
+                         'Close': close,
+                         'Volume': rng.integers(100, 10000, len(index)).astype(float)},
+                        index=index)
+
+
+def test_hourly_bars_skip_lunch_break():
+    day = pd.Timestamp('2024-06-03')
+    minutes = _minute_bars([day], lunch=True)
+    hourly = resample_bars(minutes, '1h')
+
+    clocks = ['09:00', '10:00', '11:00', '12:00', '14:30', '15:30', '16:30']
+    assert list(hourly.index) == [day + pd.Timedelta(f'{c}:00') for c in clocks]
+    assert len(hourly) == bars_per_day('1h') == 7
+    assert periods_per_year('1h') == 252 * 7
+
+    # 12:00 ends at 12:29 (the 12:45 bar is dropped); 14:30 starts after lunch
+    morning = minutes.between_time('12:00', '12:29')
+    assert hourly.loc[day + pd.Timedelta('12:00:00'), 'Close'] == morning['Close'].iloc[-1]
+    assert hourly.loc[day + pd.Timedelta('12:00:00'), 'Volume'] == morning['Volume'].sum()
+    afternoon = minutes.between_time('14:30', '15:29')
+    assert hourly.loc[day + pd.Timedelta('14:30:00'), 'Open'] == afternoon['Open'].iloc[0]
+    assert hourly.loc[day + pd.Timedelta('14:30:00'), 'High'] == afternoon['High'].max()
+    assert hourly['Volume'].sum() == minutes['Volume'].sum() - minutes.at_time('12:45')[
+        'Volume'].sum()
+
+    daily = resample_bars(minutes, '1D')
+    assert list(daily.index) == [day]
+    assert daily['Close'].iloc[0] == minutes['Close'].iloc[-1]
+
+
+def test_bar_store_months_and_append(tmp_path):
+    minutes = _minute_bars(pd.bdate_range('2024-01-29', '2024-02-02'))
+    store = BarStore(tmp_path)
+    store.write('1155.KL', minutes.iloc[:1000])
+    store.write('1155.KL', minutes.iloc[900:])         # overlap is replaced, not duplicated
+    assert store.months('1155.KL') == ['2024-01', '2024-02']
+    assert store.tickers() == ['1155_KL']
+
+    stored = store.read('1155.KL')
+    assert stored.index.equals(minutes.index)
+    np.testing.assert_allclose(stored.to_numpy(), minutes.to_numpy(), rtol=1e-6)
+
+    chunks = list(store.iter_chunks('1155.KL'))
+    assert [c.index[0].month for c in chunks] == [1, 2]
+    part = store.read('1155.KL', '2024-01-31 10:00', '2024-02-01')
+    assert part.index[0] == pd.Timestamp('2024-01-31 10:00')
+    assert part.index[-1] == pd.Timestamp('2024-01-31 16:59')
+    assert store.read('1155.KL', '2025-01-01') is None
+
+
+def test_stream_matches_one_shot_backtest(tmp_path):
+    store = BarStore(tmp_path)
+    store.write('1155.KL', _minute_bars(pd.bdate_range('2024-01-22', '2024-02-09'), seed=3))
+    rule = sma(30) > sma(120)
+    result = stream_backtest(store, '1155.KL', rule, warmup=500)
+
+    df = store.read('1155.KL')
+    df['Signal'] = _signal_for(rule, df)
+    df['Position'] = df['Signal'].diff()
+    whole = notebook.backtest(df)
+
+    daily = whole['Portfolio'].groupby(whole.index.normalize()).last()
+    np.testing.assert_allclose(result.equity.to_numpy(), daily.to_numpy(), rtol=1e-9)
+    expected = batch_metrics(whole['Strategy_Returns'], whole['Portfolio'],
+                             periods=periods_per_year('1min')).iloc[0]
+    metrics = result.metrics()
+    for column in ['Total Return (%)', 'Sharpe Ratio', 'Max Drawdown (%)', 'Win Rate (%)',
+                   'Total Trades']:
+        assert metrics[column] == pytest.approx(expected[column], abs=0.01)
@@ -0,0 +1,28 @@
+"""Latest-bar indicators vs the last row of the full history."""
+
+import numpy as np
+
+from klse import indicators
+from klse.incremental import INDICATOR_COLUMNS
+from klse.latest import latest_indicators, tail_length
+
+
+def test_latest_matches_full_history(frames):
+    latest = latest_indicators(frames).set_index('Ticker')
+    for ticker, df in frames.items():
+        full = indicators.add_technical_indicators(df).iloc[-1]
+        assert latest.loc[ticker, 'Date'] == df.index[-1]
+        for column in INDICATOR_COLUMNS:
+            np.testing.assert_allclose(latest.loc[ticker, column], full[column],
+                                       rtol=1e-5, err_msg=column)
+
+
+def test_short_history_still_warming_up(ohlcv):
+    latest = latest_indicators({'NEW': ohlcv.iloc[:150]}).iloc[0]
+    assert np.isnan(latest['SMA_200'])
+    assert not np.isnan(latest['SMA_50'])
+
+
+def test_tail_length_covers_sma_200():
+    assert tail_length() >= 200
+    assert tail_length(1e-9) > tail_length(1e-3)
@@ -0,0 +1,48 @@
+"""Trade ledger: fills, round trips and the equity curve."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from klse.ledger import BursaCosts, ledger_backtest
+from klse.panel import Panel
+
+
+@pytest.fixture
+def suspended():
+    """One ticker whose first exit signal falls on a bar without a Close."""
+    close = np.array([3.0, 3.0, 3.2, 3.1, np.nan, 2.9, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0])
+    signal = np.array([0, 1, 1, 1, 0, 0, 1, 1, 0, 1, 1, 0], dtype=float)
+    index = pd.bdate_range('2024-01-01', periods=len(close))
+    panel = Panel(index, ['X.KL'], {'Close': close[:, None], 'Open': close[:, None],
+                                    'Valid': (~np.isnan(close)).astype(float)[:, None]})
+    return panel, signal[:, None]
+
+
+def test_order_without_price_fills_on_next_bar(suspended):
+    panel, signal = suspended
+    result = ledger_backtest(panel, signal, 10000, BursaCosts.commission_only())
+    fills = result.fills
+    assert list(fills['Side']) == ['BUY', 'SELL'] * 3
+    assert fills['Date'].iloc[1] == panel.index[5]
+    np.testing.assert_array_equal(result.trades['Exit Date'], panel.index[[5, 8, 11]])
+
+
+def test_trades_add_up_to_equity(suspended):
+    panel, signal = suspended
+    result = ledger_backtest(panel, signal, 10000, BursaCosts.commission_only())
+    trades = result.trades
+    np.testing.assert_array_equal(trades['Shares'], result.fills['Shares'].iloc[::2])
+    final = result.panel['Portfolio'][-1, 0]
+    assert trades['PnL'].sum() == pytest.approx(final - 10000)
+
+
+def test_returns_span_missing_close(suspended):
+    panel, signal = suspended
+    result = ledger_backtest(panel, signal, 10000, BursaCosts.commission_only())
+    equity = result.panel['Portfolio'][:, 0]
+    returns = result.panel['Strategy_Returns'][:, 0]
+    assert np.isnan(returns[4])
+    assert returns[5] == pytest.approx(equity[5] / equity[3] - 1)
+    growth = np.nanprod(1 + returns)
+    assert growth == pytest.approx(equity[-1] / equity[0])
@@ -0,0 +1,116 @@
+"""batch_metrics(), StreamingMetrics and rolling_metrics() vs the notebook's calc_metrics()."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import notebook
+from klse import panel as pn
+from klse.intraday import periods_per_year
+from klse.ledger import ledger_backtest
+from klse.metrics import METRIC_COLUMNS, StreamingMetrics, batch_metrics, rolling_metrics
+from klse.montecarlo import monte_carlo
+from klse.panel import Panel
+from klse.rules import run_rules, sma
+from klse.sweep import sweep
+from klse.walkforward import walk_forward
+
+
+def test_one_dimensional_input_is_one_run(ohlcv):
+    df = notebook.run(ohlcv, 'ma_crossover')
+    expected = notebook.calc_metrics(df)
+    for returns in (df['Strategy_Returns'], df['Strategy_Returns'].to_numpy()):
+        table = batch_metrics(returns, dates=df.index)
+        assert table.shape == (1, 6)
+        assert table.iloc[0].to_dict() == expected
+
+
+def test_one_dimensional_valid_mask(ohlcv):
+    df = notebook.run(ohlcv, 'macd_strategy')
+    valid = np.arange(len(df)) >= 100
+    returns = np.where(valid, df['Strategy_Returns'], np.nan)
+    got = batch_metrics(returns, dates=df.index, valid=valid)
+    expected = batch_metrics(df['Strategy_Returns'].iloc[100:], dates=df.index[100:])
+    pd.testing.assert_frame_equal(got, expected)
+
+
+def test_columns_are_independent_runs(ohlcv):
+    runs = pd.DataFrame({s: notebook.run(ohlcv, s)['Strategy_Returns']
+                         for s in ['ma_crossover', 'rsi_strategy', 'macd_strategy']})
+    table = batch_metrics(runs)
+    for name in runs:
+        assert table.loc[name].to_dict() == notebook.calc_metrics(notebook.run(ohlcv, name))
+
+
+HOURLY = dict(periods=periods_per_year('1h'), risk_free=0.05)
+
+
+def test_periods_threaded_through_backtests(frames):
+    raw = Panel.from_frames(frames)
+    ind = pn.add_indicators(raw)
+    fast = pn.run_backtest(raw, 'ma_crossover', **HOURLY)
+    expected = pn.calc_metrics(pn.backtest(ind, pn.ma_crossover(ind)), 100000, **HOURLY)
+    pd.testing.assert_frame_equal(fast, expected)
+    assert not fast['Sharpe Ratio'].equals(pn.run_backtest(raw)['Sharpe Ratio'])
+
+    ledger = pn.run_backtest(raw, 'ma_crossover', capital=20000, mode='ledger', **HOURLY)
+    result = ledger_backtest(ind, pn.ma_crossover(ind), 20000)
+    expected = pn.calc_metrics(result.panel, 20000, **HOURLY)
+    pd.testing.assert_frame_equal(ledger[expected.columns], expected)
+
+    rules = run_rules(ind, {'ma': sma(50) > sma(200)}, **HOURLY)
+    pd.testing.assert_frame_equal(rules.loc['ma'], fast)
+
+
+def test_periods_threaded_through_sweep_and_walk_forward(ohlcv):
+    swept = sweep(ohlcv, 'ma_crossover', {'fast': [50], 'slow': [200]}, n_jobs=1, **HOURLY)
+    expected = pn.run_backtest(Panel.from_frames({'T': ohlcv}), **HOURLY).iloc[0]
+    assert swept.loc[0, METRIC_COLUMNS].to_dict() == expected.to_dict()
+
+    wf = walk_forward(ohlcv, 'ma_crossover', {'fast': [10, 20], 'slow': [50]},
+                      train=150, test=60, n_jobs=1, **HOURLY)
+    expected = batch_metrics(wf.returns.to_frame(), wf.equity.to_frame(), **HOURLY)
+    assert wf.metrics().to_dict() == expected.iloc[0].to_dict()
+
+
+def test_periods_threaded_through_monte_carlo(ohlcv):
+    returns = notebook.run(ohlcv, 'ma_crossover')['Strategy_Returns']
+    mc = monte_carlo(returns, n_paths=50, seed=1, **HOURLY)
+    expected = batch_metrics(returns, dates=returns.index, **HOURLY).iloc[0]
+    assert mc.original.to_dict() == expected.to_dict()
+
+
+def test_streaming_matches_calc_metrics(ohlcv):
+    df = notebook.run(ohlcv, 'ma_crossover')
+    expected = notebook.calc_metrics(df)
+    # Warm-up bars before the notebook's dropna() window have no return yet
+    returns = df['Strategy_Returns'].reindex(ohlcv.index)
+    assert returns.isna().sum() > 100
+
+    one_by_one = StreamingMetrics()
+    for date, ret in returns.items():
+        one_by_one.update(ret, date=date)
+    blocks = StreamingMetrics()
+    for start in range(0, len(returns), 97):
+        part = returns.iloc[start:start + 97]
+        blocks.update_many(part.to_numpy(), dates=part.index)
+
+    for live in (one_by_one, blocks):
+        assert live.first_date == df.index[0]
+        got = live.metrics()
+        assert {k: got[k] for k in expected} == expected
+
+
+def test_rolling_matches_calc_metrics_per_window(ohlcv):
+    df = notebook.run(ohlcv, 'rsi_strategy')
+    roll = rolling_metrics(df['Strategy_Returns'], window=60, positions=df['Signal'].shift())
+    for end in [61, 150, len(df)]:
+        window = df['Strategy_Returns'].iloc[end - 60:end]
+        expected = batch_metrics(window).iloc[0]
+        row = roll.iloc[end - 1]
+        assert round(row['Return (%)'], 2) == expected['Total Return (%)']
+        assert round(row['Sharpe Ratio'], 2) == expected['Sharpe Ratio']
+        assert round(row['Max Drawdown (%)'], 2) == expected['Max Drawdown (%)']
+        assert round(row['Hit Rate (%)'], 2) == expected['Win Rate (%)']
+        held = df['Signal'].shift().iloc[end - 60:end].fillna(0)
+        assert row['Exposure (%)'] == pytest.approx((held != 0).mean() * 100)
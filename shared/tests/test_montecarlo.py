@@ -0,0 +1,75 @@
+"""Monte Carlo paths: what they keep from the backtest, seeds and summaries."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import notebook
+from klse.montecarlo import monte_carlo
+
+
+@pytest.fixture
+def backtest(ohlcv):
+    return notebook.run(ohlcv, 'ma_crossover')
+
+
+def _path_returns(result):
+    equity = result.equity.to_numpy()
+    return equity[1:] / equity[:-1] - 1
+
+
+def test_paths_reuse_the_returns(backtest):
+    returns = backtest['Strategy_Returns']
+    values = np.sort(returns.dropna().to_numpy())
+
+    shuffled = monte_carlo(returns, n_paths=20, method='trades', signal=backtest['Signal'],
+                           seed=3, keep=20)
+    for path in _path_returns(shuffled).T:
+        np.testing.assert_allclose(np.sort(path), values, atol=1e-12)
+    np.testing.assert_allclose(shuffled.paths['Total Return (%)'],
+                               shuffled.original['Total Return (%)'], atol=0.011)
+
+    blocks = monte_carlo(returns, n_paths=400, method='block', block=10, seed=3, keep=400)
+    drawn = _path_returns(blocks)
+    right = np.clip(np.searchsorted(values, drawn), 1, len(values) - 1)
+    gap = np.minimum(np.abs(drawn - values[right]), np.abs(drawn - values[right - 1]))
+    assert gap.max() < 1e-12
+    # Across many paths each day is drawn about equally often
+    blocks_drawn = drawn.size / 10
+    assert drawn.mean() == pytest.approx(values.mean(), abs=3 * values.std() / np.sqrt(blocks_drawn))
+    assert drawn.std() == pytest.approx(values.std(), rel=0.02)
+
+
+def test_same_seed_same_paths(backtest):
+    returns = backtest['Strategy_Returns']
+    first = monte_carlo(returns, n_paths=300, seed=7, chunk_size=100)
+    again = monte_carlo(returns, n_paths=300, seed=7, chunk_size=100, n_jobs=2)
+    pd.testing.assert_frame_equal(first.paths, again.paths)
+    pd.testing.assert_frame_equal(first.equity, again.equity)
+    other = monte_carlo(returns, n_paths=300, seed=8, chunk_size=100)
+    assert not first.paths.equals(other.paths)
+
+
+def test_summaries_on_known_series():
+    dates = pd.bdate_range('2020-01-01', periods=253)
+    steady = pd.Series(np.r_[np.nan, np.full(252, 0.001)], index=dates)
+    mc = monte_carlo(steady, n_paths=200, seed=1)
+    table = mc.confidence(0.90)
+    for column in ['5.0%', 'Median', '95.0%']:
+        np.testing.assert_allclose(table[column], table['Original'])
+    assert (table['Worse Than Original (%)'] == 0).all()
+    assert (mc.paths['Total Return (%)'] < 0).mean() == 0
+
+    # Half losing days: the loss probability and percentiles come from the paths
+    rng = np.random.default_rng(0)
+    mixed = pd.Series(np.r_[np.nan, rng.normal(0, 0.01, 252)], index=dates)
+    mc = monte_carlo(mixed, n_paths=2000, seed=1)
+    cagr = mc.paths['CAGR (%)']
+    table = mc.confidence(0.80, columns=['CAGR (%)'])
+    assert table.loc['CAGR (%)', '10.0%'] == pytest.approx(cagr.quantile(0.1))
+    assert table.loc['CAGR (%)', '90.0%'] == pytest.approx(cagr.quantile(0.9))
+    worse = (cagr < mc.original['CAGR (%)']).mean() * 100
+    assert table.loc['CAGR (%)', 'Worse Than Original (%)'] == round(worse, 1)
+    loss = (mc.paths['Total Return (%)'] < 0).mean()
+    assert loss == (cagr < 0).mean()
+    assert 0.2 < loss < 0.8
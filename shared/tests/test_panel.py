@@ -0,0 +1,64 @@
+"""Panel engine vs the notebook's per-ticker loop."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import notebook
+from conftest import assert_frame_close
+from klse import panel as pn
+from klse.rules import macd, macd_signal, run_rules, sma
+from klse.stops import apply_stop_loss
+
+FIELDS = ['Signal', 'Returns', 'Strategy_Returns', 'Portfolio', 'BuyHold']
+
+
+def _notebook_metrics(frames, strategy):
+    rows = {t: notebook.calc_metrics(notebook.run(df, strategy)) for t, df in frames.items()}
+    return pd.DataFrame(rows).T
+
+
+@pytest.mark.parametrize('strategy', list(pn.STRATEGIES))
+def test_backtest_matches_notebook(frames, strategy):
+    ind = pn.add_indicators(pn.Panel.from_frames(frames))
+    result = pn.backtest(ind, pn.STRATEGIES[strategy](ind))
+    for ticker, df in frames.items():
+        expected = notebook.run(df, strategy)
+        got = result.ticker_frame(ticker).loc[expected.index]
+        assert_frame_close(got[FIELDS], expected[FIELDS].astype(float))
+
+
+@pytest.mark.parametrize('strategy', list(pn.STRATEGIES))
+def test_run_backtest_matches_notebook(frames, strategy):
+    got = pn.run_backtest(pn.Panel.from_frames(frames), strategy)
+    expected = _notebook_metrics(frames, strategy)
+    assert_frame_close(got, expected.loc[got.index], atol=0.011)
+
+
+def test_missing_dates_bridged(frames):
+    """T2 lacks dates the others have: returns span the gap like pct_change()."""
+    ind = pn.add_indicators(pn.Panel.from_frames(frames))
+    result = pn.backtest(ind, pn.ma_crossover(ind))
+    col = ind.tickers.index('T2.KL')
+    valid = ind['Valid'][:, col] > 0
+    assert not np.isnan(result['Returns'][valid, col][1:]).any()
+
+
+def test_run_rules_matches_run_backtest(frames):
+    ind = pn.add_indicators(pn.Panel.from_frames(frames))
+    got = run_rules(ind, {'ma': sma(50) > sma(200), 'macd': macd() > macd_signal()})
+    for name, strategy in [('ma', 'ma_crossover'), ('macd', 'macd_strategy')]:
+        expected = pn.calc_metrics(pn.backtest(ind, pn.STRATEGIES[strategy](ind)))
+        assert_frame_close(got.loc[name], expected)
+
+
+def test_stop_loss_matches_notebook(frames):
+    ind = pn.add_indicators(pn.Panel.from_frames(frames))
+    signal, position = apply_stop_loss(ind, pn.ma_crossover(ind), stop_pct=0.05)
+    for ticker, df in frames.items():
+        expected = notebook.add_stop_loss(
+            notebook.ma_crossover(notebook.add_indicators(df).dropna()))
+        col = ind.tickers.index(ticker)
+        rows = ind.index.get_indexer(expected.index)
+        np.testing.assert_array_equal(signal[rows, col], expected['Signal'])
+        np.testing.assert_array_equal(position[rows[1:], col], expected['Position'][1:])
@@ -0,0 +1,46 @@
+"""Copy-free Pipeline vs the notebook functions."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import notebook
+from conftest import assert_frame_close
+from klse.pipeline import COLUMNS, Pipeline
+from klse import panel as pn
+
+
+@pytest.mark.parametrize('strategy', list(pn.STRATEGIES))
+def test_matches_notebook(ohlcv, strategy):
+    pipe = Pipeline()
+    metrics = pipe.run(ohlcv, strategy)
+    expected = notebook.run(ohlcv, strategy)
+    assert_frame_close(pipe.frame(), expected[COLUMNS].astype(float))
+    assert metrics == notebook.calc_metrics(expected)
+
+
+def test_buffer_reused_across_tickers(frames):
+    """A shorter ticker after a longer one gives the same result as a fresh pipeline."""
+    pipe = Pipeline()
+    for ticker in ['T3.KL', 'T1.KL', 'T2.KL']:
+        got = pd.Series(pipe.run(frames[ticker], 'rsi_strategy'))
+        expected = pd.Series(Pipeline().run(frames[ticker], 'rsi_strategy'))
+        pd.testing.assert_series_equal(got, expected)
+
+
+def test_total_trades_is_int(ohlcv):
+    assert type(Pipeline().run(ohlcv)['Total Trades']) is int
+
+
+def test_missing_close_skipped_like_dropna(ohlcv):
+    """A NaN Close is left out, as if the notebook ran on df.dropna()."""
+    gappy = ohlcv.copy()
+    gappy.iloc[350, gappy.columns.get_loc('Close')] = np.nan
+    pipe = Pipeline()
+    metrics = pipe.run(gappy, 'ma_crossover')
+    expected = notebook.run(gappy.dropna(), 'ma_crossover')
+    assert_frame_close(pipe.frame(), expected[COLUMNS].astype(float))
+    assert metrics == notebook.calc_metrics(expected)
+    assert metrics == pn.run_backtest(pn.Panel.from_frames({'T': gappy})).iloc[0].to_dict()
+    # The notebook on the gappy frame loses the 200 rows after the gap instead
+    assert len(notebook.run(gappy, 'ma_crossover')) < len(pipe.frame()) - 190
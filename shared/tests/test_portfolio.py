@@ -0,0 +1,130 @@
+"""Portfolio simulator vs a plain day-by-day loop."""
+
+import numpy as np
+import pytest
+
+from klse.indicators import _synthetic_ohlcv
+from klse.panel import Panel
+from klse.portfolio import _rebalance_rows, _trailing_volatility, simulate_portfolio
+
+
+@pytest.fixture
+def three():
+    """Three tickers on the same 300 days."""
+    return Panel.from_frames({f'T{k}.KL': _synthetic_ohlcv(300, seed=k) for k in range(3)})
+
+
+def _signal(panel, start=0):
+    signal = np.ones(panel['Close'].shape)
+    signal[:start] = np.nan
+    return signal
+
+
+def _reference(close, targets, start, commission):
+    """Rebalance to targets[row] every day from start; value relative to 1."""
+    value, weights, values = 1.0, np.zeros(close.shape[1]), []
+    for row in range(start, len(close)):
+        if row > start:
+            held = weights * close[row] / close[row - 1]
+            growth = held.sum() + 1 - weights.sum()
+            value *= growth
+            drifted = held / growth
+        else:
+            drifted = np.zeros_like(weights)
+        weights = targets[row]
+        value *= 1 - commission * np.abs(weights - drifted).sum()
+        values.append(value)
+    return np.array(values)
+
+
+def test_equal_weight_daily_rebalance(three):
+    result = simulate_portfolio(three, _signal(three, 10), capital=1000, rebalance='D')
+    targets = np.full(three['Close'].shape, 1 / 3)
+    expected = _reference(three['Close'], targets, 10, 0.001)
+    np.testing.assert_allclose(result.equity.to_numpy(), 1000 * expected, rtol=1e-12)
+    np.testing.assert_allclose(result.weights.to_numpy(), 1 / 3)
+
+
+def test_volatility_sizing(three):
+    result = simulate_portfolio(three, _signal(three, 30), capital=1000, sizing='volatility',
+                                target_vol=0.05, rebalance='D')
+    targets = 0.05 / _trailing_volatility(three['Close'], 20) / 3
+    assert (targets[30:].sum(axis=1) < 1).all()
+    np.testing.assert_allclose(result.weights.to_numpy(), targets[30:], rtol=1e-12)
+    expected = _reference(three['Close'], targets, 30, 0.001)
+    np.testing.assert_allclose(result.equity.to_numpy(), 1000 * expected, rtol=1e-12)
+
+    # Hourly bars: the same returns are annualized with more bars per year
+    hourly = simulate_portfolio(three, _signal(three, 30), sizing='volatility', target_vol=0.05,
+                                rebalance='D', periods=252 * 7)
+    np.testing.assert_allclose(hourly.weights.to_numpy(), targets[30:] / np.sqrt(7), rtol=1e-12)
+
+
+def test_max_positions_ranking(three):
+    signal = _signal(three)
+    signal[150:, 1] = 0
+    score = np.zeros(signal.shape)
+    score[:, 1] = 2.0
+    score[:, 0] = 1.0
+    score[100:, 2] = 3.0          # ranks first later, but T1 is already held
+    result = simulate_portfolio(three, signal, max_positions=1, rebalance=None, score=score)
+    held = result.weights.idxmax(axis=1)
+    assert (result.weights > 0).sum(axis=1).max() == 1
+    assert held.iloc[0] == 'T1.KL'
+    assert held[three.index[150]] == 'T2.KL'
+    assert result.weights.loc[three.index[150], 'T2.KL'] == 1.0
+
+
+def test_rebalance_schedules(three):
+    index = three.index
+    assert np.flatnonzero(_rebalance_rows(index, 5, start=7)).tolist() == list(range(7, 300, 5))
+    assert not _rebalance_rows(index, None, start=7).any()
+    monthly = np.flatnonzero(_rebalance_rows(index, 'M'))
+    assert monthly.tolist() == [0] + [k for k in range(1, 300) if index[k].month != index[k - 1].month]
+    with pytest.raises(ValueError):
+        _rebalance_rows(index, 'fortnightly')
+
+    # Every 5 days counts from the first day with a signal, not from row 0
+    result = simulate_portfolio(three, _signal(three, 7), rebalance=5)
+    assert list(result.weights.index) == list(index[7::5])
+
+
+def test_commission_accounting(three):
+    result = simulate_portfolio(three, _signal(three), capital=1000, rebalance='M',
+                                commission=0.002)
+    np.testing.assert_allclose(result.costs, 0.002 * result.turnover)
+    assert result.turnover.iloc[0] == pytest.approx(1.0)
+    assert result.equity.iloc[0] == pytest.approx(1000 * (1 - 0.002))
+    free = simulate_portfolio(three, _signal(three), capital=1000, rebalance='M', commission=0)
+    assert (result.equity < free.equity).all()
+
+    metrics = result.metrics()
+    assert metrics['Costs (%)'] == round(result.costs.sum() * 100, 2)
+    years = len(result.equity) / 252
+    assert metrics['Turnover (% / yr)'] == round(result.turnover.sum() / years * 100, 2)
+
+
+def test_periods_and_risk_free_in_metrics(three):
+    daily = simulate_portfolio(three, _signal(three))
+    hourly = simulate_portfolio(three, _signal(three), periods=252 * 7, risk_free=0.0)
+    assert (hourly.periods, hourly.risk_free) == (252 * 7, 0.0)
+    returns = hourly.returns.dropna()
+    sharpe = np.sqrt(252 * 7) * returns.mean() / returns.std()
+    assert hourly.metrics()['Sharpe Ratio'] == round(sharpe, 2)
+    assert hourly.metrics()['Turnover (% / yr)'] == pytest.approx(
+        daily.metrics()['Turnover (% / yr)'] * 7, abs=0.01)
+
+
+def test_missing_close_keeps_position(frames):
+    """T2 lacks three dates the others have: it is held through them, not sold and rebought."""
+    panel = Panel.from_frames(frames)
+    signal = np.where(np.isnan(panel['Close']), np.nan, 1.0)
+    result = simulate_portfolio(panel, signal, rebalance=None)
+
+    gaps = frames['T3.KL'].index.difference(frames['T2.KL'].index)
+    gaps = gaps[gaps < frames['T0.KL'].index[-1]]
+    assert len(gaps) == 3
+    assert (result.turnover[gaps] == 0).all()
+    before = result.positions.index.get_indexer(gaps) - 1
+    np.testing.assert_array_equal(result.positions[gaps], result.positions.iloc[before])
+    assert (result.weights['T2.KL'] > 0).all()
@@ -0,0 +1,120 @@
+"""Per-stage profiler: patching, nesting, ticker attribution and reports."""
+
+import json
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from klse.profiling import Profiler
+
+
+def _pipeline():
+    """A notebook-like namespace whose functions call each other through it."""
+    namespace = {}
+
+    def get_data(ticker, start, end):
+        time.sleep(0.002)
+        return pd.DataFrame({'Close': range(50)})
+
+    def add_indicators(df):
+        time.sleep(0.002)
+        return df.assign(SMA=df['Close'].rolling(5).mean())
+
+    def backtest(df):
+        # Calls another stage, like a helper the notebook function uses
+        df = namespace['add_indicators'](df)
+        time.sleep(0.002)
+        return df
+
+    namespace.update(get_data=get_data, add_indicators=add_indicators, backtest=backtest)
+    return namespace
+
+
+def test_instrument_and_restore():
+    namespace = _pipeline()
+    originals = dict(namespace)
+    profiler = Profiler(memory=False)
+    assert profiler.instrument(namespace) == ['get_data', 'add_indicators', 'backtest']
+    assert all(namespace[name].__profiled__ is originals[name] for name in originals)
+    assert profiler.instrument(namespace) == []        # already wrapped
+    profiler.restore()
+    assert namespace == originals
+
+
+def test_nested_stage_counts_in_caller():
+    namespace = _pipeline()
+    profiler = Profiler()
+    profiler.instrument(namespace)
+    namespace['backtest'](namespace['get_data']('1155.KL', None, None))
+    profiler.restore()
+
+    records = profiler.frame().set_index('Stage')
+    assert list(records.index) == ['get_data', 'add_indicators', 'backtest']
+    assert records.loc['backtest', 'Wall (s)'] > records.loc['add_indicators', 'Wall (s)']
+    assert records.loc['backtest', 'Wall (s)'] >= 0.004
+    assert records.loc['backtest', 'Rows'] == 50
+    assert (records['Allocated (bytes)'] > 0).all()
+    assert (records['Ticker'] == '1155.KL').all()
+
+
+def test_tickers_per_call_and_per_thread():
+    namespace = _pipeline()
+    profiler = Profiler(memory=False)
+    profiler.instrument(namespace)
+    for ticker in ['A.KL', 'B.KL']:
+        namespace['backtest'](namespace['get_data'](ticker, None, None))
+    with profiler.ticker('C.KL'):
+        namespace['add_indicators'](pd.DataFrame({'Close': [1.0, 2.0]}))
+    with profiler.stage('report', ticker='D.KL'):
+        pass
+
+    # Two threads take turns: each stage goes to the ticker its own thread fetched
+    both_fetched = threading.Barrier(2)
+
+    def scan(ticker):
+        df = namespace['get_data'](ticker, None, None)
+        both_fetched.wait()
+        namespace['backtest'](df)
+
+    threads = [threading.Thread(target=scan, args=(t,)) for t in ['E.KL', 'F.KL']]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    profiler.restore()
+
+    calls = profiler.frame().groupby('Ticker')['Stage'].apply(sorted).to_dict()
+    scan_stages = ['add_indicators', 'backtest', 'get_data']
+    assert calls == {'A.KL': scan_stages, 'B.KL': scan_stages, 'C.KL': ['add_indicators'],
+                     'D.KL': ['report'], 'E.KL': scan_stages, 'F.KL': scan_stages}
+
+
+def test_summary_and_json(tmp_path):
+    namespace = _pipeline()
+    profiler = Profiler(memory=False)
+    profiler.instrument(namespace)
+    for ticker in ['A.KL', 'B.KL']:
+        namespace['backtest'](namespace['get_data'](ticker, None, None))
+    profiler.restore()
+
+    summary = profiler.summary()
+    assert list(summary.columns) == ['Calls', 'Wall (s)', 'Mean Wall (s)', 'CPU (s)', 'Rows',
+                                     'Rows/s', 'Peak Allocated (MB)', 'Share of Wall (%)']
+    assert summary.index[0] == 'backtest'                  # slowest first
+    assert summary.loc['add_indicators', 'Calls'] == 2
+    assert summary['Share of Wall (%)'].sum() == pytest.approx(100, abs=0.5)
+
+    by_ticker = profiler.summary(by=['Stage', 'Ticker'])
+    assert by_ticker.index.names == ['Stage', 'Ticker'] and len(by_ticker) == 6
+
+    text = profiler.to_json(tmp_path / 'profile.json', by=['Stage', 'Ticker'])
+    data = json.loads((tmp_path / 'profile.json').read_text())
+    assert data == json.loads(text)
+    assert len(data['records']) == 6 and len(data['summary']) == 6
+    assert set(data['summary'][0]) == {'Stage', 'Ticker', *summary.columns}
+
+    profiler.reset()
+    assert profiler.summary().empty
+
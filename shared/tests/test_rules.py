@@ -0,0 +1,91 @@
+"""Rule expressions: shared steps, crosses, shifts, negation and plan reuse."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from klse import indicators
+from klse.panel import Panel
+from klse.rules import (Strategy, close, compile_rules, cross_above, cross_below, macd,
+                        macd_signal, rsi, sma)
+
+
+def _panel(*columns):
+    """Panel of Close prices, one ticker per column."""
+    values = np.column_stack(columns).astype(np.float64)
+    index = pd.bdate_range('2024-01-01', periods=len(values))
+    return Panel(index, [f'T{k}.KL' for k in range(values.shape[1])], {'Close': values})
+
+
+def test_shared_indicator_is_computed_once(frames, monkeypatch):
+    calls = []
+    original = indicators.sma
+
+    def counted(values, length):
+        calls.append(length)
+        return original(values, length)
+
+    monkeypatch.setattr(indicators, 'sma', counted)
+    golden = sma(50) > sma(200)
+    plan = compile_rules({'golden': golden,
+                          'pullback': (sma(50) > sma(200)) & (rsi(14) < 40),
+                          'exit_on_cross': Strategy(golden, sma(50) < sma(200)),
+                          'macd': macd() > macd_signal()})
+    kinds = [step.key[0] for step in plan.steps]
+    assert kinds.count('sma') == 2 and kinds.count('macd') == 1
+    assert len({step.key for step in plan.steps}) == len(plan.steps)
+
+    panel = Panel.from_frames(frames)
+    signals = plan.run(panel)
+    assert sorted(calls) == [50, 200]
+    np.testing.assert_array_equal(signals['golden'], (sma(50) > sma(200))(panel))
+
+
+def test_cross_above_and_below():
+    prices = [9, 11, 11, 9, 10, 11, 9, np.nan, 12]
+    panel = _panel(prices)
+    above = cross_above(close, 10)(panel)[:, 0]
+    below = cross_below(close, 10)(panel)[:, 0]
+
+    expected_above, expected_below = [np.nan], [np.nan]
+    for prev, now in zip(prices[:-1], prices[1:]):
+        if np.isnan(prev) or np.isnan(now):
+            expected_above.append(np.nan)
+            expected_below.append(np.nan)
+        else:
+            expected_above.append(float(prev <= 10 < now))
+            expected_below.append(float(prev >= 10 > now))
+    np.testing.assert_array_equal(above, expected_above)
+    np.testing.assert_array_equal(below, expected_below)
+
+
+def test_shift_and_not():
+    prices = np.array([1.0, 2.0, np.nan, 4.0, 5.0])
+    panel = _panel(prices, prices[::-1])
+    plan = compile_rules({'back': close.shift(2) > 0, 'ahead': close.shift(-1) > 0,
+                          'flat': ~(close > 3)})
+    signals = plan.run(panel)
+    np.testing.assert_array_equal(signals['back'][:, 0], [np.nan, np.nan, 1, 1, np.nan])
+    np.testing.assert_array_equal(signals['ahead'][:, 0], [1, np.nan, 1, 1, np.nan])
+    np.testing.assert_array_equal(signals['flat'][:, 0], [1, 1, np.nan, 0, 0])
+    np.testing.assert_array_equal(signals['flat'][:, 1], [0, 0, np.nan, 1, 1])
+
+
+def test_plan_is_reusable(frames):
+    plan = compile_rules({'golden': sma(50) > sma(200),
+                          'rsi': Strategy(rsi(14) < 30, rsi(14) > 70)})
+    first, second = (Panel.from_frames({t: frames[t]}) for t in ['T0.KL', 'T3.KL'])
+    a = plan.run(first)
+    b = plan.run(second)
+    again = plan.run(first)
+    for name in ['golden', 'rsi']:
+        np.testing.assert_array_equal(again[name], a[name])
+        fresh = compile_rules({'golden': sma(50) > sma(200),
+                               'rsi': Strategy(rsi(14) < 30, rsi(14) > 70)}).run(second)
+        np.testing.assert_array_equal(b[name], fresh[name])
+    assert a['golden'].shape != b['golden'].shape
+
+
+def test_condition_must_be_expression():
+    with pytest.raises(TypeError):
+        compile_rules({'bad': Strategy(True)})
@@ -0,0 +1,54 @@
+"""Indexed screens vs the same filters written with pandas."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from klse.screener import FundamentalsTable
+
+
+@pytest.fixture
+def stocks():
+    """200 stocks, some without a PE or a dividend yield."""
+    rng = np.random.default_rng(3)
+    n = 200
+    pe = rng.normal(15, 8, n).round()
+    pe[rng.choice(n, 30, replace=False)] = np.nan
+    dy = rng.uniform(0, 8, n)
+    dy[rng.choice(n, 20, replace=False)] = np.nan
+    return pd.DataFrame({
+        'Ticker': [f'{k:04d}.KL' for k in range(n)],
+        'PE Ratio': pe,
+        'Dividend Yield (%)': dy,
+        'Sector': rng.choice(['Technology', 'Financial Services', 'Energy'], n),
+    })
+
+
+@pytest.mark.parametrize('criteria, expected', [
+    ([('PE Ratio', '!=', 0)], lambda df: df['PE Ratio'].notna() & (df['PE Ratio'] != 0)),
+    ([('PE Ratio', '!=', 10), ('PE Ratio', '!=', 12), ('PE Ratio', '<', 20)],
+     lambda df: df['PE Ratio'].notna() & ~df['PE Ratio'].isin([10, 12]) & (df['PE Ratio'] < 20)),
+    # Selective enough to be answered from the index
+    ([('PE Ratio', 'between', (9, 11)), ('PE Ratio', '!=', 10)],
+     lambda df: df['PE Ratio'].isin([9, 11])),
+    ([('Sector', '!=', 'Energy')], lambda df: df['Sector'] != 'Energy'),
+])
+def test_not_equal(stocks, criteria, expected):
+    got = FundamentalsTable(stocks).screen(criteria)
+    pd.testing.assert_frame_equal(got, stocks[expected(stocks)])
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('PE != 0', lambda df: df['PE Ratio'].notna() & (df['PE Ratio'] != 0)),
+    ('not (PE < 10)', lambda df: df['PE Ratio'] >= 10),
+    ('~(PE < 10) and DY > 2', lambda df: (df['PE Ratio'] >= 10) & (df['Dividend Yield (%)'] > 2)),
+    # Unknown or False is unknown, so a stock without a PE needs DY <= 2 to be ruled out
+    ('not (PE < 10 or DY > 2)', lambda df: (df['PE Ratio'] >= 10) & (df['Dividend Yield (%)'] <= 2)),
+    # Unknown and False is False, so its negation passes
+    ('not (PE < 10 and DY > 2)', lambda df: (df['PE Ratio'] >= 10) | (df['Dividend Yield (%)'] <= 2)),
+    ('PE < 10 or DY > 6', lambda df: (df['PE Ratio'] < 10) | (df['Dividend Yield (%)'] > 6)),
+    ("not (Sector in ['Energy'])", lambda df: df['Sector'] != 'Energy'),
+])
+def test_query_leaves_out_missing(stocks, query, expected):
+    got = FundamentalsTable(stocks).query(query)
+    pd.testing.assert_frame_equal(got, stocks[expected(stocks)])
@@ -0,0 +1,105 @@
+"""Stop-loss / take-profit exits vs a bar-by-bar loop."""
+
+import numpy as np
+import pytest
+
+import notebook
+from klse import indicators
+from klse.stops import add_stop_loss, stop_loss_exits
+
+
+def _reference(close, signal, position, stop_pct=0.05, trailing=False, take_profit=None,
+               atr=None, atr_mult=None, stay_out=False):
+    """add_stop_loss() from the notebook, extended with every option."""
+    signal, position = signal.copy(), position.copy()
+    entry_price = peak = entry_atr = None
+    out = False
+    for i in range(len(close)):
+        if position[i] == 1:
+            entry_price, peak, out = close[i], close[i], False
+            entry_atr = None if atr is None else atr[i]
+        elif out:
+            # Flat until the strategy itself leaves the trade
+            if signal[i] == 1:
+                signal[i] = 0
+                position[i] = 0
+            else:
+                if position[i] == -1:
+                    position[i] = 0
+                out = False
+        elif entry_price is not None and signal[i] == 1:
+            peak = np.fmax(peak, close[i])
+            ref = peak if trailing else entry_price
+            level = -np.inf
+            if stop_pct is not None:
+                level = max(level, ref * (1 - stop_pct))
+            if atr_mult is not None:
+                level = max(level, ref - atr_mult * entry_atr)
+            hit = close[i] < level
+            if take_profit is not None:
+                hit = hit or close[i] > entry_price * (1 + take_profit)
+            if hit:
+                signal[i] = 0
+                position[i] = -1
+                entry_price = None
+                out = stay_out
+        elif position[i] == -1:
+            entry_price = None
+    return signal, position
+
+
+OPTIONS = [
+    dict(stop_pct=0.02),
+    dict(stop_pct=0.03, trailing=True),
+    dict(stop_pct=None, take_profit=0.04),
+    dict(stop_pct=0.08, take_profit=0.1, trailing=True),
+    dict(stop_pct=None, atr_mult=1.5),
+    dict(stop_pct=None, atr_mult=2, trailing=True),
+    dict(stop_pct=0.03, stay_out=True),
+    dict(stop_pct=0.02, trailing=True, take_profit=0.05, stay_out=True),
+]
+
+
+@pytest.fixture(params=['ma_crossover', 'rsi_strategy', 'macd_strategy'])
+def signals(ohlcv, request):
+    df = notebook.STRATEGIES[request.param](notebook.add_indicators(ohlcv).dropna())
+    atr = indicators.atr(*(df[c].to_numpy() for c in ['High', 'Low', 'Close']), 14)
+    return (df['Close'].to_numpy(), df['Signal'].to_numpy(dtype=float),
+            df['Position'].to_numpy(), atr)
+
+
+@pytest.mark.parametrize('options', OPTIONS, ids=lambda o: ','.join(o))
+def test_exits_match_loop(signals, options):
+    close, signal, position, atr = signals
+    got = stop_loss_exits(close, signal, position, atr=atr, **options)
+    expected = _reference(close, signal, position, atr=atr, **options)
+    np.testing.assert_array_equal(got[0], expected[0])
+    np.testing.assert_array_equal(got[1], expected[1])
+    assert (got[0] != signal).any()              # some trades were stopped out
+    if options.get('stay_out'):
+        # Flat from the stop until the next entry
+        assert (got[0] <= signal).all()
+
+
+def test_matrix_is_column_by_column(signals):
+    close, signal, position, atr = signals
+    other = signal[::-1]
+    other_position = np.r_[np.nan, np.diff(other)]
+    options = dict(stop_pct=0.03, trailing=True, stay_out=True)
+    got = stop_loss_exits(np.column_stack([close, close[::-1]]),
+                          np.column_stack([signal, other]),
+                          np.column_stack([position, other_position]), **options)
+    for col, expected in enumerate([_reference(close, signal, position, **options),
+                                    _reference(close[::-1], other, other_position, **options)]):
+        np.testing.assert_array_equal(got[0][:, col], expected[0])
+        np.testing.assert_array_equal(got[1][:, col], expected[1])
+
+
+def test_add_stop_loss_defaults_match_notebook(ohlcv):
+    df = notebook.ma_crossover(notebook.add_indicators(ohlcv).dropna())
+    got = add_stop_loss(df)
+    expected = notebook.add_stop_loss(df)
+    np.testing.assert_array_equal(got['Signal'], expected['Signal'])
+    np.testing.assert_array_equal(got['Position'], expected['Position'])
+    with pytest.raises(ValueError):
+        stop_loss_exits(df['Close'], df['Signal'], df['Position'], atr_mult=2)
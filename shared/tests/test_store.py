@@ -0,0 +1,69 @@
+"""Columnar price store: round trips, CSV migration and older files."""
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from klse.indicators import _synthetic_ohlcv
+from klse.store import PriceStore, migrate_csv
+
+
+def _with_actions(df):
+    df = df.copy()
+    df['Dividends'] = 0.0
+    df['Stock Splits'] = 0.0
+    df.iloc[100, df.columns.get_loc('Dividends')] = 0.0825
+    df.iloc[300, df.columns.get_loc('Stock Splits')] = 2.0
+    return df
+
+
+def test_actions_round_trip(tmp_path):
+    df = _with_actions(_synthetic_ohlcv(400))
+    store = PriceStore(tmp_path)
+    store.write('1155.KL', df)
+    stored = store.read('1155.KL')
+    np.testing.assert_array_equal(stored['Dividends'], df['Dividends'])
+    np.testing.assert_array_equal(stored['Stock Splits'], df['Stock Splits'])
+    np.testing.assert_allclose(stored['Close'], df['Close'], rtol=1e-6)
+
+
+def test_migrate_csv_keeps_actions(tmp_path):
+    df = _with_actions(_synthetic_ohlcv(400))
+    df.rename_axis('Date').to_csv(tmp_path / '1155_KL_prices.csv')
+    assert migrate_csv(str(tmp_path), verbose=False) == ['1155.KL']
+    stored = PriceStore(tmp_path / 'prices').read('1155.KL')
+    assert stored['Dividends'].sum() == 0.0825
+    assert stored['Stock Splits'].sum() == 2.0
+
+
+def test_file_without_actions(tmp_path):
+    """Files written before Dividends / Stock Splits were stored read as no actions."""
+    df = _synthetic_ohlcv(400)
+    store = PriceStore(tmp_path)
+    store.write('1155.KL', df)
+    path = store.path('1155.KL')
+    pq.write_table(pq.read_table(path).drop(['Dividends', 'Stock Splits']), path)
+
+    assert (store.read('1155.KL')['Dividends'] == 0).all()
+    assert list(store.scan(columns=['Close', 'Stock Splits']).columns) == [
+        'Ticker', 'Date', 'Close', 'Stock Splits']
+    store.write('1155.KL', _with_actions(df).iloc[300:])
+    assert store.read('1155.KL')['Stock Splits'].sum() == 2.0
+    assert pq.read_schema(path).field('Dividends').type == pa.float64()
+
+
+def test_missing_volume_stays_missing(tmp_path):
+    df = _synthetic_ohlcv(400)
+    df.iloc[[10, 250], df.columns.get_loc('Volume')] = np.nan
+    store = PriceStore(tmp_path)
+    store.write('1155.KL', df.iloc[:300])
+    store.write('1155.KL', df.iloc[200:])                 # merged with the stored nulls
+    assert pq.read_table(store.path('1155.KL')).column('Volume').null_count == 2
+
+    stored = store.read('1155.KL')
+    assert stored['Volume'].isna().sum() == 2
+    np.testing.assert_array_equal(stored['Volume'].dropna(), df['Volume'].dropna())
+    assert stored['Close'].dtype == np.float32
+    volume = store.load_panel(['1155.KL'])['Volume'][:, 0]
+    np.testing.assert_array_equal(np.flatnonzero(np.isnan(volume)), [10, 250])
+    assert store.read('1155.KL', end=df.index[10])['Volume'].dtype == np.int64
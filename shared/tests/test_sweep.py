@@ -0,0 +1,29 @@
+"""Parameter sweeps: in-process by default, same results from a pool."""
+
+import importlib
+
+import pandas as pd
+
+# klse re-exports the sweep() function under the module's name
+sw = importlib.import_module('klse.sweep')
+
+GRID = {'fast': range(10, 60, 10), 'slow': range(60, 200, 20)}
+
+
+def test_small_grid_runs_in_process(ohlcv, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("a small grid should not start a process pool")
+
+    monkeypatch.setattr(sw, 'ProcessPoolExecutor', no_pool)
+    assert len(sw.sweep(ohlcv, 'ma_crossover', GRID)) == 35
+
+
+def test_pool_matches_in_process(ohlcv):
+    alone = sw.sweep(ohlcv, 'ma_crossover', GRID, n_jobs=1, chunk_size=4)
+    pooled = sw.sweep(ohlcv, 'ma_crossover', GRID, n_jobs=2, chunk_size=4)
+    pd.testing.assert_frame_equal(pooled, alone)
+
+
+def test_default_jobs():
+    assert sw._default_jobs(None, sw._PARALLEL_MIN - 1) == 1
+    assert sw._default_jobs(3, 10) == 3